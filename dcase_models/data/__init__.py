@@ -41,6 +41,24 @@ Features are implemented as specializations of the base class FeatureExtractor.
     Openl3
     RawAudio
     FramesAudio
+    FeatureStream
+    FeatureExtractorGroup
+
+FeatureStore
+------------
+.. autosummary::
+    :toctree: generated/
+
+    FeatureStore
+    save_features
+    load_features
+
+Resampler
+---------
+.. autosummary::
+    :toctree: generated/
+
+    Resampler
  
 Augmentation
 ------------
@@ -49,6 +67,7 @@ Augmentation
 
     AugmentedDataset
     WhiteNoise
+    OnlineAugmentation
 
 DataGenerator
 -------------
@@ -64,6 +83,9 @@ Scaler
     :toctree: generated/
 
     Scaler
+    compute_statistics
+    merge_statistics
+    get_quantiles
 
 """
 
@@ -72,5 +94,7 @@ from .datasets import *  # pylint: disable=wildcard-import
 from .data_generator import *  # pylint: disable=wildcard-import
 from .data_augmentation import *  # pylint: disable=wildcard-import
 from .feature_extractor import *  # pylint: disable=wildcard-import
+from .feature_store import *  # pylint: disable=wildcard-import
+from .resampler import *  # pylint: disable=wildcard-import
 from .features import *  # pylint: disable=wildcard-import
 from .scaler import *  # pylint: disable=wildcard-import
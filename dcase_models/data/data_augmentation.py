@@ -1,13 +1,35 @@
 import os
+import time
 import sox
 import soundfile as sf
 import numpy as np
 from librosa.core import db_to_power, power_to_db
+from librosa.effects import pitch_shift, time_stretch
 
 from .dataset_base import Dataset
 from ..util.files import duplicate_folder_structure
 from ..util.files import list_wav_files
-from ..util.ui import progressbar
+from ..util.misc import parallel_map
+from ..util.ui import throughput
+
+
+def _augment_file(transformer, path_to_file, path_to_destination):
+    """ Helper of AugmentedDataset.process(). Augments one file.
+
+    The result is written to a hidden temporary file which is renamed
+    when it is complete, so interrupted files are not taken as done.
+
+    Returns
+    -------
+    float
+        Duration (in seconds) of the audio file.
+
+    """
+    folder, file_name = os.path.split(path_to_destination)
+    path_to_temporal = os.path.join(folder, '.' + file_name)
+    transformer.build(path_to_file, path_to_temporal)
+    os.replace(path_to_temporal, path_to_destination)
+    return sf.info(path_to_file).duration
 
 
 class WhiteNoise():
@@ -39,6 +61,25 @@ class WhiteNoise():
 
         """
         audio, sr = sf.read(file_origin)
+        aug_audio = self.apply(audio)
+
+        # Save result to file
+        sf.write(file_destination, aug_audio, sr)
+
+    def apply(self, audio):
+        """ Add noise to an audio signal.
+
+        Parameters
+        ----------
+        audio : ndarray
+            Audio signal.
+
+        Returns
+        -------
+        ndarray
+            Audio signal with noise.
+
+        """
         # Calculate signal mean power
         s_power = np.mean(audio**2)
         s_db = power_to_db(s_power)
@@ -60,8 +101,237 @@ class WhiteNoise():
             # TODO: check this solution
             aug_audio = aug_audio/np.amax(aug_audio)
 
-        # Save result to file
-        sf.write(file_destination, aug_audio, sr)
+        return aug_audio
+
+
+class OnlineAugmentation():
+    """ Implements data augmentation in memory at batch time.
+
+    Unlike AugmentedDataset, the augmented data is not stored. It is used
+    by DataGenerator to augment each training batch.
+
+    There are two kinds of augmentations:
+
+    - Waveform augmentations ('white_noise', 'pitch_shift',
+      'time_stretching') are applied to the audio signal and then the
+      features are calculated (see FeatureExtractor.calculate_from_audio()).
+    - Feature augmentations ('feature_noise', 'spec_masking', 'mixup')
+      are applied to the (scaled) features of the batch.
+
+    Parameters
+    ----------
+    augmentations_list : list of dict
+        List of augmentation types and their parameters.
+        The parameters of the waveform augmentations can be a value or a
+        list [min, max]. In that case, the value is drawn uniformly for each
+        file. All the augmentations accept a 'probability' parameter
+        (default 1.0): the probability of augmenting each file (waveform
+        augmentations) or sequence (feature augmentations).
+        e.g.::
+
+            [
+                {'type': 'pitch_shift', 'n_semitones': [-2, 2],
+                 'probability': 0.5},
+                {'type': 'time_stretching', 'factor': [0.9, 1.1]},
+                {'type': 'white_noise', 'snr': [20, 60]},
+                {'type': 'feature_noise', 'snr': 30},
+                {'type': 'spec_masking', 'time_masks': 1, 'time_width': 8,
+                 'freq_masks': 1, 'freq_width': 8},
+                {'type': 'mixup', 'alpha': 0.2}
+            ]
+
+    sr : int
+        Sampling rate of the audio signals.
+
+    Examples
+    --------
+    >>> from dcase_models.data.data_augmentation import OnlineAugmentation
+    >>> augmentation = OnlineAugmentation(
+            [{'type': 'spec_masking', 'time_masks': 2, 'time_width': 4}])
+    >>> X_aug, Y_aug = augmentation.apply_features([X], [Y])
+
+    """
+    waveform_types = ['white_noise', 'pitch_shift', 'time_stretching']
+    feature_types = ['feature_noise', 'spec_masking', 'mixup']
+
+    def __init__(self, augmentations_list, sr=22050):
+        """ Initialize the OnlineAugmentation.
+
+        """
+        for augmentation in augmentations_list:
+            if augmentation['type'] not in (self.waveform_types +
+                                            self.feature_types):
+                raise AttributeError(
+                    'Augmentation not available: %s' % augmentation['type'])
+        self.augmentations_list = augmentations_list
+        self.sr = sr
+
+    def has_waveform_augmentations(self):
+        """ Checks if there are waveform augmentations.
+
+        Returns
+        -------
+        bool
+            True if any augmentation is applied to the audio signals.
+
+        """
+        return any([augmentation['type'] in self.waveform_types
+                    for augmentation in self.augmentations_list])
+
+    def draw_waveform_augmentations(self):
+        """ Draws the waveform augmentations to be applied to a file.
+
+        Returns
+        -------
+        list of dict
+            Waveform augmentations (with their probability) drawn at random.
+            Each parameter given as [min, max] is replaced by a value
+            drawn uniformly.
+
+        """
+        augmentations = []
+        for augmentation in self.augmentations_list:
+            if augmentation['type'] not in self.waveform_types:
+                continue
+            if np.random.rand() >= augmentation.get('probability', 1.0):
+                continue
+            augmentation = augmentation.copy()
+            for key, value in augmentation.items():
+                if (key != 'type') and (type(value) in [list, tuple]):
+                    augmentation[key] = np.random.uniform(value[0], value[1])
+            augmentations.append(augmentation)
+        return augmentations
+
+    def apply_audio(self, audio, augmentations):
+        """ Applies waveform augmentations to an audio signal.
+
+        Parameters
+        ----------
+        audio : ndarray
+            Audio signal sampled at sr.
+        augmentations : list of dict
+            Augmentations returned by draw_waveform_augmentations().
+
+        Returns
+        -------
+        ndarray
+            Augmented audio signal.
+
+        """
+        for augmentation in augmentations:
+            aug_type = augmentation['type']
+            if aug_type == 'pitch_shift':
+                audio = pitch_shift(
+                    audio, self.sr, augmentation['n_semitones'])
+            if aug_type == 'time_stretching':
+                audio = time_stretch(audio, augmentation['factor'])
+            if aug_type == 'white_noise':
+                audio = WhiteNoise(augmentation['snr']).apply(audio)
+        return audio
+
+    def apply_features(self, X, Y):
+        """ Applies feature augmentations to a batch.
+
+        Parameters
+        ----------
+        X : list of ndarray
+            Features of the batch for each input,
+            shape (N_sequences, N_frames, N_bands, ...).
+        Y : list of ndarray
+            Outputs (e.g. annotations) of the batch for each output,
+            shape (N_sequences, ...).
+
+        Returns
+        -------
+        X : list of ndarray
+            Augmented features.
+        Y : list of ndarray
+            Outputs (modified only by mixup).
+
+        """
+        X = list(X)
+        Y = list(Y)
+        n_sequences = len(X[0])
+        for augmentation in self.augmentations_list:
+            aug_type = augmentation['type']
+            if aug_type not in self.feature_types:
+                continue
+            selected = (np.random.rand(n_sequences) <
+                        augmentation.get('probability', 1.0))
+            if not np.any(selected):
+                continue
+            if aug_type == 'feature_noise':
+                for j in range(len(X)):
+                    X[j] = self._feature_noise(
+                        X[j], augmentation['snr'], selected)
+            if aug_type == 'spec_masking':
+                for j in range(len(X)):
+                    X[j] = self._spec_masking(X[j], augmentation, selected)
+            if aug_type == 'mixup':
+                X, Y = self._mixup(X, Y, augmentation['alpha'], selected)
+        return X, Y
+
+    def _feature_noise(self, X, snr, selected):
+        """ Adds gaussian noise to the selected sequences.
+
+        The noise power is given by the mean power of X and snr (in dB).
+
+        """
+        n_power = np.mean(X**2) / 10**(snr/10.)
+        noise = np.random.normal(
+            loc=0.0, scale=np.sqrt(n_power),
+            size=(np.sum(selected),) + X.shape[1:])
+        X = X.copy()
+        X[selected] += noise.astype(X.dtype)
+        return X
+
+    def _spec_masking(self, X, augmentation, selected):
+        """ Masks random time and frequency bands of the selected sequences.
+
+        The masked values are set to the mean of X.
+
+        """
+        if X.ndim < 3:
+            raise AttributeError(
+                'spec_masking needs features of shape '
+                '(N_sequences, N_frames, N_bands, ...)')
+        value = X.dtype.type(np.mean(X))
+        for axis, prefix in [(1, 'time'), (2, 'freq')]:
+            size = X.shape[axis]
+            width = min(augmentation.get(prefix + '_width', 0), size)
+            for _ in range(augmentation.get(prefix + '_masks', 0)):
+                # Random width and start of each mask, shape (N_sequences,)
+                widths = np.random.randint(0, width + 1, size=len(X))
+                starts = np.random.randint(0, size - widths + 1)
+                index = np.arange(size)
+                mask = ((index >= starts[:, np.newaxis]) &
+                        (index < (starts + widths)[:, np.newaxis]))
+                mask &= selected[:, np.newaxis]
+                shape = [len(X)] + [1]*(X.ndim - 1)
+                shape[axis] = size
+                X = np.where(np.reshape(mask, shape), value, X)
+        return X
+
+    def _mixup(self, X, Y, alpha, selected):
+        """ Mixes the selected sequences with other random sequences.
+
+        The inputs and outputs are mixed with the same weights
+        (drawn from a Beta(alpha, alpha) distribution).
+
+        """
+        n_sequences = len(X[0])
+        permutation = np.random.permutation(n_sequences)
+        weights = np.random.beta(alpha, alpha, size=n_sequences)
+        weights[~selected] = 1.0
+
+        def mix(data):
+            shape = (n_sequences,) + (1,)*(data.ndim - 1)
+            w = np.reshape(weights, shape).astype(data.dtype)
+            return w*data + (1 - w)*data[permutation]
+
+        X = [mix(Xj) for Xj in X]
+        Y = [mix(Yj) for Yj in Y]
+        return X, Y
 
 
 class AugmentedDataset(Dataset):
@@ -150,16 +420,33 @@ class AugmentedDataset(Dataset):
         self.dataset.generate_file_lists()
         self.file_lists = self.dataset.file_lists.copy()
 
-    def process(self):
+    def process(self, n_jobs=1, chunksize=8):
         """ Generate augmentated data for each file in dataset.
 
         Replicate the folder structure of {DATASET_PATH}/audio/original
         into the folder of each augmentation folder.
 
+        The files that already exist in the augmentation folders are
+        skipped, so an interrupted process can be resumed. The pairs
+        (augmentation, file) are distributed over a pool of processes
+        if n_jobs is not 1.
+
+        Parameters
+        ----------
+        n_jobs : int, optional
+            Number of worker processes. If -1, use all the available CPUs.
+        chunksize : int, optional
+            Number of files sent to each worker at once.
+
+        Returns
+        -------
+        dict
+            Throughput information (see dcase_models.util.ui.throughput).
+
         """
         if not self.dataset.check_sampling_rate(self.sr):
             print("Changing sampling rate ...")
-            self.dataset.change_sampling_rate(self.sr)
+            self.dataset.change_sampling_rate(self.sr, n_jobs=n_jobs)
             print('Done!')
 
         # Get path to the original audio files and list of
@@ -168,6 +455,8 @@ class AugmentedDataset(Dataset):
         path_original = sub_folders[0]
         paths_augments = sub_folders[1:]
 
+        files_original = list_wav_files(path_original)
+        args_list = []
         for index in range(len(self.augmentations_list)):
             augmentation = self.augmentations_list[index]
             path_augmented = paths_augments[index]
@@ -176,15 +465,20 @@ class AugmentedDataset(Dataset):
             # the augmented folder.
             duplicate_folder_structure(path_original, path_augmented)
             # Process each file in path_original
-            for path_to_file in progressbar(list_wav_files(path_original)):
+            for path_to_file in files_original:
                 path_to_destination = path_to_file.replace(
                     path_original, path_augmented
                 )
                 if os.path.exists(path_to_destination):
                     continue
-                augmentation['transformer'].build(
-                    path_to_file, path_to_destination
-                )
+                args_list.append((augmentation['transformer'],
+                                  path_to_file, path_to_destination))
+
+        start_time = time.time()
+        durations = parallel_map(_augment_file, args_list, n_jobs=n_jobs,
+                                 chunksize=chunksize)
+        return throughput(len(args_list), time.time() - start_time,
+                          audio_time=sum(durations))
 
     def get_audio_paths(self, sr=None):
         """ Returns a list of paths to the folders that include the dataset
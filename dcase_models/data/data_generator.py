@@ -2,11 +2,16 @@ import os
 import numpy as np
 import inspect
 import random
+import time
+from multiprocessing import Pool
+from multiprocessing.pool import ThreadPool
 
 from keras.utils import Sequence
 
 from .feature_extractor import FeatureExtractor
 from .dataset_base import Dataset
+from .feature_store import FeatureStore, load_features
+from .data_augmentation import OnlineAugmentation
 # from .data_augmentation import AugmentedDataset
 
 
@@ -45,6 +50,7 @@ class DataGenerator():
         batch_size means the number of instances (sequences in DCASE-models)
         used in each training step. Here batch_size is the number of files,
         and therefore, the number of sequences varies in each batch.
+        If sampling is 'sequences', batch_size is the number of sequences.
 
     shuffle: bool, default=True
         When training a model, it is typical to shuffle the dataset at the end
@@ -69,6 +75,56 @@ class DataGenerator():
     scaler_outputs : Scaler or None, default=None
         Same as scaler but for the system outputs.
 
+    store : {'files', 'memmap'}, default='files'
+        Storage of the features. If 'files', the features of each file are
+        loaded from its own npy file. If 'memmap', the features are read as
+        slices of the FeatureStore of each features subfolder. In this case
+        the features have to be extracted with store='memmap'
+        (see FeatureExtractor.extract()).
+
+    cache : {None, 'memory'}, default=None
+        If 'memory', the features and annotations of all the files are
+        loaded and scaled once, and stored in packed arrays in memory.
+        Then, the batches are served from these arrays instead of
+        loading the files in each epoch.
+
+    cache_size : float or None, default=None
+        Maximum size (in MB) of the memory cache. If the data does not fit
+        in the cache, the remaining files are loaded from disk in each
+        batch. If None, there is no limit.
+
+    augmentations : list of dict or None, default=None
+        List of augmentations applied in memory to each batch when train
+        is True (see OnlineAugmentation). The augmented data is not
+        stored. Waveform augmentations (e.g. pitch_shift) load the audio
+        file and calculate the features of the augmented signal, so the
+        outputs have to be annotations (str). Feature augmentations
+        (e.g. spec_masking, mixup) are applied to the scaled features.
+        e.g.::
+
+            [
+                {'type': 'pitch_shift', 'n_semitones': [-2, 2],
+                 'probability': 0.5},
+                {'type': 'mixup', 'alpha': 0.2}
+            ]
+
+    sampling : {'files', 'sequences'}, default='files'
+        If 'files', each batch includes all the sequences of batch_size
+        files. If 'sequences', each batch includes batch_size sequences
+        drawn from an index of (file, sequence) pairs built at
+        construction (see build_sequence_index()), so all the batches have
+        the same size. The last batch is completed with the first
+        sequences of the epoch. Note that len() is then the number of
+        batches of sequences instead of batches of files.
+        Only available if train is True.
+
+    balanced : bool, default=False
+        If True and sampling is 'sequences', the sequences of each epoch are
+        drawn (with replacement) with a probability inversely proportional
+        to the frequency of their class, so each class appears in the
+        batches with the same frequency. The class of each sequence is
+        the argmax of its annotations.
+
     Attributes
     ----------
     audio_file_list : list of dict
@@ -85,6 +141,23 @@ class DataGenerator():
                 ...
             ]
 
+    memory_cache : dict or None
+        Packed arrays of the memory cache and the index of each file.
+        Defined in build_cache().
+
+    sequence_index : ndarray or None
+        Array of (file, sequence) pairs, shape (N_sequences, 2). The files
+        are indexes of sequence_files. Defined in build_sequence_index()
+        if sampling is 'sequences'.
+
+    sequence_files : list of dict
+        List of files referenced by sequence_index (a copy of
+        audio_file_list that is not shuffled).
+
+    sequence_labels : ndarray or None
+        Class of each sequence of sequence_index. Defined if balanced is
+        True.
+
 
     See Also
     --------
@@ -136,7 +209,9 @@ class DataGenerator():
     def __init__(self, dataset, inputs, folds,
                  outputs='annotations',
                  batch_size=32, shuffle=True,
-                 train=True, scaler=None, scaler_outputs=None):
+                 train=True, scaler=None, scaler_outputs=None,
+                 store='files', cache=None, cache_size=None,
+                 augmentations=None, sampling='files', balanced=False):
         """ Initialize the DataGenerator.
 
         Generates the audio_file_list by concatenating all the files
@@ -156,6 +231,34 @@ class DataGenerator():
         self.train = train
         self.scaler = scaler
         self.scaler_outputs = scaler_outputs
+        self.store = store
+        self.feature_stores = {}
+        self.cache = cache
+        self.cache_size = cache_size
+        self.memory_cache = None
+        self.sampling = sampling
+        self.balanced = balanced
+        self.sequence_index = None
+        self.sequence_files = []
+        self.sequence_labels = None
+        self.sequence_order = None
+
+        if store not in ['files', 'memmap']:
+            raise AttributeError('store has to be files or memmap')
+
+        if cache not in [None, 'memory']:
+            raise AttributeError('cache has to be None or memory')
+
+        if sampling not in ['files', 'sequences']:
+            raise AttributeError('sampling has to be files or sequences')
+
+        if (sampling == 'sequences') and (not train):
+            raise AttributeError(
+                'sampling by sequences is only available if train is True')
+
+        if balanced and (sampling != 'sequences'):
+            raise AttributeError(
+                'balanced is only available if sampling is sequences')
 
         if (Dataset not in inspect.getmro(dataset.__class__)):
             raise AttributeError(
@@ -196,6 +299,15 @@ class DataGenerator():
                                         instance of FeatureExtractor
                                         or similar''')
 
+        self.augmentation = None
+        if train and (augmentations is not None):
+            self.augmentation = OnlineAugmentation(augmentations, sr=self.sr)
+            if (self.augmentation.has_waveform_augmentations() and
+               any([type(output) is not str for output in self.outputs])):
+                raise AttributeError(
+                    'Waveform augmentations can only be used when the '
+                    'outputs are annotations')
+
         # self.features_file_list = []
         self.audio_file_list = []
 
@@ -221,7 +333,10 @@ class DataGenerator():
                 # )
                 # self.features_file_list.extend(file_features)
 
-        if shuffle:
+        if sampling == 'sequences':
+            self.build_sequence_index()
+
+        if shuffle or balanced:
             self.shuffle_list()
 
         self.data = {}
@@ -251,10 +366,8 @@ class DataGenerator():
 
             for j, input in enumerate(self.inputs):
                 if type(input) is not str:
-                    features_path = input.get_features_path(self.dataset)
-                    file_features = self.convert_audio_path_to_features_path(
-                        file_original, features_path, subfolder=sub_folder)
-                    features = np.load(file_features)
+                    features = self.load_features(
+                        input, file_original, sub_folder)
                     inputs_lists[j].append(features)
                 else:
                     raise AttributeError('Not available')
@@ -262,23 +375,66 @@ class DataGenerator():
 
             for j, output in enumerate(self.outputs):
                 if type(output) is not str:
-                  #  print(output)
-                    features_path = output.get_features_path(self.dataset)
-                    file_features = self.convert_audio_path_to_features_path(
-                        file_original, features_path, subfolder=sub_folder)
-                    features = np.load(file_features)
-                   # print(features.shape)
+                    features = self.load_features(
+                        output, file_original, sub_folder)
                     outputs_lists[j].append(features)
                 else:
                     # TODO: Add option to other outputs
-                    y = self.dataset.get_annotations(
+                    y = self.dataset.get_annotations_cached(
                         file_original, inputs_lists[0][-1],
                         self.time_resolution)
                     outputs_lists[j].append(y)
                     # TODO: Improve how we pass features array to get_ann..
 
+            if 'sequences' in file_dict:
+                # Only the sequences drawn from the sequence index
+                for data_lists in inputs_lists + outputs_lists:
+                    data_lists[-1] = data_lists[-1][file_dict['sequences']]
+
         return inputs_lists, outputs_lists
 
+    def load_features(self, feature_extractor, file_original, sub_folder):
+        """ Loads the features of an audio file.
+
+        Parameters
+        ----------
+        feature_extractor : FeatureExtractor
+            Feature extractor used to calculate the features.
+        file_original : str
+            Path to the original audio file.
+        sub_folder : str
+            Subfolder of the (maybe augmented) audio file.
+            e.g. 'original'
+
+        Returns
+        -------
+        ndarray
+            Features of the audio file. If the features were saved
+            with store_frames=True, the sequences are read-only
+            views of the frames (see FeatureExtractor.frames_to_sequences()).
+
+        """
+        features_path = feature_extractor.get_features_path(self.dataset)
+        file_features = self.convert_audio_path_to_features_path(
+            file_original, features_path, subfolder=sub_folder)
+        if self.store == 'files':
+            # Only some sequences are read when sampling by sequences
+            mmap_mode = 'r' if self.sampling == 'sequences' else None
+            features = load_features(file_features, mmap_mode=mmap_mode)
+        else:
+            features_path_sub = os.path.join(features_path, sub_folder)
+            if features_path_sub not in self.feature_stores:
+                feature_store = FeatureStore(features_path_sub)
+                feature_store.open()
+                self.feature_stores[features_path_sub] = feature_store
+            features = self.feature_stores[features_path_sub].get(
+                os.path.relpath(file_features, features_path_sub))
+
+        if feature_extractor.store_frames:
+            # Sequences as strided views of the frame-level features
+            features = feature_extractor.frames_to_sequences(features)
+        return features
+
     def get_data(self):
         """ Return all data from the selected folds.
 
@@ -294,41 +450,148 @@ class DataGenerator():
             List or array of annotations for each file.
 
         """
-        X_list, Y_list = self._data_generation(self.audio_file_list)
+        return self.get_data_from_list(self.audio_file_list)
 
-        if self.scaler is not None:
-            X_list = self.scaler.transform(X_list)
-        if self.scaler_outputs is not None:
-            Y_list = self.scaler_outputs.transform(Y_list)
+    def get_data_batch(self, index):
+        """ Return the data from the batch given by argument.
 
-        X = [[] for _ in range(len(self.inputs))]
-        Y = [[] for _ in range(len(self.outputs))]
+        If train were set as True, the output is concatenated and
+        converted to a numpy array. Otherwise the outputs are lists whose
+        elements are the features of each file.
 
-        for j in range(len(self.inputs)):
-            if self.train:
-                X[j] = np.concatenate(X_list[j], axis=0)
-            else:
-                X[j] = X_list[j].copy()
+        Returns
+        -------
+        X : list or ndarray
+            List or array of features for each file.
+        Y : list or ndarray
+            List or array of annotations for each file.
 
-        for j in range(len(self.outputs)):
-            if self.train:
-                Y[j] = np.concatenate(Y_list[j], axis=0)
+        """
+        return self.get_data_from_list(self.get_batch_files(index))
+
+    def get_batch_files(self, index):
+        """ Return the list of files of the batch given by argument.
+
+        If sampling is 'sequences', each file of the batch includes
+        the indexes of its sequences drawn for the batch in
+        the 'sequences' key.
+
+        Returns
+        -------
+        list of dict
+            Slice of audio_file_list for the batch.
+
+        """
+        if self.sampling != 'sequences':
+            return self.audio_file_list[
+                index*self.batch_size:(index+1)*self.batch_size
+            ]
+
+        # Positions of the batch in the order of the epoch. The last
+        # batch is completed with the first sequences.
+        positions = np.arange(
+            index*self.batch_size, (index+1)*self.batch_size
+        ) % len(self.sequence_order)
+        pairs = self.sequence_index[self.sequence_order[positions]]
+        sequences = {}
+        for file_index, sequence in pairs:
+            if file_index not in sequences:
+                sequences[file_index] = []
+            sequences[file_index].append(sequence)
+        list_files = []
+        for file_index in sequences:
+            file_dict = self.sequence_files[file_index].copy()
+            file_dict['sequences'] = np.array(sequences[file_index])
+            list_files.append(file_dict)
+        return list_files
+
+    def get_sequences_per_file(self, list_files):
+        """ Returns the number of sequences of each file in list_files.
+
+        The number of sequences is taken from the manifest of the features
+        of the first input (see FeatureExtractor.extract()) or, if it is
+        not available, by loading the features.
+
+        Parameters
+        ----------
+        list_files : list of dict
+            List of files with the same format of audio_file_list.
+
+        Returns
+        -------
+        ndarray
+            Number of sequences of each file.
+
+        """
+        feature_extractor = self.inputs[0]
+        features_path = feature_extractor.get_features_path(self.dataset)
+        manifests = {}
+        n_sequences = np.zeros(len(list_files), dtype=int)
+        for k, file_dict in enumerate(list_files):
+            sub_folder = file_dict['sub_folder']
+            if sub_folder not in manifests:
+                manifests[sub_folder] = feature_extractor.load_manifest(
+                    os.path.join(features_path, sub_folder))
+            key = os.path.relpath(
+                file_dict['file_original'], self.dataset.audio_path)
+            entry = manifests[sub_folder].get(key, {})
+            if 'shape' in entry:
+                n_sequences[k] = entry['shape'][0]
+                if feature_extractor.store_frames:
+                    n_sequences[k] = feature_extractor.get_number_of_sequences(
+                        n_sequences[k])
             else:
-                Y[j] = Y_list[j].copy()
+                n_sequences[k] = len(self.load_features(
+                    feature_extractor, file_dict['file_original'],
+                    sub_folder))
 
-        if len(X) == 1:
-            X = X[0]
-        if len(Y) == 1:
-            Y = Y[0]
+        return n_sequences
 
-        return X, Y
+    def build_sequence_index(self):
+        """ Builds the index of (file, sequence) pairs.
 
-    def get_data_batch(self, index):
-        """ Return the data from the batch given by argument.
+        The number of sequences of each file is given by
+        get_sequences_per_file().
 
-        If train were set as True, the output is concatenated and
-        converted to a numpy array. Otherwise the outputs are lists whose
-        elements are the features of each file.
+        If balanced is True, the annotations of each file are loaded
+        to get the class of each sequence.
+
+        """
+        self.sequence_files = list(self.audio_file_list)
+        n_sequences = self.get_sequences_per_file(self.sequence_files)
+
+        self.sequence_index = np.zeros((np.sum(n_sequences), 2), dtype=int)
+        self.sequence_index[:, 0] = np.repeat(
+            np.arange(len(n_sequences)), n_sequences)
+        offsets = np.cumsum(n_sequences) - n_sequences
+        self.sequence_index[:, 1] = (np.arange(len(self.sequence_index)) -
+                                     np.repeat(offsets, n_sequences))
+        self.sequence_order = np.arange(len(self.sequence_index))
+
+        if not self.balanced:
+            return
+        if type(self.outputs[0]) is not str:
+            raise AttributeError(
+                'balanced is only available if the outputs are annotations')
+        labels = []
+        for k, file_dict in enumerate(self.sequence_files):
+            # Only the length of the features is used
+            features = np.zeros((n_sequences[k], 1))
+            y = self.dataset.get_annotations_cached(
+                file_dict['file_original'], features, self.time_resolution)
+            labels.append(np.argmax(y, axis=1))
+        self.sequence_labels = np.concatenate(labels)
+
+    def get_data_from_list(self, list_files):
+        """ Return the data from the files in list_files.
+
+        Load the features and annotations, apply the scalers and, if train
+        were set as True, concatenate the output.
+
+        Parameters
+        ----------
+        list_files : list of dict
+            List of files with the same format of audio_file_list.
 
         Returns
         -------
@@ -338,16 +601,23 @@ class DataGenerator():
             List or array of annotations for each file.
 
         """
-        list_file_batch = self.audio_file_list[
-            index*self.batch_size:(index+1)*self.batch_size
-        ]
-        # Generate data
-        X_list, Y_list = self._data_generation(list_file_batch)
+        waveform_augmentations = (
+            (self.augmentation is not None) and
+            self.augmentation.has_waveform_augmentations())
+        # If the data is concatenated, the scalers are applied
+        # once to the whole batch
+        scale_batch = (self.train and (self.cache != 'memory') and
+                       (not waveform_augmentations) and
+                       (not self._has_instance_normalizers()))
 
-        if self.scaler is not None:
-            X_list = self.scaler.transform(X_list)
-        if self.scaler_outputs is not None:
-            Y_list = self.scaler_outputs.transform(Y_list)
+        # Generate data
+        if scale_batch:
+            X_list, Y_list = self._data_generation(list_files)
+        else:
+            X_list, Y_list = self._load_data(list_files)
+        if waveform_augmentations:
+            X_list, Y_list = self._augment_waveforms(
+                list_files, X_list, Y_list)
 
         X = [[] for _ in range(len(self.inputs))]
         Y = [[] for _ in range(len(self.outputs))]
@@ -364,6 +634,12 @@ class DataGenerator():
             else:
                 Y[j] = Y_list[j].copy()
 
+        if scale_batch:
+            X, Y = self._scale(X, Y)
+
+        if self.augmentation is not None:
+            X, Y = self.augmentation.apply_features(X, Y)
+
         if len(X) == 1:
             X = X[0]
         if len(Y) == 1:
@@ -371,6 +647,218 @@ class DataGenerator():
 
         return X, Y
 
+    def _augment_waveforms(self, list_files, X_list, Y_list):
+        """ Replaces the data of the files drawn to be augmented.
+
+        The audio signal of each of these files is augmented in memory
+        and its features and annotations are calculated and scaled.
+
+        Parameters
+        ----------
+        list_files : list of dict
+            List of files with the same format of audio_file_list.
+        X_list : list of list of ndarray
+            Features of each file for each input (from _load_data()).
+        Y_list : list of list of ndarray
+            Annotations of each file for each output (from _load_data()).
+
+        Returns
+        -------
+        X_list : list of list of ndarray
+            Features of each file for each input.
+        Y_list : list of list of ndarray
+            Annotations of each file for each output.
+
+        """
+        audio_path, _ = self.dataset.get_audio_paths(self.sr)
+        for k, file_dict in enumerate(list_files):
+            augmentations = self.augmentation.draw_waveform_augmentations()
+            if len(augmentations) == 0:
+                continue
+            file_original = file_dict['file_original']
+            file_audio = file_original.replace(
+                self.dataset.audio_path,
+                os.path.join(audio_path, file_dict['sub_folder']))
+            audio = self.inputs[0].load_audio(file_audio)
+            audio = self.augmentation.apply_audio(audio, augmentations)
+
+            X_file = []
+            for inp in self.inputs:
+                features = inp.calculate_from_audio(audio)
+                if inp.store_frames:
+                    features = inp.frames_to_sequences(features)
+                X_file.append([features])
+            Y_file = [[self.dataset.get_annotations(
+                file_original, X_file[0][0], self.time_resolution)]
+                for _ in self.outputs]
+            X_file, Y_file = self._scale(X_file, Y_file)
+
+            if 'sequences' in file_dict:
+                # The number of sequences can change (e.g. time_stretching)
+                for data_file in X_file + Y_file:
+                    sequences = file_dict['sequences'] % len(data_file[0])
+                    data_file[0] = data_file[0][sequences]
+
+            for j in range(len(self.inputs)):
+                X_list[j][k] = X_file[j][0]
+            for j in range(len(self.outputs)):
+                Y_list[j][k] = Y_file[j][0]
+
+        return X_list, Y_list
+
+    def _load_data(self, list_files):
+        """ Returns the scaled features and annotations of list_files.
+
+        If cache is 'memory', the data is taken from the memory cache.
+        Otherwise (or if the files are not cached) the data is loaded
+        from disk and scaled.
+
+        Parameters
+        ----------
+        list_files : list of dict
+            List of files with the same format of audio_file_list.
+
+        Returns
+        -------
+        features_list : list of ndarray
+            List of features for each file.
+        annotations : list of ndarray
+            List of annotations matrix for each file.
+
+        """
+        if self.cache != 'memory':
+            return self._scale(*self._data_generation(list_files))
+
+        if self.memory_cache is None:
+            self.build_cache()
+
+        index = self.memory_cache['index']
+        list_files_disk = [
+            file_dict for file_dict in list_files
+            if self._cache_key(file_dict) not in index
+        ]
+        if len(list_files_disk) > 0:
+            X_disk, Y_disk = self._scale(
+                *self._data_generation(list_files_disk))
+
+        inputs_lists = [[] for _ in range(len(self.inputs))]
+        outputs_lists = [[] for _ in range(len(self.outputs))]
+        k = 0
+        for file_dict in list_files:
+            key = self._cache_key(file_dict)
+            if key in index:
+                slices_inputs, slices_outputs = index[key]
+                sequences = file_dict.get('sequences', slice(None))
+                for j, (start, end) in enumerate(slices_inputs):
+                    inputs_lists[j].append(
+                        self.memory_cache['inputs'][j][start:end][sequences])
+                for j, (start, end) in enumerate(slices_outputs):
+                    outputs_lists[j].append(
+                        self.memory_cache['outputs'][j][start:end][sequences])
+            else:
+                for j in range(len(self.inputs)):
+                    inputs_lists[j].append(X_disk[j][k])
+                for j in range(len(self.outputs)):
+                    outputs_lists[j].append(Y_disk[j][k])
+                k += 1
+
+        return inputs_lists, outputs_lists
+
+    def _scale(self, X_list, Y_list):
+        """ Applies the scalers to the outputs of _data_generation().
+
+        The arrays are scaled in place if they are writable. The read-only
+        arrays (e.g. memory maps and cached annotations) are copied.
+
+        """
+        if self.scaler is not None:
+            X_list = self.scaler.transform(X_list, inplace=True)
+        if self.scaler_outputs is not None:
+            Y_list = self.scaler_outputs.transform(Y_list, inplace=True)
+        return X_list, Y_list
+
+    def _has_instance_normalizers(self):
+        """ Checks if the scalers normalize each file independently.
+
+        """
+        return any([
+            scaler.has_instance_normalizers()
+            for scaler in [self.scaler, self.scaler_outputs]
+            if scaler is not None
+        ])
+
+    def _cache_key(self, file_dict):
+        """ Returns the key of a file in the memory cache.
+
+        """
+        return (file_dict['file_original'], file_dict['sub_folder'])
+
+    def build_cache(self):
+        """ Loads and scales the data of audio_file_list into memory.
+
+        The features (and annotations) of all the files are concatenated
+        in one array for each input (and output). The range of rows of
+        each file is stored in an index. If the size of the data
+        exceeds cache_size, the remaining files are not cached and will be
+        loaded from disk.
+
+        """
+        max_bytes = np.inf
+        if self.cache_size is not None:
+            max_bytes = self.cache_size * 2**20
+
+        inputs_lists = [[] for _ in range(len(self.inputs))]
+        outputs_lists = [[] for _ in range(len(self.outputs))]
+        offsets_inputs = [0]*len(self.inputs)
+        offsets_outputs = [0]*len(self.outputs)
+        index = {}
+        n_bytes = 0
+        for file_dict in self.audio_file_list:
+            key = self._cache_key(file_dict)
+            if key in index:
+                continue
+            X_list, Y_list = self._scale(*self._data_generation([file_dict]))
+            file_bytes = (sum([X[0].nbytes for X in X_list]) +
+                          sum([Y[0].nbytes for Y in Y_list]))
+            if n_bytes + file_bytes > max_bytes:
+                break
+            n_bytes += file_bytes
+
+            slices_inputs = []
+            for j in range(len(self.inputs)):
+                inputs_lists[j].append(X_list[j][0])
+                end = offsets_inputs[j] + len(X_list[j][0])
+                slices_inputs.append((offsets_inputs[j], end))
+                offsets_inputs[j] = end
+            slices_outputs = []
+            for j in range(len(self.outputs)):
+                outputs_lists[j].append(Y_list[j][0])
+                end = offsets_outputs[j] + len(Y_list[j][0])
+                slices_outputs.append((offsets_outputs[j], end))
+                offsets_outputs[j] = end
+            index[key] = (slices_inputs, slices_outputs)
+
+        self.memory_cache = {
+            'inputs': [np.concatenate(X, axis=0) if len(X) > 0 else None
+                       for X in inputs_lists],
+            'outputs': [np.concatenate(Y, axis=0) if len(Y) > 0 else None
+                        for Y in outputs_lists],
+            'index': index,
+            'scaler': self.scaler,
+            'scaler_outputs': self.scaler_outputs,
+            'n_bytes': n_bytes
+        }
+        # The batches are views of the cache in test mode
+        for data in self.memory_cache['inputs'] + self.memory_cache['outputs']:
+            if data is not None:
+                data.flags.writeable = False
+
+    def clear_cache(self):
+        """ Removes the data from the memory cache.
+
+        """
+        self.memory_cache = None
+
     def get_data_from_file(self, file_index):
         """ Returns the data from the file index given by argument.
 
@@ -383,11 +871,7 @@ class DataGenerator():
 
         """
         # Generate data
-        X, Y = self._data_generation([self.audio_file_list[file_index]])
-        if self.scaler is not None:
-            X = self.scaler.transform(X)
-        if self.scaler_outputs is not None:
-            Y = self.scaler_outputs.transform(Y)
+        X, Y = self._load_data([self.audio_file_list[file_index]])
 
         if len(X) == 1:
             X = X[0]
@@ -489,6 +973,9 @@ class DataGenerator():
     def shuffle_list(self):
         """ Shuffles features_file_list.
 
+        If sampling is 'sequences', the order of the sequences of the
+        epoch is also shuffled (or drawn again if balanced is True).
+
         Notes
         -----
         Only shuffle the list if shuffle is True.
@@ -497,29 +984,152 @@ class DataGenerator():
         if self.shuffle:
             random.shuffle(self.audio_file_list)
 
+        if self.sampling != 'sequences':
+            return
+        n_sequences = len(self.sequence_index)
+        if self.balanced:
+            counts = np.bincount(self.sequence_labels)
+            probabilities = 1. / counts[self.sequence_labels]
+            probabilities /= np.sum(probabilities)
+            self.sequence_order = np.random.choice(
+                n_sequences, n_sequences, p=probabilities)
+        elif self.shuffle:
+            self.sequence_order = np.random.permutation(n_sequences)
+
     def __len__(self):
         """ Get the number of batches.
 
+        Returns
+        -------
+        int
+            Number of batches of the epoch: ceil(N_files / batch_size) if
+            sampling is 'files', or ceil(N_sequences / batch_size) if
+            sampling is 'sequences'.
+
         """
+        if self.sampling == 'sequences':
+            return int(np.ceil(len(self.sequence_index) / self.batch_size))
         return int(np.ceil(len(self.audio_file_list) / self.batch_size))
 
     def set_scaler(self, scaler):
         """ Set scaler object.
 
+        If the memory cache was built without scaler, its data is
+        scaled in place. Otherwise the cache is cleared.
+
         """
         self.scaler = scaler
+        self._update_cache_scaler('inputs', 'scaler', scaler)
 
     def set_scaler_outputs(self, scaler_outputs):
         """ Set scaler object.
 
         """
         self.scaler_outputs = scaler_outputs
+        self._update_cache_scaler('outputs', 'scaler_outputs', scaler_outputs)
+
+    def _update_cache_scaler(self, data_key, scaler_key, scaler):
+        """ Helper of set_scaler() and set_scaler_outputs().
+
+        """
+        if ((self.memory_cache is None) or
+           (self.memory_cache[scaler_key] is scaler)):
+            return
+        if ((self.memory_cache[scaler_key] is not None) or
+           any([data is None for data in self.memory_cache[data_key]]) or
+           scaler.has_instance_normalizers()):
+            # The cache is built again
+            self.clear_cache()
+            return
+        # The cache owns its arrays, so they are scaled in place
+        for data in self.memory_cache[data_key]:
+            data.flags.writeable = True
+        self.memory_cache[data_key] = scaler.transform(
+            self.memory_cache[data_key], inplace=True)
+        for data in self.memory_cache[data_key]:
+            data.flags.writeable = False
+        self.memory_cache[scaler_key] = scaler
+
+
+_worker_data_gen = None
+
+
+def _init_worker(data_generator):
+    """ Helper of KerasDataGenerator.
+
+    Stores the DataGenerator in each worker process.
+
+    """
+    global _worker_data_gen
+    _worker_data_gen = data_generator
+    np.random.seed()
+
+
+def _load_batch(list_files, data_generator=None):
+    """ Helper of KerasDataGenerator. Loads the data of a batch.
+
+    If data_generator is None, use the DataGenerator of the
+    worker process.
+
+    """
+    if data_generator is None:
+        data_generator = _worker_data_gen
+    return data_generator.get_data_from_list(list_files)
 
 
 class KerasDataGenerator(Sequence):
+    """ Keras Sequence to feed a model from a DataGenerator.
+
+    The next batches can be loaded in background by a pool of worker
+    threads (or processes) while the model is trained on the current one.
+
+    Parameters
+    ----------
+    data_generator : DataGenerator
+        Instance of the DataGenerator.
+
+    workers : int, default=1
+        Number of worker threads (or processes) used to load the batches.
+
+    max_queue_size : int, default=0
+        Number of batches that are loaded in advance. If 0, each batch is
+        loaded when it is requested (no prefetching).
+
+    use_multiprocessing : bool, default=False
+        If True, the workers are processes instead of threads. Note that
+        the DataGenerator is copied to each process.
+
+    verbose : bool, default=False
+        If True, print the time waited for data at the end of each epoch.
+
+    Attributes
+    ----------
+    wait_time : float
+        Time (in seconds) waited for data in the current epoch.
+
+    n_batches : int
+        Number of batches requested in the current epoch.
+
+    stats : list of dict
+        Wait time and number of batches of each finished epoch.
+        e.g. [{'wait_time': 2.1, 'batches': 100}, ...]
+
+    """
 
-    def __init__(self, data_generator):
+    def __init__(self, data_generator, workers=1, max_queue_size=0,
+                 use_multiprocessing=False, verbose=False):
         self.data_gen = data_generator
+        self.workers = workers
+        self.max_queue_size = max_queue_size
+        self.use_multiprocessing = use_multiprocessing
+        self.verbose = verbose
+
+        self.pool = None
+        self.pending = {}
+        self.wait_time = 0.0
+        self.n_batches = 0
+        self.stats = []
+
         self.data_gen.shuffle_list()
 
     def __len__(self):
@@ -528,9 +1138,67 @@ class KerasDataGenerator(Sequence):
 
     def __getitem__(self, index):
         'Generate one batch of data'
-        # Generate indexes of the batch
-        return self.data_gen.get_data_batch(index)
+        start_time = time.time()
+        if self.max_queue_size == 0:
+            batch = self.data_gen.get_data_batch(index)
+        else:
+            self._enqueue(index)
+            batch = self.pending.pop(index).get()
+        self.wait_time += time.time() - start_time
+        self.n_batches += 1
+        return batch
+
+    def _enqueue(self, index):
+        """ Submits the batches from index to index + max_queue_size.
+
+        """
+        if self.pool is None:
+            # Build the cache before starting the workers
+            if ((self.data_gen.cache == 'memory') and
+               (self.data_gen.memory_cache is None)):
+                self.data_gen.build_cache()
+            if self.use_multiprocessing:
+                self.pool = Pool(self.workers, initializer=_init_worker,
+                                 initargs=(self.data_gen,))
+            else:
+                self.pool = ThreadPool(self.workers)
+
+        # Discard batches that are not going to be requested
+        for old_index in [j for j in self.pending if j < index]:
+            self.pending.pop(old_index).wait()
+
+        data_generator = None if self.use_multiprocessing else self.data_gen
+        last_index = min(index + self.max_queue_size, len(self) - 1)
+        for next_index in range(index, last_index + 1):
+            if next_index in self.pending:
+                continue
+            list_files = self.data_gen.get_batch_files(next_index)
+            self.pending[next_index] = self.pool.apply_async(
+                _load_batch, (list_files, data_generator))
 
     def on_epoch_end(self):
         'Updates indexes after each epoch'
+        # Wait for the pending batches before shuffling the file list
+        for result in self.pending.values():
+            result.wait()
+        self.pending = {}
+
+        self.stats.append(
+            {'wait_time': self.wait_time, 'batches': self.n_batches})
+        if self.verbose:
+            print('Waited %.2f s for data in %d batches' % (
+                self.wait_time, self.n_batches))
+        self.wait_time = 0.0
+        self.n_batches = 0
+
         self.data_gen.shuffle_list()
+
+    def close(self):
+        """ Stops the worker threads (or processes).
+
+        """
+        if self.pool is not None:
+            self.pool.terminate()
+            self.pool.join()
+            self.pool = None
+        self.pending = {}
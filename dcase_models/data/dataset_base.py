@@ -1,10 +1,21 @@
 import os
-import sox
+import numpy as np
+from collections import OrderedDict
 
 from ..util.files import download_files_and_unzip
 from ..util.files import duplicate_folder_structure
 from ..util.files import list_wav_files, list_all_files
-from ..util.ui import progressbar
+from ..util.files import save_pickle, load_pickle
+from ..util.files import save_json, load_json
+from ..util.misc import parallel_map
+from .resampler import Resampler
+
+
+def _resample_file(resampler, sr, path_to_file, path_to_destination):
+    """ Helper of Dataset.change_sampling_rate(). Resamples one file.
+
+    """
+    resampler.resample_file(path_to_file, path_to_destination, sr)
 
 
 class Dataset():
@@ -36,6 +47,17 @@ class Dataset():
     label_list : list
         List of class labels.
         e.g. ['dog', 'siren', ...]
+    annotations_cache : OrderedDict
+        LRU cache of the annotations used by get_annotations_cached().
+    annotations_cache_size : int
+        Maximum number of annotations stored in annotations_cache.
+    annotations_stamps : dict
+        Stamp of the annotations of each file in annotations_cache
+        (see get_annotations_stamp()).
+    resampler : Resampler
+        Resampler used to change the sampling rate and format of the
+        audio files. By default, sox is used. Set Resampler('polyphase')
+        to resample in-process.
 
     Examples
     --------
@@ -83,6 +105,12 @@ class Dataset():
 
         self.dataset_path = dataset_path
         self.file_lists = {}
+        self.annotations_cache = OrderedDict()
+        self.annotations_cache_size = 100000
+        self.annotations_cache_hits = 0
+        self.annotations_cache_misses = 0
+        self.annotations_stamps = {}
+        self.resampler = Resampler()
         self.build()
 
     def build(self):
@@ -129,6 +157,201 @@ class Dataset():
         """
         pass
 
+    def get_annotations_files(self, file_path):
+        """ Returns the files from which the annotations of file_path are read.
+
+        Used to check if the annotations saved with save_annotations_cache()
+        are up to date. Override this method if get_annotations() reads
+        annotation files (e.g. a metadata csv file).
+
+        Parameters
+        ----------
+        file_path : str
+            Path to the file
+
+        Returns
+        -------
+        list of str
+            Paths to the annotation files. By default, an empty list (the
+            annotations only depend on the file name).
+
+        """
+        return []
+
+    def get_annotations_stamp(self, file_path):
+        """ Returns the stamp of the annotations of the file in file_path.
+
+        The stamp includes the label list and the size and modification
+        time of the annotation files (see get_annotations_files()).
+        The annotations saved with save_annotations_cache() are only
+        loaded if their stamp did not change.
+
+        Parameters
+        ----------
+        file_path : str
+            Path to the file
+
+        Returns
+        -------
+        tuple
+            Stamp of the annotations.
+
+        """
+        annotations_files = []
+        for annotations_file in self.get_annotations_files(file_path):
+            stat = os.stat(annotations_file)
+            annotations_files.append(
+                (os.path.relpath(annotations_file, self.dataset_path),
+                 stat.st_size, stat.st_mtime))
+        return (tuple(getattr(self, 'label_list', [])),
+                tuple(annotations_files))
+
+    def get_annotations_cached(self, file_path, features, time_resolution):
+        """ Returns the annotations of the file in file_path using a cache.
+
+        Calls get_annotations() only the first time that the annotations of
+        a file are requested for a given time_resolution and number of
+        frames. The annotations are stored in a LRU cache of size
+        annotations_cache_size and are returned as read-only arrays.
+
+        Parameters
+        ----------
+        file_path : str
+            Path to the file
+        features : ndarray
+            nD array with the features of file_path
+        time_resolution : float
+            Time resolution of the features
+
+        Returns
+        -------
+        ndarray
+            Annotations of the file file_path
+
+        """
+        key = (os.path.relpath(file_path, self.dataset_path),
+               time_resolution, len(features))
+        annotations = self.annotations_cache.get(key)
+        if annotations is not None:
+            self.annotations_cache_hits += 1
+            try:
+                self.annotations_cache.move_to_end(key)
+            except KeyError:
+                # removed by other thread
+                pass
+            return annotations
+
+        self.annotations_cache_misses += 1
+        if key[0] not in self.annotations_stamps:
+            self.annotations_stamps[key[0]] = self.get_annotations_stamp(
+                file_path)
+        annotations = np.asarray(
+            self.get_annotations(file_path, features, time_resolution))
+        annotations.flags.writeable = False
+        self.annotations_cache[key] = annotations
+        while len(self.annotations_cache) > self.annotations_cache_size:
+            try:
+                self.annotations_cache.popitem(last=False)
+            except KeyError:
+                break
+        return annotations
+
+    def annotations_cache_info(self):
+        """ Returns information about the annotations cache.
+
+        Returns
+        -------
+        dict
+            Dict with the number of hits, misses, and the current and
+            maximum size of the cache.
+
+        """
+        return {'hits': self.annotations_cache_hits,
+                'misses': self.annotations_cache_misses,
+                'size': len(self.annotations_cache),
+                'max_size': self.annotations_cache_size}
+
+    def get_annotations_cache_path(self):
+        """ Returns the path to the on-disk annotations cache.
+
+        Returns
+        -------
+        str
+            Path to the pickle file, i.e.
+            {self.dataset_path}/annotations_cache.pickle
+
+        """
+        return os.path.join(self.dataset_path, 'annotations_cache.pickle')
+
+    def save_annotations_cache(self, path=None):
+        """ Saves the annotations cache into a pickle file.
+
+        The cache is keyed by the path of the file (relative to
+        dataset_path), the time resolution and the number of frames,
+        so it can be reused in future runs with load_annotations_cache().
+        The stamp of the annotations of each file is saved as well
+        (see get_annotations_stamp()).
+
+        Parameters
+        ----------
+        path : str or None, optional
+            Path to the pickle file.
+            If None, use get_annotations_cache_path().
+
+        """
+        if path is None:
+            path = self.get_annotations_cache_path()
+        annotations_cache = dict(self.annotations_cache)
+        stamps = {key[0]: self.annotations_stamps[key[0]]
+                  for key in annotations_cache}
+        save_pickle({'annotations': annotations_cache, 'stamps': stamps},
+                    path)
+
+    def load_annotations_cache(self, path=None):
+        """ Loads a cache saved with save_annotations_cache().
+
+        Only the annotations whose stamp did not change are loaded
+        (e.g. the annotations of a file are discarded if its annotation
+        file was modified, see get_annotations_stamp()).
+
+        Parameters
+        ----------
+        path : str or None, optional
+            Path to the pickle file.
+            If None, use get_annotations_cache_path().
+
+        Returns
+        -------
+        bool
+            True if the cache file exists and was loaded.
+
+        """
+        if path is None:
+            path = self.get_annotations_cache_path()
+        if not os.path.exists(path):
+            return False
+        data = load_pickle(path)
+        if (type(data) is not dict) or ('stamps' not in data):
+            # Saved without stamps
+            return False
+        for key, annotations in data['annotations'].items():
+            file_key = key[0]
+            if file_key not in self.annotations_stamps:
+                file_path = os.path.join(self.dataset_path, file_key)
+                try:
+                    stamp = self.get_annotations_stamp(file_path)
+                except (OSError, KeyError, AttributeError):
+                    # The file or its annotations are not available
+                    continue
+                self.annotations_stamps[file_key] = stamp
+            if data['stamps'][file_key] != self.annotations_stamps[file_key]:
+                continue
+            annotations.flags.writeable = False
+            self.annotations_cache[key] = annotations
+        self.annotations_cache_size = max(
+            self.annotations_cache_size, len(self.annotations_cache))
+        return True
+
     def download(self, zenodo_url, zenodo_files, force_download=False):
         """ Downloads and decompresses the dataset from zenodo.
 
@@ -205,40 +428,106 @@ class Dataset():
 
         return audio_path, subfolders
 
-    def change_sampling_rate(self, new_sr):
+    def change_sampling_rate(self, new_sr, n_jobs=1, chunksize=16):
         """ Changes the sampling rate of each wav file in audio_path.
 
         Creates a new folder named audio_path{new_sr} (i.e audio22050)
         and converts each wav file in audio_path and save the result in
-        the new folder.
+        the new folder. The files that already exist in the new folder
+        are skipped. The files are converted by the resampler
+        of the dataset.
+
+        When all the files are converted, a manifest (resample.json)
+        is saved in the new folder, so check_sampling_rate() only has
+        to compare its list of files with the files in audio_path.
 
         Parameters
         ----------
         sr : int
             Sampling rate.
+        n_jobs : int, optional
+            Number of worker processes used to convert the files.
+            If -1, use all the available CPUs.
+        chunksize : int, optional
+            Number of files sent to each worker at once.
 
         """
         new_audio_path, subfolders = self.get_audio_paths(new_sr)
         new_audio_folder = subfolders[0]  # audio22050/original
         duplicate_folder_structure(self.audio_path, new_audio_folder)
 
-        tfm = sox.Transformer()
-        tfm.convert(samplerate=new_sr)
+        # The manifest is saved again when all the files are converted
+        manifest_file = self.get_resample_manifest_path(new_sr)
+        if os.path.exists(manifest_file):
+            os.remove(manifest_file)
 
-        for path_to_file in progressbar(list_wav_files(self.audio_path)):
+        files_audio = list_wav_files(self.audio_path)
+        args_list = []
+        for path_to_file in files_audio:
             path_to_destination = path_to_file.replace(
                 self.audio_path, new_audio_folder
             )
             if os.path.exists(path_to_destination):
                 continue
-            tfm.build(path_to_file, path_to_destination)
+            args_list.append(
+                (self.resampler, new_sr, path_to_file, path_to_destination))
+
+        parallel_map(_resample_file, args_list, n_jobs=n_jobs,
+                     chunksize=chunksize)
+
+        self.save_resample_manifest(new_sr, files_audio)
+
+    def get_resample_manifest_path(self, sr):
+        """ Returns the path to the manifest of the resampled files.
+
+        Parameters
+        ----------
+        sr : int
+            Sampling rate.
+
+        Returns
+        -------
+        str
+            Path to the manifest, i.e. {audio_path}{sr}/original/resample.json
+
+        """
+        audio_path, subfolders = self.get_audio_paths(sr)
+        return os.path.join(subfolders[0], 'resample.json')
+
+    def save_resample_manifest(self, sr, files_audio):
+        """ Saves the manifest of the resampled files.
+
+        Parameters
+        ----------
+        sr : int
+            Sampling rate.
+        files_audio : list of str
+            Paths to the original audio files that were resampled.
+
+        """
+        manifest = {
+            'sr': sr,
+            'files': self._relative_audio_paths(files_audio)
+        }
+        save_json(self.get_resample_manifest_path(sr), manifest)
+
+    def _relative_audio_paths(self, files_audio):
+        """ Returns the sorted paths of files_audio relative to audio_path.
+
+        """
+        return sorted([os.path.relpath(path_to_file, self.audio_path)
+                       for path_to_file in files_audio])
 
     def check_sampling_rate(self, sr):
         """ Checks if dataset was resampled before.
 
-        For now, only checks if the folder {audio_path}{sr} exists and
-        each wav file present in audio_path is also present in
-        {audio_path}{sr}.
+        If the resample manifest saved by change_sampling_rate() exists,
+        the list of wav files in audio_path is compared with the list of
+        the manifest, so the files added or removed after resampling are
+        detected without checking each file in {audio_path}{sr}.
+        Otherwise, checks if the folder {audio_path}{sr} exists and each
+        wav file present in audio_path is also present in {audio_path}{sr}.
+        In that case, the manifest is saved for the next checks.
 
         Parameters
         ----------
@@ -257,7 +546,15 @@ class Dataset():
         if not os.path.exists(audio_folder_sr):
             return False
 
-        for path_to_file in list_wav_files(self.audio_path):
+        files_audio = list_wav_files(self.audio_path)
+        manifest_file = self.get_resample_manifest_path(sr)
+        if os.path.exists(manifest_file):
+            manifest = load_json(manifest_file)
+            return ((manifest['sr'] == sr) and
+                    (manifest['files'] ==
+                     self._relative_audio_paths(files_audio)))
+
+        for path_to_file in files_audio:
             path_to_destination = path_to_file.replace(
                 self.audio_path, audio_folder_sr
             )
@@ -265,12 +562,15 @@ class Dataset():
             # not only if exists.
             if not os.path.exists(path_to_destination):
                 return False
+
+        self.save_resample_manifest(sr, files_audio)
         return True
 
     def convert_to_wav(self, remove_original=False):
         """ Converts each file in the dataset to wav format.
 
-        If remove_original is False, the original files will be deleted
+        If remove_original is True, the original files will be deleted.
+        The files are converted by the resampler of the dataset.
 
         Parameters
         ----------
@@ -278,8 +578,6 @@ class Dataset():
             Remove original files.
 
         """
-        tfm = sox.Transformer()
-
         for path_to_file in list_all_files(self.audio_path):
             if path_to_file.endswith('wav'):
                 continue
@@ -289,7 +587,7 @@ class Dataset():
             if os.path.exists(path_to_destination):
                 continue
 
-            tfm.build(path_to_file, path_to_destination)
+            self.resampler.convert_file(path_to_file, path_to_destination)
 
             if remove_original:
                 os.remove(path_to_file)
@@ -172,6 +172,9 @@ class ESC50(Dataset):
                     if self.metadata[basename]['fold'] == fold:
                         self.file_lists[fold].append(fil)
 
+    def get_annotations_files(self, file_name):
+        return [os.path.join(self.dataset_path, 'meta/esc50.csv')]
+
     def get_annotations(self, file_name, features, time_resolution):
         y = np.zeros((len(self.label_list)))
         basename = self.get_basename_wav(file_name)
@@ -325,6 +328,9 @@ class URBAN_SED(Dataset):
                 self.wav_to_labels[fil] = os.path.join(
                     self.annotations_folder, fold, label_file)
 
+    def get_annotations_files(self, file_name):
+        return [self.wav_to_labels[file_name]]
+
     def get_annotations(self, file_name, features, time_resolution):
         label_file = self.wav_to_labels[file_name]
         labels = read_csv(label_file, delimiter='\t', header=None)
@@ -405,57 +411,78 @@ class SONYC_UST(Dataset):
 
         self.metada = {}
         self.label_list = []
+        self.fold_files = {}
+        self.annotations_index = {}
+        self.annotations_matrix = None
         if self.check_if_downloaded():
             self.metadata = read_csv(self.meta_file).sort_values(
                 'audio_filename')
             with open(self.taxonomy_file, 'r') as f:
                 self.label_list = yaml.load(f, Loader=yaml.Loader)
+            self.build_index()
+
+    def build_index(self):
+        """ Builds the index used to get the file lists and annotations.
+
+        Defines fold_files, a dict of form {fold: set of basenames},
+        and annotations_matrix, a dense matrix with the coarse level
+        annotations of each file. The row of each file is given by
+        annotations_index, a dict of form {basename: row}.
+
+        A class is present in a train file if any annotator checked its
+        presence. In other splits, only the annotator 0 is considered.
+
+        """
+        split = self.metadata['split'].values
+        annotator_0 = self.metadata['annotator_id'].values == 0
+
+        self.fold_files = {}
+        for fold in self.fold_list:
+            if fold == 'train':
+                mask = split == fold
+            else:
+                mask = (split == fold) & annotator_0
+            self.fold_files[fold] = set(
+                self.metadata['audio_filename'].values[mask])
+
+        # only coarse level
+        class_columns = [
+            str(class_ix) + '_' + self.label_list['coarse'][class_ix] +
+            '_presence' for class_ix in self.label_list['coarse']
+        ]
+        class_ixs = [class_ix - 1 for class_ix in self.label_list['coarse']]
+        filenames = self.metadata['audio_filename'].drop_duplicates()
+        valid_rows = (split == 'train') | annotator_0
+        presence = self.metadata[valid_rows].groupby(
+            'audio_filename')[class_columns].sum()
+        presence = presence.reindex(filenames, fill_value=0)
+
+        n_classes_coarse_level = len(self.label_list['coarse'])
+        self.annotations_matrix = np.zeros(
+            (len(filenames), n_classes_coarse_level))
+        self.annotations_matrix[:, class_ixs] = presence.values >= 1
+        self.annotations_index = {
+            filename: row for row, filename in enumerate(filenames)
+        }
 
     def generate_file_lists(self):
         self.file_lists = {}
         all_files = list_wav_files(self.audio_path)
         assert len(all_files) != 0
         for fold in self.fold_list:
-            if fold == 'train':
-                metadata_fold = self.metadata[self.metadata['split'] == fold]
-            else:
-                metadata_fold = self.metadata[
-                    ((self.metadata['split'] == fold) &
-                     (self.metadata['annotator_id'] == 0))
-                ]
-            filename_list_fold = metadata_fold[
-                'audio_filename'].drop_duplicates().to_list()
-            self.file_lists[fold] = []
-            for fil in all_files:
-                basename = os.path.basename(fil)
-                if basename in filename_list_fold:
-                    self.file_lists[fold].append(fil)
+            self.file_lists[fold] = [
+                fil for fil in all_files
+                if os.path.basename(fil) in self.fold_files[fold]
+            ]
+
+    def get_annotations_files(self, file_name):
+        return [self.meta_file]
 
     def get_annotations(self, file_name, features, time_resolution):
         # only coarse level
         # TODO add fine level
-        n_classes_coarse_level = len(self.label_list['coarse'])
-        y = np.zeros(n_classes_coarse_level)
         basename = os.path.basename(file_name).split('.')[0] + '.wav'
-
-        metadata_of_file = self.metadata[
-            self.metadata['audio_filename'] == basename]
-        for class_ix in self.label_list['coarse']:
-            class_column = str(class_ix) + '_' + \
-                self.label_list['coarse'][class_ix] + '_presence'
-
-            if metadata_of_file['split'].values[0] == 'train':
-                # class present if any annotator check presence
-                y[class_ix-1] = np.sum(
-                    metadata_of_file[class_column].values) >= 1
-            else:
-                # class present if annotator 0 check presence
-                if 0 in metadata_of_file['annotator_id'].values:
-                    ix = np.argwhere(
-                        metadata_of_file['annotator_id'].values == 0)
-                    y[class_ix-1] = metadata_of_file[
-                        class_column].values[ix] >= 1
-
+        y = self.annotations_matrix[self.annotations_index[basename]]
         y = np.expand_dims(y, 0)
         y = np.repeat(y, len(features), 0)
         return y
@@ -747,6 +774,9 @@ class TUTSoundEvents2017(Dataset):
                 file_ann = file_ann.replace('.wav', '.ann')
                 self.wav_to_labels[file_path] = file_ann
 
+    def get_annotations_files(self, file_name):
+        return [self.wav_to_labels[file_name]]
+
     def get_annotations(self, file_name, features, time_resolution):
         label_file = self.wav_to_labels[file_name]
         labels = read_csv(label_file, delimiter='\t', header=None)
@@ -915,6 +945,11 @@ class FSDKaggle2018(Dataset):
             )
             self.file_lists[fold].append(file_path)
 
+    def get_annotations_files(self, file_name):
+        return [os.path.join(self.meta_path, meta_file) for meta_file in
+                ['train_post_competition.csv',
+                 'test_post_competition_scoring_clips.csv']]
+
     def get_annotations(self, file_name, features, time_resolution):
         y = np.zeros((len(features), len(self.label_list)))
         label_name = self.metadata[os.path.basename(file_name)]['label']
@@ -1014,12 +1049,18 @@ class MAVD(Dataset):
             audio_folder = os.path.join(self.audio_path, fold)
             self.file_lists[fold] = list_wav_files(audio_folder)
 
-    def get_annotations(self, file_name, features, time_resolution):
+    def get_annotations_files(self, file_name):
+        return [self._get_label_file(file_name)]
+
+    def _get_label_file(self, file_name):
         audio_path, _ = self.get_audio_paths()
-        label_file = file_name.replace(
+        return file_name.replace(
             audio_path,
             self.annotations_path
         ).replace('.wav', '.txt')
+
+    def get_annotations(self, file_name, features, time_resolution):
+        label_file = self._get_label_file(file_name)
         labels = read_csv(label_file, delimiter='\t', header=None)
         labels.columns = ['event_onset', 'event_offset', 'event_label']
         labels_dict = labels.to_dict('records')
@@ -1,14 +1,72 @@
 import os
+import time
 import numpy as np
 import librosa
 import soundfile as sf
 import json
+import inspect
 from scipy.stats import kurtosis, skew
 
-from ..util.files import load_json, mkdir_if_not_exists
+from ..util.files import load_json, save_json, mkdir_if_not_exists
 from ..util.files import duplicate_folder_structure
 from ..util.files import list_wav_files
-from ..util.ui import progressbar
+from ..util.misc import parallel_imap
+from ..util.ui import throughput
+from .feature_store import FeatureStore, STORAGE_DTYPES, save_features
+from .resampler import Resampler
+
+
+def _extract_file(feature_extractors, path_audio, paths_features,
+                  resampler=None):
+    """ Helper of FeatureExtractorGroup.extract().
+
+    Calculates the features of one file for each feature extractor and
+    saves them into paths_features. The feature extractors with the same
+    STFT parameters share the power spectrogram of the file.
+    Defined at module level to be used by the worker processes.
+
+    If resampler is not None, the audio file is resampled in memory
+    before calculating the features.
+
+    Returns
+    -------
+    float
+        Duration (in seconds) of the audio file.
+    list of tuple
+        Shape and data type of the features array of each
+        feature extractor.
+
+    """
+    stft_parameters = [
+        feature_extractor.get_stft_parameters()
+        for feature_extractor in feature_extractors
+    ]
+    audio = None
+    spectrograms = {}
+    outputs = []
+    for feature_extractor, path_features, parameters in zip(
+            feature_extractors, paths_features, stft_parameters):
+        shared = ((parameters is not None) and
+                  (stft_parameters.count(parameters) > 1))
+        if (resampler is None) and (not shared):
+            features_array = feature_extractor.calculate(path_audio)
+        else:
+            if audio is None:
+                audio = feature_extractor.load_audio(
+                    path_audio, resampler=resampler)
+            if not shared:
+                features_array = feature_extractor.calculate_from_audio(audio)
+            else:
+                if parameters not in spectrograms:
+                    spectrograms[parameters] = \
+                        feature_extractor.power_spectrogram(audio)
+                features_array = feature_extractor.calculate_from_spectrogram(
+                    spectrograms[parameters])
+        feature_extractor.save_features(path_features, features_array)
+        outputs.append(
+            (list(features_array.shape), str(features_array.dtype)))
+    duration = sf.info(path_audio).duration
+    return duration, outputs
 
 
 class FeatureExtractor():
@@ -42,6 +100,26 @@ class FeatureExtractor():
         If the original audio is not sampled at this rate, it is re-sampled
         before feature extraction.
 
+    storage_dtype : {None, 'float64', 'float32', 'float16', 'int8'}
+        Data type used to save the features in extract(). If None, the
+        features are saved as calculated. 'int8' quantizes the features
+        of each file in 256 levels (see feature_store.save_features()).
+
+    storage_compression : bool, default=False
+        If True, the features files are compressed.
+
+    store_frames : bool, default=False
+        If True, calculate() returns the frame-level features
+        (N_frames, N_bands) instead of the sequences, so each frame is saved
+        only once. The sequences are built when the features are loaded
+        (see frames_to_sequences()), so the sequence parameters can be
+        changed without extracting the features again. Only available for
+        the feature extractors that use pad_audio() and
+        convert_to_sequences().
+        If pad_mode is None, the sequences are the same as with
+        store_frames=False. Otherwise they are not: the frames are padded
+        instead of the audio signal (see frames_to_sequences()).
+
     Attributes
     ----------
     sequence_frames : int
@@ -101,8 +179,19 @@ class FeatureExtractor():
 
     """
 
+    # Value of the center argument of the STFT (see power_spectrogram()).
+    # None if the features are not based in the STFT.
+    stft_center = None
+
+    # Attributes that depend on the sequence parameters (see store_frames)
+    sequence_parameters = ['sequence_time', 'sequence_hop_time',
+                           'sequence_frames', 'sequence_hop',
+                           'sequence_samples', 'sequence_hop_samples']
+
     def __init__(self, sequence_time=1.0, sequence_hop_time=0.5,
-                 audio_win=1024, audio_hop=680, sr=22050, **kwargs):
+                 audio_win=1024, audio_hop=680, sr=22050,
+                 storage_dtype=None, storage_compression=False,
+                 store_frames=False, **kwargs):
         """ Initialize the FeatureExtractor
 
         """
@@ -119,7 +208,16 @@ class FeatureExtractor():
 
         self.features_folder = kwargs.get('features_folder', 'features')
 
-    def load_audio(self, file_name, mono=True, change_sampling_rate=True):
+        if (storage_dtype is not None) and (
+           storage_dtype not in STORAGE_DTYPES):
+            raise AttributeError(
+                'storage_dtype has to be None or one of %s' % STORAGE_DTYPES)
+        self.storage_dtype = storage_dtype
+        self.storage_compression = storage_compression
+        self.store_frames = store_frames
+
+    def load_audio(self, file_name, mono=True, change_sampling_rate=True,
+                   resampler=None):
         """ Loads an audio signal and converts it to mono if needed
 
         Parameters
@@ -130,6 +228,9 @@ class FeatureExtractor():
             if True, only returns left channel
         change_sampling_rate : bool
             if True, the audio signal is re-sampled to self.sr
+        resampler : Resampler or None
+            Resampler used to change the sampling rate. If None,
+            librosa.resample is used.
 
         Returns
         -------
@@ -147,8 +248,13 @@ class FeatureExtractor():
         audio = np.asfortranarray(audio)
 
         if (self.sr != sr_old) & (change_sampling_rate):
-            print('Changing sampling rate from %d to %d' % (sr_old, self.sr))
-            audio = librosa.resample(audio, sr_old, self.sr)
+            if resampler is None:
+                print('Changing sampling rate from %d to %d' % (
+                    sr_old, self.sr))
+                audio = librosa.resample(audio, sr_old, self.sr)
+            else:
+                audio = np.asfortranarray(
+                    resampler.resample(audio, sr_old, self.sr))
 
         return audio
 
@@ -168,53 +274,212 @@ class FeatureExtractor():
         """
         pass
 
-    def extract(self, dataset):
+    def calculate_from_audio(self, audio):
+        """ Calculates the features of an audio signal
+
+        Used to calculate the features of signals that are not stored in
+        files (e.g. on-the-fly augmented signals).
+
+        Parameters
+        ----------
+        audio : ndarray
+            audio signal sampled at self.sr
+
+        Returns
+        -------
+        ndarray
+            feature representation of the audio signal
+
+        """
+        raise AttributeError(
+            '%s does not support calculating features from an audio signal' %
+            self.__class__.__name__)
+
+    def calculate_batch(self, file_names):
+        """ Loads a list of audio files and calculates their features.
+
+        By default, calculate() is called for each file. Feature extractors
+        that can process several signals at once override this method.
+
+        Parameters
+        ----------
+        file_names : list of str
+            List of paths to the audio files
+
+        Returns
+        -------
+        list of ndarray
+            feature representation of each audio signal
+
+        """
+        return [self.calculate(file_name) for file_name in file_names]
+
+    def get_stft_parameters(self):
+        """ Returns the parameters that define power_spectrogram().
+
+        Feature extractors with the same STFT parameters share
+        the power spectrogram of each file when they are extracted
+        together (see FeatureExtractorGroup).
+
+        Returns
+        -------
+        tuple or None
+            STFT and padding parameters. None if the features are not
+            calculated from a power spectrogram (stft_center is None).
+
+        """
+        if self.stft_center is None:
+            return None
+        parameters = (self.sr, self.n_fft, self.audio_win, self.audio_hop,
+                      self.stft_center, self.pad_mode, self.store_frames)
+        if self.store_frames:
+            # The audio signal is not padded
+            return parameters
+        return parameters + (self.sequence_time, self.sequence_hop_time,
+                             self.sequence_frames)
+
+    def power_spectrogram(self, audio):
+        """ Pads an audio signal and calculates its power spectrogram.
+
+        Only available for the feature extractors based in the STFT
+        (i.e. stft_center is not None).
+
+        Parameters
+        ----------
+        audio : ndarray
+            audio signal sampled at self.sr
+
+        Returns
+        -------
+        ndarray
+            Power spectrogram, shape (N_freqs, N_frames).
+
+        """
+        # Pad audio signal
+        audio = self.pad_audio(audio)
+
+        # Get the spectrogram, shape (N_freqs, N_frames)
+        stft = librosa.core.stft(audio, n_fft=self.n_fft,
+                                 hop_length=self.audio_hop,
+                                 win_length=self.audio_win,
+                                 center=self.stft_center)
+        # Convert to power
+        return np.abs(stft)**2
+
+    def calculate_from_spectrogram(self, spectrogram):
+        """ Calculates the features from the output of power_spectrogram().
+
+        Parameters
+        ----------
+        spectrogram : ndarray
+            Power spectrogram, shape (N_freqs, N_frames).
+
+        Returns
+        -------
+        ndarray
+            feature representation, shape
+            (N_sequences, N_sequence_frames, N_bands)
+
+        """
+        features = self.features_from_spectrogram(spectrogram)
+        return self.convert_to_sequences(features)
+
+    def save_features(self, file_name, features):
+        """ Saves the features of an audio file.
+
+        The features are saved with storage_dtype and storage_compression
+        (see feature_store.save_features()).
+
+        Parameters
+        ----------
+        file_name : str
+            Path to the features file.
+        features : ndarray
+            Features array.
+
+        """
+        save_features(file_name, features, dtype=self.storage_dtype,
+                      compress=self.storage_compression)
+
+    def extract(self, dataset, n_jobs=1, chunksize=8, checkpoint=100,
+                store='files', resample_in_memory=False):
         """ Extracts features for each file in dataset.
 
         Call calculate() for each file in dataset and save the
-        result into the features path.
+        result into the features path, using storage_dtype and
+        storage_compression (see save_features()).
+
+        The extraction is incremental: a manifest of the extracted files is
+        kept in each features subfolder (see load_manifest()) and only the
+        new or modified audio files are processed. The manifest is saved
+        every checkpoint files, so an interrupted extraction can be resumed
+        by calling extract() again.
+
+        By default, the audio files are resampled to self.sr on disk first
+        (see Dataset.change_sampling_rate()). If resample_in_memory is True,
+        the original audio files are read and resampled in memory instead,
+        so the resampled copy of the dataset is not needed.
 
         Parameters
         ----------
         dataset : Dataset
             Instance of the dataset.
+        n_jobs : int, default=1
+            Number of worker processes used to extract the features.
+            If -1, use all available CPUs. Note that the feature extractor
+            is copied to each worker, so it has to be picklable.
+        chunksize : int, default=8
+            Number of files sent to each worker at once.
+        checkpoint : int, default=100
+            Number of extracted files between each save of the manifest.
+        store : {'files', 'memmap'}, default='files'
+            If 'memmap', the features of each subfolder are also packed
+            into a FeatureStore, which can be read by DataGenerator
+            with store='memmap'.
+        resample_in_memory : bool, default=False
+            If True, skip the resampled copy of the dataset and resample
+            the original audio files in memory using dataset.resampler
+            (or a polyphase Resampler if its backend is sox). The features
+            can differ slightly from the ones calculated from the
+            resampled files.
+
+        Returns
+        -------
+        dict
+            Throughput information (see util.ui.throughput).
 
         """
-        features_path = self.get_features_path(dataset)
-        mkdir_if_not_exists(features_path, parents=True)
+        feature_extractor_group = FeatureExtractorGroup([self])
+        return feature_extractor_group.extract(
+            dataset, n_jobs=n_jobs, chunksize=chunksize,
+            checkpoint=checkpoint, store=store,
+            resample_in_memory=resample_in_memory
+        )
 
-        if not dataset.check_sampling_rate(self.sr):
-            print('Changing sampling rate ...')
-            dataset.change_sampling_rate(self.sr)
-            print('Done!')
+    def get_parameters(self):
+        """ Returns the parameters of the feature extractor.
 
-        # Define path to audio and features folders
-        audio_path, subfolders = dataset.get_audio_paths(
-            self.sr
-        )
+        Only the attributes of type int, str, float, bool or None
+        are included. If store_frames is True, the sequence parameters
+        are not included because the saved features do not depend on them.
 
-        # Duplicate folder structure of audio in features folder
-        duplicate_folder_structure(audio_path, features_path)
-        for audio_folder in subfolders:
-            subfolder_name = os.path.basename(audio_folder)
-            features_path_sub = os.path.join(features_path, subfolder_name)
-            if not self.check_if_extracted_path(features_path_sub):
-                # Navigate in the structure of audio folder and extract
-                # features of the each wav file
-                for path_audio in progressbar(list_wav_files(audio_folder)):
-                    features_array = self.calculate(
-                        path_audio
-                    )
-                    path_to_features_file = path_audio.replace(
-                        audio_path, features_path
-                    )
-                    path_to_features_file = path_to_features_file.replace(
-                        'wav', 'npy'
-                    )
-                    np.save(path_to_features_file, features_array)
-
-                # Save parameters.json for future checking
-                self.set_as_extracted(features_path_sub)
+        Returns
+        -------
+        dict
+            Parameters of the feature extractor.
+
+        """
+        params = self.__dict__.copy()
+        remove = [
+            key for key in params.keys() if type(params[key]) not in [
+                int, str, float, bool, type(None)]
+        ]
+        if self.store_frames:
+            remove.extend([key for key in self.sequence_parameters
+                           if (key in params) and (key not in remove)])
+        for key in remove:
+            del params[key]
+        return params
 
     def set_as_extracted(self, path):
         """ Saves a json file with self.__dict__.
@@ -228,18 +493,161 @@ class FeatureExtractor():
             Path to the JSON file
 
         """
-        params = self.__dict__.copy()
-        remove = [
-            key for key in params.keys() if type(params[key]) not in [
-                int, str, float]
-        ]
-        for key in remove:
-            del params[key]
+        params = self.get_parameters()
 
         json_path = os.path.join(path, "parameters.json")
         with open(json_path, 'w') as fp:
             json.dump(params, fp)
 
+    def load_manifest(self, path):
+        """ Loads the manifest of the features extracted in path.
+
+        The manifest is a json file (manifest.json) that includes the
+        parameters of the feature extractor and an entry for each
+        extracted file.
+        e.g.::
+
+            {'parameters': {'sr': 22050, ...},
+             'files': {'fold1/1.wav': {'mtime': 1591971523.0,
+                                       'size': 352844,
+                                       'shape': [7, 32, 64],
+                                       'dtype': 'float32'}, ...}}
+
+        where mtime and size are the modification time and the size of the
+        audio file when its features were calculated.
+
+        Parameters
+        ----------
+        path : str
+            Path to the features folder.
+
+        Returns
+        -------
+        dict
+            Dict of form {audio_file: entry}. The paths to the audio files
+            are relative to the audio subfolder. If the manifest does not
+            exist or was saved with different parameters, return an
+            empty dict.
+
+        """
+        manifest_file = os.path.join(path, 'manifest.json')
+        if not os.path.exists(manifest_file):
+            return {}
+        manifest = load_json(manifest_file)
+        if manifest['parameters'] != self.get_parameters():
+            return {}
+        return manifest['files']
+
+    def save_manifest(self, path, files):
+        """ Saves the manifest of the features extracted in path.
+
+        See load_manifest() for the format. The file is replaced atomically,
+        so it is never left half-written if the process is interrupted.
+
+        Parameters
+        ----------
+        path : str
+            Path to the features folder.
+        files : dict
+            Dict of form {audio_file: entry}.
+
+        """
+        manifest_file = os.path.join(path, 'manifest.json')
+        manifest = {'parameters': self.get_parameters(), 'files': files}
+        save_json(manifest_file + '.tmp', manifest)
+        os.replace(manifest_file + '.tmp', manifest_file)
+
+    def get_statistics_parameters(self):
+        """ Returns the parameters that define the saved statistics.
+
+        The statistics are calculated over the sequences, so the sequence
+        parameters are always included (see get_parameters()).
+
+        Returns
+        -------
+        str
+            Parameters of the feature extractor in json format.
+
+        """
+        params = self.get_parameters()
+        for key in self.sequence_parameters:
+            if key in self.__dict__:
+                params[key] = self.__dict__[key]
+        return json.dumps(params, sort_keys=True, default=float)
+
+    def load_statistics(self, path):
+        """ Loads the statistics of the features extracted in path.
+
+        The statistics of each features file (see
+        dcase_models.data.scaler.compute_statistics()) are saved in
+        statistics.npz by save_statistics(). An entry is only valid if the
+        audio file did not change since its features were calculated
+        (see load_manifest()).
+
+        Parameters
+        ----------
+        path : str
+            Path to the features folder.
+
+        Returns
+        -------
+        dict
+            Dict of form {audio_file: statistics}. If the statistics do not
+            exist or were saved with different parameters, return an
+            empty dict.
+
+        """
+        statistics_file = os.path.join(path, 'statistics.npz')
+        if not os.path.exists(statistics_file):
+            return {}
+        data = np.load(statistics_file)
+        if str(data['parameters']) != self.get_statistics_parameters():
+            return {}
+        manifest = self.load_manifest(path)
+        statistics = {}
+        for k, key in enumerate(data['files']):
+            entry = manifest.get(str(key))
+            if ((entry is None) or (entry['mtime'] != data['mtime'][k]) or
+               (entry['size'] != data['size'][k])):
+                continue
+            statistics[str(key)] = {
+                'count': int(data['count'][k]), 'mean': data['mean'][k],
+                'm2': data['m2'][k], 'min': data['min'][k],
+                'max': data['max'][k]
+            }
+        return statistics
+
+    def save_statistics(self, path, statistics):
+        """ Saves the statistics of the features extracted in path.
+
+        Only the files included in the manifest are saved. See
+        load_statistics() for the format.
+
+        Parameters
+        ----------
+        path : str
+            Path to the features folder.
+        statistics : dict
+            Dict of form {audio_file: statistics}.
+
+        """
+        manifest = self.load_manifest(path)
+        files = [key for key in sorted(statistics) if key in manifest]
+        if len(files) == 0:
+            return
+        arrays = {
+            'parameters': self.get_statistics_parameters(),
+            'files': np.array(files),
+            'mtime': np.array([manifest[key]['mtime'] for key in files]),
+            'size': np.array([manifest[key]['size'] for key in files]),
+        }
+        for stat in ['count', 'mean', 'm2', 'min', 'max']:
+            arrays[stat] = np.array([statistics[key][stat] for key in files])
+        statistics_file = os.path.join(path, 'statistics.npz')
+        with open(statistics_file + '.tmp', 'wb') as fp:
+            np.savez(fp, **arrays)
+        os.replace(statistics_file + '.tmp', statistics_file)
+
     def check_if_extracted_path(self, path):
         """ Checks if the features saved in path were calculated.
 
@@ -266,6 +674,15 @@ class FeatureExtractor():
                 return False
             if parameters_features_folder[key] != self.__dict__[key]:
                 return False
+        # Features saved before the storage options were introduced
+        # do not include them in the json file
+        if ((parameters_features_folder.get('storage_dtype') !=
+             self.storage_dtype) or
+            (parameters_features_folder.get('storage_compression', False) !=
+             self.storage_compression) or
+            (parameters_features_folder.get('store_frames', False) !=
+             self.store_frames)):
+            return False
         return True
 
     def check_if_extracted(self, dataset):
@@ -316,6 +733,8 @@ class FeatureExtractor():
         sf.write('zeros.wav', audio_sample, self.sr)
         features_sample = self.calculate(audio_file)
         os.remove(audio_file)
+        if self.store_frames:
+            features_sample = self.frames_to_sequences(features_sample)
         return features_sample.shape
 
     def get_features_path(self, dataset):
@@ -339,6 +758,9 @@ class FeatureExtractor():
         return features_path
 
     def pad_audio(self, audio):
+        if self.store_frames:
+            # The frames are padded in frames_to_sequences()
+            return audio
         if (self.sequence_time > 0) & (self.pad_mode is not None):
             if self.sequence_hop_time > 0:
                 audio = librosa.util.fix_length(
@@ -358,6 +780,8 @@ class FeatureExtractor():
         return audio
 
     def convert_to_sequences(self, audio_representation):
+        if self.store_frames:
+            return audio_representation
         if (self.sequence_time > 0) & (self.sequence_hop_time > 0):
             audio_representation = np.ascontiguousarray(audio_representation)
             audio_representation = librosa.util.frame(
@@ -369,4 +793,486 @@ class FeatureExtractor():
         else:
             audio_representation = np.expand_dims(audio_representation, axis=0)
 
-        return audio_representation
\ No newline at end of file
+        return audio_representation
+
+    def frames_to_sequences(self, frames):
+        """ Builds the sequences of frame-level features.
+
+        Used to load the features saved with store_frames=True. The sequences
+        are strided views of frames (no copy), except when the frames are
+        padded. The frames are padded with sequence_frames frames at the
+        end using pad_mode, so the number of sequences is the same as with
+        store_frames=False (see pad_audio()).
+
+        Note that padding the frames is not equivalent to padding the audio
+        signal: with pad_mode='reflect' the frames are reflected instead of
+        being calculated from the reflected audio. Therefore, the sequences
+        that include padded frames differ from those of store_frames=False.
+        The log-scaled features (e.g. MelSpectrogram) also differ slightly
+        in the other sequences, because they are clipped at 80 dB below
+        the maximum of the unpadded signal.
+
+        Parameters
+        ----------
+        frames : ndarray
+            Frame-level features, shape (N_frames, ...).
+
+        Returns
+        -------
+        ndarray
+            Read-only array of sequences,
+            shape (N_sequences, N_sequence_frames, ...).
+
+        """
+        if self.sequence_time <= 0:
+            return np.expand_dims(frames, axis=0)
+
+        pad_mode = getattr(self, 'pad_mode', None)
+        n_frames = len(frames)
+        if self.sequence_hop_time > 0:
+            if pad_mode is not None:
+                n_frames = len(frames) + self.sequence_frames
+        else:
+            n_frames = self.sequence_frames
+            frames = frames[:n_frames]
+            if pad_mode is None:
+                pad_mode = 'constant'
+        if n_frames > len(frames):
+            pad_width = [(0, n_frames - len(frames))]
+            pad_width.extend([(0, 0)] * (frames.ndim - 1))
+            frames = np.pad(frames, pad_width, mode=pad_mode)
+        if n_frames < self.sequence_frames:
+            raise AttributeError(
+                'There are not enough frames to build a sequence')
+
+        sequence_hop = max(self.sequence_hop, 1)
+        n_sequences = 1 + (n_frames - self.sequence_frames) // sequence_hop
+        return np.lib.stride_tricks.as_strided(
+            frames,
+            shape=(n_sequences, self.sequence_frames) + frames.shape[1:],
+            strides=(sequence_hop * frames.strides[0],) + frames.strides,
+            writeable=False
+        )
+
+    def get_number_of_sequences(self, n_frames):
+        """ Returns the number of sequences of frame-level features.
+
+        Parameters
+        ----------
+        n_frames : int
+            Number of frames saved with store_frames=True.
+
+        Returns
+        -------
+        int
+            Number of sequences returned by frames_to_sequences().
+
+        """
+        if (self.sequence_time <= 0) or (self.sequence_hop_time <= 0):
+            return 1
+        if getattr(self, 'pad_mode', None) is not None:
+            n_frames += self.sequence_frames
+        return 1 + (n_frames - self.sequence_frames) // max(
+            self.sequence_hop, 1)
+
+
+class FeatureExtractorGroup():
+    """ Extracts the features of several feature extractors at once.
+
+    Each audio file is loaded once for all the feature extractors, and the
+    feature extractors with the same STFT parameters (e.g. Spectrogram,
+    MelSpectrogram and MFCC with the same sr, n_fft, audio_win and
+    audio_hop) share its power spectrogram
+    (see FeatureExtractor.get_stft_parameters()).
+
+    The features of each feature extractor are saved in its own
+    features path, with its own manifest, as if they were extracted
+    by FeatureExtractor.extract().
+
+    Parameters
+    ----------
+    feature_extractors : list of FeatureExtractor
+        Feature extractors. All of them have to use the same sampling rate
+        and a different features path (see get_features_path()).
+
+    Examples
+    --------
+    Extract MelSpectrogram and MFCC features computing the STFT only once.
+
+    >>> from dcase_models.data.features import MelSpectrogram, MFCC
+    >>> from dcase_models.data.feature_extractor import FeatureExtractorGroup
+    >>> from dcase_models.data.datasets import ESC50
+    >>> dataset = ESC50('../datasets/ESC50')
+    >>> feature_extractors = [MelSpectrogram(), MFCC()]
+    >>> FeatureExtractorGroup(feature_extractors).extract(dataset)
+
+    """
+
+    def __init__(self, feature_extractors):
+        """ Initialize the FeatureExtractorGroup.
+
+        """
+        if len(feature_extractors) == 0:
+            raise AttributeError('feature_extractors can not be empty')
+        if len(set([fe.sr for fe in feature_extractors])) > 1:
+            raise AttributeError(
+                'All the feature extractors have to use the same sr')
+        self.feature_extractors = feature_extractors
+        self.sr = feature_extractors[0].sr
+
+    def extract(self, dataset, n_jobs=1, chunksize=8, checkpoint=100,
+                store='files', resample_in_memory=False):
+        """ Extracts the features of each feature extractor for each file
+        in dataset.
+
+        See FeatureExtractor.extract() for the description of the
+        parameters.
+
+        Returns
+        -------
+        dict
+            Throughput information (see util.ui.throughput).
+
+        """
+        features_paths = [
+            fe.get_features_path(dataset) for fe in self.feature_extractors
+        ]
+        if len(set(features_paths)) < len(features_paths):
+            raise AttributeError(
+                'The features of each feature extractor have to be saved '
+                'in a different path')
+        for features_path in features_paths:
+            mkdir_if_not_exists(features_path, parents=True)
+
+        resampler = None
+        if resample_in_memory:
+            resampler = dataset.resampler
+            if resampler.backend == 'sox':
+                resampler = Resampler('polyphase')
+        elif not dataset.check_sampling_rate(self.sr):
+            print('Changing sampling rate ...')
+            dataset.change_sampling_rate(self.sr, n_jobs=n_jobs)
+            print('Done!')
+
+        # Define path to audio and features folders
+        _, subfolders = dataset.get_audio_paths(
+            self.sr
+        )
+
+        n_files = 0
+        audio_time = 0.0
+        start_time = time.time()
+        for audio_folder in subfolders:
+            subfolder_name = os.path.basename(audio_folder)
+            features_paths_sub = [
+                os.path.join(features_path, subfolder_name)
+                for features_path in features_paths
+            ]
+            if resample_in_memory and (subfolder_name == 'original'):
+                # Read the files that were not resampled
+                audio_folder = dataset.audio_path
+            # Duplicate folder structure of audio in features folders
+            for features_path_sub in features_paths_sub:
+                duplicate_folder_structure(audio_folder, features_path_sub)
+            n_files_sub, audio_time_sub, n_extracted = \
+                self._extract_subfolder(
+                    audio_folder, features_paths_sub, n_jobs=n_jobs,
+                    chunksize=chunksize, checkpoint=checkpoint,
+                    resampler=resampler
+                )
+            n_files += n_files_sub
+            audio_time += audio_time_sub
+
+            if store == 'memmap':
+                for j, features_path_sub in enumerate(features_paths_sub):
+                    feature_store = FeatureStore(features_path_sub)
+                    if ((n_extracted[j] > 0) or
+                       not feature_store.check_if_packed()):
+                        print('Packing features of %s ...' %
+                              features_path_sub)
+                        feature_store.pack()
+
+        return throughput(n_files, time.time() - start_time, audio_time)
+
+    def _extract_subfolder(self, audio_folder, features_paths_sub,
+                           n_jobs=1, chunksize=8, checkpoint=100,
+                           resampler=None):
+        """ Helper of extract(). Extracts the features of one subfolder.
+
+        Returns
+        -------
+        int
+            Number of processed audio files.
+        float
+            Duration (in seconds) of the processed audio files.
+        list of int
+            Number of extracted files of each feature extractor.
+
+        """
+        manifests = {}
+        for j, feature_extractor in enumerate(self.feature_extractors):
+            features_path_sub = features_paths_sub[j]
+            manifest_file = os.path.join(features_path_sub, 'manifest.json')
+            if (feature_extractor.check_if_extracted_path(features_path_sub)
+               and not os.path.exists(manifest_file)):
+                # Extracted before manifests were introduced
+                continue
+            manifests[j] = feature_extractor.load_manifest(features_path_sub)
+
+        files = {j: {} for j in manifests}
+        # Indexes of the feature extractors to be calculated for each file
+        pending = {}
+        # Navigate in the structure of audio folder and look for
+        # new or modified wav files
+        for path_audio in list_wav_files(audio_folder):
+            key = os.path.relpath(path_audio, audio_folder)
+            stat = os.stat(path_audio)
+            for j in manifests:
+                path_to_features_file = os.path.join(
+                    features_paths_sub[j], key.replace('wav', 'npy')
+                )
+                entry = manifests[j].get(key)
+                if ((entry is not None) and
+                   (entry['mtime'] == stat.st_mtime) and
+                   (entry['size'] == stat.st_size) and
+                   os.path.exists(path_to_features_file)):
+                    files[j][key] = entry
+                    continue
+                files[j][key] = {'mtime': stat.st_mtime, 'size': stat.st_size}
+                if path_audio not in pending:
+                    pending[path_audio] = []
+                pending[path_audio].append(j)
+
+        n_extracted = [0]*len(self.feature_extractors)
+        for indexes in pending.values():
+            for j in indexes:
+                n_extracted[j] += 1
+
+        done = {}
+        for j in manifests:
+            feature_extractor = self.feature_extractors[j]
+            features_path_sub = features_paths_sub[j]
+            if n_extracted[j] == 0:
+                if ((files[j] != manifests[j]) or
+                   not feature_extractor.check_if_extracted_path(
+                       features_path_sub)):
+                    feature_extractor.save_manifest(
+                        features_path_sub, files[j])
+                    feature_extractor.set_as_extracted(features_path_sub)
+                continue
+
+            # The subfolder is not complete until all files are extracted
+            json_path = os.path.join(features_path_sub, 'parameters.json')
+            if os.path.exists(json_path):
+                os.remove(json_path)
+
+            done[j] = {key: entry for key, entry in files[j].items()
+                       if 'shape' in entry}
+            feature_extractor.save_manifest(features_path_sub, done[j])
+
+        if len(pending) == 0:
+            return 0, 0.0, n_extracted
+
+        args_list = []
+        for path_audio, indexes in pending.items():
+            feature_extractors = [
+                self.feature_extractors[j] for j in indexes
+            ]
+            paths_features = [
+                os.path.join(
+                    features_paths_sub[j],
+                    os.path.relpath(path_audio, audio_folder).replace(
+                        'wav', 'npy')
+                )
+                for j in indexes
+            ]
+            args_list.append(
+                (feature_extractors, path_audio, paths_features, resampler)
+            )
+
+        results = parallel_imap(
+            _extract_file, args_list, n_jobs=n_jobs, chunksize=chunksize
+        )
+        audio_time = 0.0
+        for k, ((path_audio, indexes), (duration, outputs)) in enumerate(
+                zip(pending.items(), results)):
+            key = os.path.relpath(path_audio, audio_folder)
+            for j, (shape, dtype) in zip(indexes, outputs):
+                done[j][key] = files[j][key]
+                done[j][key].update({'shape': shape, 'dtype': dtype})
+            audio_time += duration
+            if (k + 1) % checkpoint == 0:
+                for j in done:
+                    self.feature_extractors[j].save_manifest(
+                        features_paths_sub[j], done[j])
+
+        for j in done:
+            feature_extractor = self.feature_extractors[j]
+            feature_extractor.save_manifest(features_paths_sub[j], done[j])
+            # Save parameters.json for future checking
+            feature_extractor.set_as_extracted(features_paths_sub[j])
+
+        return len(pending), audio_time, n_extracted
+
+    def check_if_extracted(self, dataset):
+        """ Checks if the features of each feature extractor were extracted.
+
+        Parameters
+        ----------
+        dataset : Dataset
+            Instance of the dataset.
+
+        Returns
+        -------
+        bool
+            True if the features of all the feature extractors
+            were already extracted.
+
+        """
+        for feature_extractor in self.feature_extractors:
+            if not feature_extractor.check_if_extracted(dataset):
+                return False
+        return True
+
+
+class FeatureStream():
+    """ Streaming computation of spectrogram-based features.
+
+    Calculates the features of an audio stream that is fed in chunks of
+    arbitrary length. The samples that are not enough to complete an STFT
+    frame, and the frames that are not enough to complete a sequence, are
+    kept between calls. The sequences are returned as soon as they are
+    complete, so the latency is bounded by the sequence hop.
+
+    The feature extractor has to define n_fft and
+    features_from_spectrogram() (e.g. Spectrogram, MelSpectrogram
+    and MFCC).
+
+    Notes
+    -----
+    If the STFT of the feature extractor is centered (stft_center=True),
+    the beginning of the stream is padded as in librosa.core.stft, so the
+    frames are the same of calculate() for a whole file. There are two
+    differences with calculate():
+
+    - The dB conversion clips the values to 80 dB below the maximum of
+      each chunk instead of the maximum of the whole signal.
+    - The stream has no end, so the last sequences of calculate(), which
+      include the padding at the end of the signal (see pad_audio()),
+      are not returned.
+
+    Parameters
+    ----------
+    feature_extractor : FeatureExtractor
+        Instance of the feature extractor (e.g. MelSpectrogram).
+
+    Attributes
+    ----------
+    audio_buffer : ndarray
+        Audio samples not processed yet.
+    frames_buffer : ndarray
+        Frame-level features not included in a returned sequence yet,
+        shape (N_frames, N_bands).
+
+    Examples
+    --------
+    >>> from dcase_models.data.features import MelSpectrogram
+    >>> from dcase_models.data.feature_extractor import FeatureStream
+    >>> features = MelSpectrogram()
+    >>> stream = FeatureStream(features)
+    >>> for audio_chunk in audio_chunks:
+    >>>     sequences = stream.process(audio_chunk)
+    >>>     print(sequences.shape)
+        (0, 32, 64)
+        (1, 32, 64)
+
+    """
+
+    def __init__(self, feature_extractor):
+        """ Initialize the FeatureStream.
+
+        """
+        if ((not hasattr(feature_extractor, 'features_from_spectrogram')) or
+           (not hasattr(feature_extractor, 'n_fft'))):
+            raise AttributeError(
+                '%s does not support streaming' %
+                feature_extractor.__class__.__name__)
+        if ((feature_extractor.sequence_time <= 0) or
+           (feature_extractor.sequence_hop_time <= 0)):
+            raise AttributeError(
+                'sequence_time and sequence_hop_time have to be positive')
+
+        self.feature_extractor = feature_extractor
+        # Padding used by librosa.core.stft to center the frames
+        self.pad_mode = inspect.signature(
+            librosa.core.stft).parameters['pad_mode'].default
+        self.reset()
+
+    def reset(self):
+        """ Removes the audio and the frames kept from previous chunks.
+
+        """
+        n_freqs = 1 + self.feature_extractor.n_fft // 2
+        self.audio_buffer = np.zeros(0)
+        self.frames_buffer = self.feature_extractor.features_from_spectrogram(
+            np.ones((n_freqs, 1)))[:0]
+        # The beginning of the stream is padded if the STFT is centered
+        self.start_padded = not self.feature_extractor.stft_center
+
+    def process(self, audio_chunk):
+        """ Processes a new chunk of audio.
+
+        Parameters
+        ----------
+        audio_chunk : ndarray
+            Audio samples (mono) sampled at the sampling rate of the
+            feature extractor.
+
+        Returns
+        -------
+        ndarray
+            Sequences completed with this chunk,
+            shape (N_sequences, N_sequence_frames, N_bands).
+            N_sequences can be zero.
+
+        """
+        n_fft = self.feature_extractor.n_fft
+        audio_hop = self.feature_extractor.audio_hop
+        sequence_frames = self.feature_extractor.sequence_frames
+        sequence_hop = self.feature_extractor.sequence_hop
+
+        self.audio_buffer = np.concatenate((self.audio_buffer, audio_chunk))
+
+        # Pad the beginning as librosa.core.stft with center=True
+        if (not self.start_padded) and (len(self.audio_buffer) > n_fft // 2):
+            self.audio_buffer = np.pad(
+                self.audio_buffer, (n_fft // 2, 0), mode=self.pad_mode)
+            self.start_padded = True
+
+        # Calculate the complete frames
+        if self.start_padded and (len(self.audio_buffer) >= n_fft):
+            n_frames = 1 + (len(self.audio_buffer) - n_fft) // audio_hop
+            audio = self.audio_buffer[:(n_frames - 1)*audio_hop + n_fft]
+            stft = librosa.core.stft(
+                audio, n_fft=n_fft, hop_length=audio_hop,
+                win_length=self.feature_extractor.audio_win, center=False)
+            frames = self.feature_extractor.features_from_spectrogram(
+                np.abs(stft)**2)
+            self.frames_buffer = np.concatenate(
+                (self.frames_buffer, frames), axis=0)
+            self.audio_buffer = self.audio_buffer[n_frames*audio_hop:]
+
+        # Get the complete sequences
+        n_sequences = 0
+        if len(self.frames_buffer) >= sequence_frames:
+            n_sequences = 1 + (
+                len(self.frames_buffer) - sequence_frames) // sequence_hop
+        sequences = np.zeros(
+            (n_sequences, sequence_frames) + self.frames_buffer.shape[1:],
+            dtype=self.frames_buffer.dtype)
+        for j in range(n_sequences):
+            sequences[j] = self.frames_buffer[
+                j*sequence_hop:j*sequence_hop + sequence_frames]
+        self.frames_buffer = self.frames_buffer[n_sequences*sequence_hop:]
+
+        return sequences
@@ -0,0 +1,300 @@
+import os
+import numpy as np
+
+from ..util.files import load_json, save_json, list_all_files
+
+
+__all__ = ['FeatureStore', 'save_features', 'load_features']
+
+STORAGE_DTYPES = ['float64', 'float32', 'float16', 'int8']
+
+
+def save_features(file_name, features, dtype=None, compress=False):
+    """ Saves the features of an audio file.
+
+    The features are saved as a npy file. If they are quantized or
+    compressed, they are saved as a npz archive instead, which also
+    includes the quantization parameters. The archive is written in
+    file_name as is, so the paths to the features files do not change.
+    load_features() reads both formats.
+
+    Parameters
+    ----------
+    file_name : str
+        Path to the features file.
+    features : ndarray
+        Features array.
+    dtype : {None, 'float64', 'float32', 'float16', 'int8'}, default=None
+        Data type used to store the features. If None, the features are
+        saved as they are. If 'int8', the features are quantized
+        linearly in 256 levels between their minimum and maximum values.
+    compress : bool, default=False
+        If True, the features are compressed (zip deflate).
+
+    """
+    if (dtype is not None) and (dtype not in STORAGE_DTYPES):
+        raise AttributeError(
+            'dtype has to be None or one of %s' % STORAGE_DTYPES)
+
+    arrays = {}
+    if dtype == 'int8':
+        offset = np.float32(0.0)
+        scale = np.float32(1.0)
+        if features.size > 0:
+            offset = np.float32(np.amin(features))
+            scale = np.float32((np.amax(features) - offset) / 255.)
+            if scale == 0:
+                scale = np.float32(1.0)
+        features = np.clip(
+            np.round((features - offset) / scale) - 128, -128, 127)
+        arrays['scale'] = scale
+        arrays['offset'] = offset
+    if dtype is not None:
+        features = features.astype(dtype)
+
+    if (dtype != 'int8') and (not compress):
+        np.save(file_name, features)
+        return
+
+    arrays['features'] = features
+    with open(file_name, 'wb') as fp:
+        if compress:
+            np.savez_compressed(fp, **arrays)
+        else:
+            np.savez(fp, **arrays)
+
+
+def load_features(file_name, mmap_mode=None):
+    """ Loads the features saved by save_features().
+
+    The quantized features are decoded to float32.
+
+    Parameters
+    ----------
+    file_name : str
+        Path to the features file.
+    mmap_mode : None or str, default=None
+        Passed to numpy.load. Only used if the features were saved
+        as a npy file.
+
+    Returns
+    -------
+    ndarray
+        Features array.
+
+    """
+    data = np.load(file_name, mmap_mode=mmap_mode)
+    if not isinstance(data, np.lib.npyio.NpzFile):
+        return data
+    with data:
+        features = data['features']
+        if 'scale' in data.files:
+            features = ((features.astype(np.float32) + 128) *
+                        data['scale'] + data['offset'])
+    return features
+
+
+def _load_features_header(file_name):
+    """ Reads the shape and data type of the features saved by
+    save_features() without loading them.
+
+    For npz archives only the header of the features array is
+    decompressed.
+
+    Parameters
+    ----------
+    file_name : str
+        Path to the features file.
+
+    Returns
+    -------
+    tuple
+        Shape of the features.
+    numpy.dtype
+        Data type of the features returned by load_features().
+
+    """
+    data = np.load(file_name, mmap_mode='r')
+    if not isinstance(data, np.lib.npyio.NpzFile):
+        return data.shape, data.dtype
+    with data:
+        with data.zip.open('features.npy') as fp:
+            version = np.lib.format.read_magic(fp)
+            if version == (1, 0):
+                header = np.lib.format.read_array_header_1_0(fp)
+            else:
+                header = np.lib.format.read_array_header_2_0(fp)
+        shape, _, dtype = header
+        if 'scale' in data.files:
+            dtype = np.dtype(np.float32)
+    return shape, dtype
+
+
+class FeatureStore():
+    """ Consolidated storage of the features of a folder.
+
+    Packs the features files (one npy per audio file) of a folder into
+    one contiguous array and an index that maps each file to its range
+    of rows. The array is saved as a npy file which is memory-mapped
+    when loaded, so the features of a file are read as a zero-copy slice
+    instead of opening one file per audio file.
+
+    Note that all the features files have to share the same shape
+    except in the first dimension (e.g. number of sequences).
+    The quantized or compressed features (see save_features()) are
+    decoded when they are packed.
+
+    Parameters
+    ----------
+    path : str
+        Path to the features folder (e.g. a features subfolder such as
+        {DATASET_PATH}/features/MelSpectrogram/original).
+
+    Attributes
+    ----------
+    data : numpy.memmap or None
+        Memory-mapped array with the features of all the files.
+        Defined in open().
+    index : dict or None
+        Dict of form {features_file: [start, end]}. The paths to the
+        features files are relative to path. Defined in open().
+
+    Examples
+    --------
+    Pack the features extracted for a dataset and get the features
+    of one file.
+
+    >>> from dcase_models.data.feature_store import FeatureStore
+    >>> feature_store = FeatureStore(
+        '../datasets/ESC50/features/MelSpectrogram/original')
+    >>> feature_store.pack()
+    >>> features = feature_store.get('1-100032-A-0.npy')
+
+    """
+    data_file_name = 'features_store.npy'
+    index_file_name = 'features_index.json'
+
+    def __init__(self, path):
+        """ Initialize the FeatureStore.
+
+        """
+        self.path = path
+        self.data_file = os.path.join(path, self.data_file_name)
+        self.index_file = os.path.join(path, self.index_file_name)
+        self.data = None
+        self.index = None
+
+    def list_features_files(self):
+        """ Lists the features files (npy) in path, including subfolders.
+
+        Returns
+        -------
+        list of str
+            List of paths to the features files relative to path.
+
+        """
+        features_files = []
+        for path_to_file in list_all_files(self.path):
+            if ((not path_to_file.endswith('.npy')) or
+               (path_to_file == self.data_file)):
+                continue
+            features_files.append(os.path.relpath(path_to_file, self.path))
+        return sorted(features_files)
+
+    def pack(self):
+        """ Packs all the features files in path into the store.
+
+        """
+        features_files = self.list_features_files()
+        if len(features_files) == 0:
+            raise AttributeError('There are no features files in %s' %
+                                 self.path)
+
+        # Read the headers to get the range of rows of each file
+        index = {}
+        n_rows = 0
+        features_shape = None
+        dtype = None
+        for features_file in features_files:
+            shape, features_dtype = _load_features_header(
+                os.path.join(self.path, features_file))
+            if features_shape is None:
+                features_shape = shape[1:]
+                dtype = features_dtype
+            if shape[1:] != features_shape:
+                raise AttributeError(
+                    ('All the features files have to share the same shape '
+                     'in the dimensions after the first one: %s' %
+                     features_file)
+                )
+            index[features_file] = [n_rows, n_rows + shape[0]]
+            n_rows += shape[0]
+
+        # Copy the features into the packed array
+        data_file_tmp = self.data_file + '.tmp'
+        data = np.lib.format.open_memmap(
+            data_file_tmp, mode='w+', dtype=dtype,
+            shape=(n_rows,) + features_shape
+        )
+        for features_file in features_files:
+            start, end = index[features_file]
+            data[start:end] = load_features(
+                os.path.join(self.path, features_file))
+        data.flush()
+        del data
+        os.replace(data_file_tmp, self.data_file)
+        save_json(self.index_file, index)
+
+        self.data = None
+        self.index = None
+
+    def check_if_packed(self):
+        """ Checks if the features in path were packed.
+
+        Returns
+        -------
+        bool
+            True if the store and the index files exist.
+
+        """
+        return (os.path.exists(self.data_file) and
+                os.path.exists(self.index_file))
+
+    def open(self):
+        """ Loads the index and memory-maps the packed array.
+
+        """
+        if not self.check_if_packed():
+            raise AttributeError(
+                'The features in %s were not packed' % self.path)
+        self.data = np.load(self.data_file, mmap_mode='r')
+        self.index = load_json(self.index_file)
+
+    def get(self, features_file):
+        """ Returns the features of a file.
+
+        Parameters
+        ----------
+        features_file : str
+            Path to the features file relative to path.
+
+        Returns
+        -------
+        ndarray
+            Read-only view of the features of features_file.
+
+        """
+        if self.data is None:
+            self.open()
+        start, end = self.index[features_file]
+        return self.data[start:end]
+
+    def __getstate__(self):
+        """ Avoids copying the memory-mapped array when pickling.
+
+        The array is memory-mapped again when it is needed.
+
+        """
+        state = self.__dict__.copy()
+        state['data'] = None
+        return state
@@ -3,6 +3,7 @@ import librosa
 import openl3
 import inspect
 import sys
+from scipy.fftpack import dct
 
 from .feature_extractor import FeatureExtractor
 from ..model.models import VGGish
@@ -63,47 +64,55 @@ class Spectrogram(FeatureExtractor):
     >>> features.extract(dataset)
     """
 
+    stft_center = True
+
     def __init__(self, sequence_time=1.0, sequence_hop_time=0.5,
                  audio_win=1024, audio_hop=680, sr=22050,
-                 n_fft=1024, pad_mode='reflect'):
+                 n_fft=1024, pad_mode='reflect',
+                 storage_dtype=None, storage_compression=False,
+                 store_frames=False):
 
         super().__init__(sequence_time=sequence_time,
                          sequence_hop_time=sequence_hop_time,
                          audio_win=audio_win, audio_hop=audio_hop,
-                         sr=sr)
+                         sr=sr, storage_dtype=storage_dtype,
+                         storage_compression=storage_compression,
+                         store_frames=store_frames)
 
         self.n_fft = n_fft
         self.pad_mode = pad_mode
 
     def calculate(self, file_name):
         audio = self.load_audio(file_name)
+        return self.calculate_from_audio(audio)
 
-        # Padding
-        audio = self.pad_audio(audio)
+    def calculate_from_audio(self, audio):
+        # Padded power spectrogram, shape (N_freqs, N_frames)
+        spectrogram = self.power_spectrogram(audio)
 
-        # Spectrogram, shape (N_frames, N_freqs)
-        stft = librosa.core.stft(audio, n_fft=self.n_fft,
-                                 hop_length=self.audio_hop,
-                                 win_length=self.audio_win, center=True)
+        # Convert to db and to sequences (frames),
+        # shape (N_sequences, N_sequence_frames, N_freqs)
+        return self.calculate_from_spectrogram(spectrogram)
 
-        # Power
-        spectrogram = np.abs(stft)**2
+    def features_from_spectrogram(self, spectrogram):
+        """ Calculates the frame-level features from a power spectrogram.
 
-        # Convert to db
-        spectrogram = librosa.power_to_db(spectrogram)
+        Parameters
+        ----------
+        spectrogram : ndarray
+            Power spectrogram, shape (N_freqs, N_frames).
 
-        # Transpose time and freq dims, shape
-        spectrogram = spectrogram.T
+        Returns
+        -------
+        ndarray
+            Log-scaled spectrogram, shape (N_frames, N_freqs).
 
-        # Convert to sequences (frames),
-        # shape (N_sequences, N_sequence_frames, N_freqs)
-        # spectrogram = np.ascontiguousarray(spectrogram)
-        # spectrogram = librosa.util.frame(
-        #     spectrogram, self.sequence_frames, self.sequence_hop, axis=0
-        # )
-        spectrogram = self.convert_to_sequences(spectrogram)
+        """
+        # Convert to db
+        spectrogram = librosa.power_to_db(spectrogram)
 
-        return spectrogram
+        # Transpose time and freq dims, shape (N_frames, N_freqs)
+        return spectrogram.T
 
 
 class MelSpectrogram(FeatureExtractor):
@@ -164,15 +173,20 @@ class MelSpectrogram(FeatureExtractor):
     >>> features.extract(dataset)
 
     """
+    stft_center = False
+
     def __init__(self, sequence_time=1.0, sequence_hop_time=0.5,
                  audio_win=1024, audio_hop=680, sr=22050,
                  n_fft=1024, mel_bands=64,
-                 pad_mode='reflect', **kwargs):
+                 pad_mode='reflect', storage_dtype=None,
+                 storage_compression=False, store_frames=False, **kwargs):
 
         super().__init__(sequence_time=sequence_time,
                          sequence_hop_time=sequence_hop_time,
                          audio_win=audio_win, audio_hop=audio_hop,
-                         sr=sr)
+                         sr=sr, storage_dtype=storage_dtype,
+                         storage_compression=storage_compression,
+                         store_frames=store_frames)
 
         self.n_fft = n_fft
         self.pad_mode = pad_mode
@@ -187,19 +201,30 @@ class MelSpectrogram(FeatureExtractor):
     def calculate(self, file_name):
         # Load audio
         audio = self.load_audio(file_name)
-        # if len(audio) < self.audio_win:
-        #     return None
+        return self.calculate_from_audio(audio)
 
-        # Pad audio signal
-        audio = self.pad_audio(audio)
-                        
-        # Get the spectrogram, shape (N_freqs, N_frames)
-        stft = librosa.core.stft(audio, n_fft=self.n_fft,
-                                 hop_length=self.audio_hop,
-                                 win_length=self.audio_win, center=False)
-        # Convert to power
-        spectrogram = np.abs(stft)**2
+    def calculate_from_audio(self, audio):
+        # Padded power spectrogram, shape (N_freqs, N_frames)
+        spectrogram = self.power_spectrogram(audio)
+
+        # Convert to mel_spectrogram in db and to sequences (frames),
+        # shape (N_sequences, N_sequence_frames, N_bands)
+        return self.calculate_from_spectrogram(spectrogram)
+
+    def features_from_spectrogram(self, spectrogram):
+        """ Calculates the frame-level features from a power spectrogram.
 
+        Parameters
+        ----------
+        spectrogram : ndarray
+            Power spectrogram, shape (N_freqs, N_frames).
+
+        Returns
+        -------
+        ndarray
+            Log-scaled mel-spectrogram, shape (N_frames, N_bands).
+
+        """
         # Convert to mel_spectrogram, shape (N_bands, N_frames)
         mel_spectrogram = self.mel_basis.dot(spectrogram)
         assert mel_spectrogram.shape[0] == self.mel_bands
@@ -208,20 +233,80 @@ class MelSpectrogram(FeatureExtractor):
         mel_spectrogram = librosa.power_to_db(mel_spectrogram)
 
         # Transpose time and freq dims, shape (N_frames, N_bands)
-        mel_spectrogram = mel_spectrogram.T
+        return mel_spectrogram.T
 
-        # Pad the mel_spectrogram, shape (N_frames', N_bands)
-        # mel_spectrogram = librosa.util.fix_length(
-        #     mel_spectrogram,
-        #     mel_spectrogram.shape[0]+self.sequence_frames,
-        #     axis=0, mode='reflect'
-        # )
+    def calculate_batch(self, file_names):
+        """ Calculates the mel-spectrograms of several files at once.
 
-        # Convert to sequences (frames),
-        # shape (N_sequences, N_sequence_frames, N_bands)
-        mel_spectrogram = self.convert_to_sequences(mel_spectrogram)
+        The padded signals of equal length are stacked and processed with
+        vectorized operations (framing, FFT and mel projection). The
+        output has the same shape and data type of calling calculate()
+        for each file, and it is equal up to the float32 precision of
+        the FFT.
+
+        Parameters
+        ----------
+        file_names : list of str
+            List of paths to the audio files
+
+        Returns
+        -------
+        list of ndarray
+            mel-spectrogram sequences of each file, in the same order
+            of file_names.
 
-        return mel_spectrogram
+        """
+        # Load and pad audio signals, group by length
+        audios = [self.pad_audio(self.load_audio(file_name))
+                  for file_name in file_names]
+        groups = {}
+        for j, audio in enumerate(audios):
+            groups.setdefault(len(audio), []).append(j)
+
+        # Window of length audio_win centered in n_fft samples
+        window = librosa.filters.get_window(
+            'hann', self.audio_win, fftbins=True).astype(np.float32)
+        lpad = (self.n_fft - self.audio_win) // 2
+        window = np.pad(
+            window, (lpad, self.n_fft - self.audio_win - lpad),
+            mode='constant')
+
+        mel_spectrograms = [None]*len(file_names)
+        for n_samples, indexes in groups.items():
+            if n_samples < self.n_fft:
+                for j in indexes:
+                    mel_spectrograms[j] = self.calculate(file_names[j])
+                continue
+
+            # Frames, shape (N_files, N_frames, n_fft)
+            audio = np.stack([audios[j] for j in indexes]).astype(np.float32)
+            n_frames = 1 + (n_samples - self.n_fft) // self.audio_hop
+            frames = np.lib.stride_tricks.as_strided(
+                audio, shape=(len(indexes), n_frames, self.n_fft),
+                strides=(audio.strides[0],
+                         audio.strides[1]*self.audio_hop,
+                         audio.strides[1]),
+                writeable=False
+            )
+
+            # Power spectrogram, shape (N_files, N_frames, N_freqs), with
+            # the data type of power_spectrogram() (depends on librosa)
+            spectrogram_dtype = self.power_spectrogram(
+                np.zeros(self.n_fft, dtype=audios[indexes[0]].dtype)).dtype
+            stft = np.fft.rfft(frames * window, axis=-1)
+            spectrogram = (stft.real**2 + stft.imag**2).astype(
+                spectrogram_dtype)
+
+            # Mel-spectrogram, shape (N_files, N_frames, N_bands)
+            mel_spectrogram = np.matmul(spectrogram, self.mel_basis.T)
+
+            # Convert to db as in features_from_spectrogram(), so the
+            # data type is the same of calculate()
+            for k, j in enumerate(indexes):
+                mel_spectrograms[j] = self.convert_to_sequences(
+                    librosa.power_to_db(mel_spectrogram[k]))
+
+        return mel_spectrograms
 
 
 class MFCC(FeatureExtractor):
@@ -249,10 +334,37 @@ class MFCC(FeatureExtractor):
         to librosa.util.fix_length for padding the signal. If pad_mode is None,
         no padding is applied.
 
+    n_mfcc : int, default=20
+        Number of MFCCs.
+
+    dct_type : {1, 2, 3}, default=2
+        Discrete cosine transform (DCT) type.
+        Refer to `librosa.feature.mfcc` for further information.
+
+    norm : None or 'ortho', default='ortho'
+        Normalization of the DCT.
+
+    lifter : float, default=0
+        If lifter>0, apply liftering (cepstral filtering) to the MFCCs.
+
+    dtype : {'float64', 'float32'}, default='float64'
+        Data type used to calculate the MFCCs (and of the output): the
+        power spectrogram, the mel projection and the DCT are calculated
+        in this data type. float32 is faster and its MFCCs differ from
+        those calculated in float64 only by the float32 rounding errors.
+        Use storage_dtype to reduce the size of the saved features.
+
     kwargs
         Additional keyword arguments to `librosa.filters.mel`.
 
 
+    Attributes
+    ----------
+    dct_matrix : ndarray
+        DCT matrix with the liftering included, shape (N_MFCC, N_bands).
+        The MFCCs are calculated as dct_matrix.dot(log_mel_spectrogram).
+
+
     See Also
     --------
     FeatureExtractor : FeatureExtractor base class
@@ -282,16 +394,21 @@ class MFCC(FeatureExtractor):
     >>> features.extract(dataset)
 
     """
+    stft_center = False
+
     def __init__(self, sequence_time=1.0, sequence_hop_time=0.5,
                  audio_win=1024, audio_hop=680, sr=22050,
                  n_fft=1024, n_mfcc=20, dct_type=2,
                  norm='ortho', lifter=0,
-                 pad_mode='reflect', **kwargs):
+                 pad_mode='reflect', dtype='float64', storage_dtype=None,
+                 storage_compression=False, store_frames=False, **kwargs):
 
         super().__init__(sequence_time=sequence_time,
                          sequence_hop_time=sequence_hop_time,
                          audio_win=audio_win, audio_hop=audio_hop,
-                         sr=sr)
+                         sr=sr, storage_dtype=storage_dtype,
+                         storage_compression=storage_compression,
+                         store_frames=store_frames)
 
         self.n_fft = n_fft
         self.pad_mode = pad_mode
@@ -299,6 +416,12 @@ class MFCC(FeatureExtractor):
         self.dct_type = dct_type
         self.norm = norm
         self.lifter = lifter
+        self.dtype = dtype
+
+        if dtype not in ['float64', 'float32']:
+            raise AttributeError('dtype has to be float64 or float32')
+        if lifter < 0:
+            raise AttributeError('lifter has to be a positive number')
 
         kwargs.setdefault('htk', True)
         kwargs.setdefault('fmax', None)
@@ -308,23 +431,73 @@ class MFCC(FeatureExtractor):
         kwargs.setdefault('n_mels', 128)
 
         self.mel_basis = librosa.filters.mel(
-            sr, n_fft, **kwargs)
+            sr, n_fft, **kwargs).astype(dtype)
+
+        # DCT of the log-mel spectrogram as a matrix product,
+        # shape (N_MFCC, N_bands)
+        n_mels = self.mel_basis.shape[0]
+        dct_matrix = dct(np.eye(n_mels), axis=0, type=dct_type,
+                         norm=norm)[:n_mfcc]
+        if lifter > 0:
+            dct_matrix *= 1 + (lifter / 2) * np.sin(
+                np.pi * np.arange(1, 1 + n_mfcc) / lifter)[:, np.newaxis]
+        self.dct_matrix = dct_matrix.astype(dtype)
 
     def calculate(self, file_name):
         # Load audio
         audio = self.load_audio(file_name)
-        # if len(audio) < self.audio_win:
-        #     return None
+        return self.calculate_from_audio(audio)
 
-        # Pad audio signal
-        audio = self.pad_audio(audio)
+    def calculate_from_audio(self, audio):
+        # Padded power spectrogram, shape (N_freqs, N_frames)
+        spectrogram = self.power_spectrogram(audio)
+
+        # Calculate MFCCs and convert to sequences (frames),
+        # shape (N_sequences, N_sequence_frames, N_MFCC)
+        return self.calculate_from_spectrogram(spectrogram)
+
+    def get_stft_parameters(self):
+        parameters = super().get_stft_parameters()
+        if self.dtype == 'float64':
+            return parameters
+        # The power spectrogram is not shared with float64 extractors
+        return parameters + (self.dtype,)
+
+    def power_spectrogram(self, audio):
+        """ Pads an audio signal and calculates its power spectrogram.
 
-        # Get the spectrogram, shape (N_freqs, N_frames)
-        stft = librosa.core.stft(audio, n_fft=self.n_fft,
-                                 hop_length=self.audio_hop,
-                                 win_length=self.audio_win, center=False)
-        # Convert to power
-        spectrogram = np.abs(stft)**2
+        The audio signal is converted to dtype before the STFT, so the
+        power spectrogram is calculated in float32 if dtype is float32.
+
+        Parameters
+        ----------
+        audio : ndarray
+            audio signal sampled at self.sr
+
+        Returns
+        -------
+        ndarray
+            Power spectrogram, shape (N_freqs, N_frames).
+
+        """
+        return super().power_spectrogram(
+            audio.astype(self.dtype, copy=False))
+
+    def features_from_spectrogram(self, spectrogram):
+        """ Calculates the frame-level features from a power spectrogram.
+
+        Parameters
+        ----------
+        spectrogram : ndarray
+            Power spectrogram, shape (N_freqs, N_frames).
+
+        Returns
+        -------
+        ndarray
+            MFCCs, shape (N_frames, N_MFCC).
+
+        """
+        spectrogram = spectrogram.astype(self.mel_basis.dtype, copy=False)
 
         # Convert to mel_spectrogram, shape (N_bands, N_frames)
         mel_spectrogram = self.mel_basis.dot(spectrogram)
@@ -332,27 +505,13 @@ class MFCC(FeatureExtractor):
         # Convert to db
         mel_spectrogram = librosa.power_to_db(mel_spectrogram)
 
-        # Calculate MFCCs
-        mfcc = librosa.feature.mfcc(S=mel_spectrogram,
-                                    n_mfcc=self.n_mfcc,
-                                    dct_type=self.dct_type,
-                                    norm=self.norm,
-                                    lifter=self.lifter)
+        # Calculate MFCCs, shape (N_MFCC, N_frames)
+        mfcc = self.dct_matrix.dot(mel_spectrogram)
 
         assert mfcc.shape[0] == self.n_mfcc
 
         # Transpose time and freq dims, shape (N_frames, N_MFCC)
-        mfcc = mfcc.T
-
-        # Convert to sequences (frames),
-        # shape (N_sequences, N_sequence_frames, N_MFCC)
-        # mfcc = np.ascontiguousarray(mfcc)
-        # mfcc = librosa.util.frame(
-        #     mfcc, self.sequence_frames, self.sequence_hop, axis=0
-        # )
-        mfcc = self.convert_to_sequences(mfcc)
-
-        return mfcc
+        return mfcc.T
 
 
 class Openl3(FeatureExtractor):
@@ -410,12 +569,14 @@ class Openl3(FeatureExtractor):
     """
     def __init__(self, sequence_time=1.0, sequence_hop_time=0.5,
                  audio_win=1024, audio_hop=680, sr=22050,
-                 content_type="env", input_repr="mel256", embedding_size=512):
+                 content_type="env", input_repr="mel256", embedding_size=512,
+                 storage_dtype=None, storage_compression=False):
 
         super().__init__(sequence_time=sequence_time,
                          sequence_hop_time=sequence_hop_time,
                          audio_win=audio_win, audio_hop=audio_hop,
-                         sr=sr)
+                         sr=sr, storage_dtype=storage_dtype,
+                         storage_compression=storage_compression)
 
         self.content_type = content_type
         self.input_repr = input_repr
@@ -425,6 +586,9 @@ class Openl3(FeatureExtractor):
 
     def calculate(self, file_name):
         audio = self.load_audio(file_name, change_sampling_rate=False)
+        return self.calculate_from_audio(audio)
+
+    def calculate_from_audio(self, audio):
         emb, ts = openl3.get_audio_embedding(
             audio, self.sr,
             model=self.openl3,
@@ -450,12 +614,14 @@ class RawAudio(FeatureExtractor):
     """
     def __init__(self, sequence_time=1.0, sequence_hop_time=0.5,
                  audio_win=1024, audio_hop=680, sr=22050,
-                 pad_mode='reflect'):
+                 pad_mode='reflect', storage_dtype=None,
+                 storage_compression=False):
 
         super().__init__(sequence_time=sequence_time,
                          sequence_hop_time=sequence_hop_time,
                          audio_win=audio_win, audio_hop=audio_hop,
-                         sr=sr)
+                         sr=sr, storage_dtype=storage_dtype,
+                         storage_compression=storage_compression)
 
         self.pad_mode = pad_mode
 
@@ -466,7 +632,9 @@ class RawAudio(FeatureExtractor):
 
     def calculate(self, file_name):
         audio = self.load_audio(file_name, change_sampling_rate=False)
+        return self.calculate_from_audio(audio)
 
+    def calculate_from_audio(self, audio):
         if self.pad_mode is not None:
             audio = librosa.util.fix_length(
                 audio,
@@ -498,12 +666,15 @@ class FramesAudio(FeatureExtractor):
     """
     def __init__(self, sequence_time=1.0, sequence_hop_time=0.5,
                  audio_win=1024, audio_hop=680, sr=22050, n_fft=1024,
-                 pad_mode='reflect'):
+                 pad_mode='reflect', storage_dtype=None,
+                 storage_compression=False, store_frames=False):
 
         super().__init__(sequence_time=sequence_time,
                          sequence_hop_time=sequence_hop_time,
                          audio_win=audio_win, audio_hop=audio_hop,
-                         sr=sr)
+                         sr=sr, storage_dtype=storage_dtype,
+                         storage_compression=storage_compression,
+                         store_frames=store_frames)
 
         self.n_fft = n_fft
         self.pad_mode = pad_mode
@@ -515,7 +686,9 @@ class FramesAudio(FeatureExtractor):
 
     def calculate(self, file_name):
         audio = self.load_audio(file_name, change_sampling_rate=False)
+        return self.calculate_from_audio(audio)
 
+    def calculate_from_audio(self, audio):
         audio = self.pad_audio(audio)
 
         audio = np.ascontiguousarray(audio)
@@ -548,7 +721,8 @@ class VGGishEmbeddings(FeatureExtractor):
 
     """
     def __init__(self, sequence_hop_time=0.96,
-                 pad_mode='reflect', include_top=True, compress=True):
+                 pad_mode='reflect', include_top=True, compress=True,
+                 storage_dtype=None, storage_compression=False):
 
         sequence_time = 0.96
         audio_win = 400
@@ -562,7 +736,8 @@ class VGGishEmbeddings(FeatureExtractor):
         super().__init__(sequence_time=sequence_time,
                          sequence_hop_time=sequence_hop_time,
                          audio_win=audio_win, audio_hop=audio_hop,
-                         sr=sr)
+                         sr=sr, storage_dtype=storage_dtype,
+                         storage_compression=storage_compression)
 
         self.n_fft = n_fft
         self.pad_mode = pad_mode
@@ -764,7 +939,9 @@ class VGGishEmbeddings(FeatureExtractor):
 
     def calculate(self, file_name):
         audio = self.load_audio(file_name, change_sampling_rate=False)
+        return self.calculate_from_audio(audio)
 
+    def calculate_from_audio(self, audio):
         if self.pad_mode is not None:
             audio = librosa.util.fix_length(
                 audio,
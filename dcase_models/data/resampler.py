@@ -0,0 +1,143 @@
+import os
+import sox
+import numpy as np
+import soundfile as sf
+from fractions import Fraction
+from scipy.signal import resample_poly, resample
+
+
+__all__ = ['Resampler']
+
+
+class Resampler():
+    """ Changes the sampling rate (and format) of audio files and signals.
+
+    Dataset uses an instance of this class to resample the audio files
+    (see Dataset.change_sampling_rate()) and to convert them
+    to wav (see Dataset.convert_to_wav()).
+
+    Parameters
+    ----------
+    backend : {'sox', 'polyphase', 'fft'}, default='sox'
+        Resampling method.
+
+        - 'sox': the files are converted by sox (one subprocess per file).
+          Signals in memory can not be resampled with this backend.
+        - 'polyphase': in-process polyphase filtering
+          (scipy.signal.resample_poly).
+        - 'fft': in-process resampling in frequency domain
+          (scipy.signal.resample).
+
+    Examples
+    --------
+    Resample a dataset without sox subprocesses.
+
+    >>> from dcase_models.data.datasets import ESC50
+    >>> from dcase_models.data.resampler import Resampler
+    >>> dataset = ESC50('../datasets/ESC50')
+    >>> dataset.resampler = Resampler('polyphase')
+    >>> dataset.change_sampling_rate(22050)
+
+    Resample an audio signal.
+
+    >>> resampler = Resampler('polyphase')
+    >>> audio_22050 = resampler.resample(audio_44100, 44100, 22050)
+
+    """
+
+    def __init__(self, backend='sox'):
+        """ Initialize the Resampler.
+
+        """
+        if backend not in ['sox', 'polyphase', 'fft']:
+            raise AttributeError('backend has to be sox, polyphase or fft')
+        self.backend = backend
+
+    def resample(self, audio, sr_orig, sr):
+        """ Resamples an audio signal.
+
+        Parameters
+        ----------
+        audio : ndarray
+            Audio signal, shape (N_samples,) or (N_samples, N_channels).
+        sr_orig : int
+            Sampling rate of audio.
+        sr : int
+            New sampling rate.
+
+        Returns
+        -------
+        ndarray
+            Resampled audio signal.
+
+        """
+        if sr_orig == sr:
+            return audio
+        if self.backend == 'polyphase':
+            ratio = Fraction(int(sr), int(sr_orig))
+            return resample_poly(
+                audio, ratio.numerator, ratio.denominator, axis=0)
+        if self.backend == 'fft':
+            n_samples = int(np.ceil(len(audio) * float(sr) / sr_orig))
+            return resample(audio, n_samples, axis=0)
+        raise AttributeError(
+            'The sox backend can not resample signals in memory')
+
+    def resample_file(self, path_to_file, path_to_destination, sr):
+        """ Resamples an audio file and saves the result.
+
+        Parameters
+        ----------
+        path_to_file : str
+            Path to the original audio file.
+        path_to_destination : str
+            Path to the resampled audio file.
+        sr : int
+            New sampling rate.
+
+        """
+        if self.backend == 'sox':
+            tfm = sox.Transformer()
+            tfm.convert(samplerate=sr)
+            tfm.build(path_to_file, path_to_destination)
+            return
+
+        audio, sr_orig = sf.read(path_to_file)
+        audio = self.resample(audio, sr_orig, sr)
+        self._write(path_to_destination, audio, sr,
+                    sf.info(path_to_file).subtype)
+
+    def convert_file(self, path_to_file, path_to_destination):
+        """ Converts an audio file to the format of path_to_destination.
+
+        The format is given by the extension (e.g. '.wav').
+
+        Parameters
+        ----------
+        path_to_file : str
+            Path to the original audio file.
+        path_to_destination : str
+            Path to the converted audio file.
+
+        """
+        if self.backend == 'sox':
+            tfm = sox.Transformer()
+            tfm.build(path_to_file, path_to_destination)
+            return
+
+        audio, sr = sf.read(path_to_file)
+        subtype = sf.info(path_to_file).subtype
+        extension = os.path.splitext(path_to_destination)[1][1:].upper()
+        if not sf.check_format(extension, subtype):
+            subtype = None
+        self._write(path_to_destination, audio, sr, subtype)
+
+    def _write(self, path_to_destination, audio, sr, subtype=None):
+        """ Helper of resample_file() and convert_file().
+
+        Clips the signal when it is saved as integer PCM.
+
+        """
+        if (subtype is not None) and subtype.startswith('PCM'):
+            audio = np.clip(audio, -1.0, 1.0)
+        sf.write(path_to_destination, audio, sr, subtype=subtype)
@@ -1,21 +1,316 @@
 from .data_generator import DataGenerator
+from ..util.misc import parallel_map
+import os
+import copy
 import numpy as np
 from sklearn.preprocessing import StandardScaler
 import inspect
 
 
+def compute_statistics(X, sketch_bins=None):
+    """ Computes the sufficient statistics of X for each band.
+
+    The bands are given by the last axis of X. The statistics of
+    different arrays can be merged exactly with merge_statistics().
+
+    If sketch_bins is not None, a histogram of each band is included to
+    estimate its quantiles (see get_quantiles()). The width of the bins
+    is the smallest power of two that covers the range of the band with
+    sketch_bins bins, so the histograms can be merged without
+    depending on the order of the arrays.
+
+    Parameters
+    ----------
+    X : ndarray
+        Data array.
+    sketch_bins : int or None, default=None
+        Maximum number of bins of the histogram of each band.
+
+    Returns
+    -------
+    dict
+        Dict with the number of rows ('count'), and the mean ('mean'),
+        sum of squared deviations ('m2'), minimum ('min') and
+        maximum ('max') of each band. If sketch_bins is not None, it
+        includes the histograms ('sketch').
+
+    """
+    X = np.reshape(X, (-1, X.shape[-1]))
+    n_bands = X.shape[-1]
+    if len(X) == 0:
+        statistics = {'count': 0, 'mean': np.zeros(n_bands),
+                      'm2': np.zeros(n_bands),
+                      'min': np.full(n_bands, np.inf),
+                      'max': np.full(n_bands, -np.inf)}
+    else:
+        mean = np.mean(X, axis=0, dtype=np.float64)
+        statistics = {'count': len(X), 'mean': mean,
+                      'm2': np.sum((X - mean)**2, axis=0),
+                      'min': np.amin(X, axis=0).astype(np.float64),
+                      'max': np.amax(X, axis=0).astype(np.float64)}
+    if sketch_bins is not None:
+        statistics['sketch'] = _compute_sketch(
+            X, statistics['min'], statistics['max'], sketch_bins)
+    return statistics
+
+
+def merge_statistics(statistics_a, statistics_b):
+    """ Merges the statistics of two arrays.
+
+    The result is the same (up to rounding errors) as computing the
+    statistics of the concatenation of both arrays. The histograms are
+    only merged if both statistics include them.
+
+    Parameters
+    ----------
+    statistics_a : dict
+        Statistics of the first array (see compute_statistics()).
+    statistics_b : dict
+        Statistics of the second array.
+
+    Returns
+    -------
+    dict
+        Merged statistics.
+
+    """
+    count_a = statistics_a['count']
+    count_b = statistics_b['count']
+    if count_b == 0:
+        return statistics_a
+    if count_a == 0:
+        return statistics_b
+    count = count_a + count_b
+    delta = statistics_b['mean'] - statistics_a['mean']
+    statistics = {
+        'count': count,
+        'mean': statistics_a['mean'] + delta * count_b / count,
+        'm2': (statistics_a['m2'] + statistics_b['m2'] +
+               delta**2 * count_a * count_b / count),
+        'min': np.minimum(statistics_a['min'], statistics_b['min']),
+        'max': np.maximum(statistics_a['max'], statistics_b['max'])
+    }
+    if ('sketch' in statistics_a) and ('sketch' in statistics_b):
+        statistics['sketch'] = _merge_sketches(
+            statistics_a['sketch'], statistics_b['sketch'],
+            statistics['min'], statistics['max'])
+    return statistics
+
+
+def get_quantiles(statistics, quantiles):
+    """ Estimates the quantiles of each band from the histograms.
+
+    The values are interpolated linearly inside each bin, so the error
+    is smaller than the width of the bins.
+
+    Parameters
+    ----------
+    statistics : dict
+        Statistics including the histograms (see compute_statistics()).
+    quantiles : list of float
+        Quantiles to be estimated (between 0 and 1).
+
+    Returns
+    -------
+    ndarray
+        Quantiles of each band, shape (len(quantiles), N_bands).
+
+    """
+    if 'sketch' not in statistics:
+        raise AttributeError(
+            'The statistics were calculated without sketch_bins')
+    sketch = statistics['sketch']
+    n_bands = len(sketch['width'])
+    values = np.zeros((len(quantiles), n_bands))
+    if statistics['count'] == 0:
+        return values
+    cumulative = np.cumsum(sketch['counts'], axis=1)
+    for band in range(n_bands):
+        for k, quantile in enumerate(quantiles):
+            target = quantile * statistics['count']
+            ix = min(np.searchsorted(cumulative[band], target),
+                     cumulative.shape[1] - 1)
+            previous = cumulative[band, ix - 1] if ix > 0 else 0
+            fraction = ((target - previous) /
+                        max(sketch['counts'][band, ix], 1))
+            values[k, band] = (
+                (sketch['start'][band] + ix + fraction) *
+                sketch['width'][band])
+    return np.clip(values, statistics['min'], statistics['max'])
+
+
+def _handle_zeros(scale):
+    """ Replaces the (almost) zero values of scale by one.
+
+    Avoids divisions by zero when a band is constant.
+
+    """
+    scale = np.array(scale, dtype=np.float64)
+    scale[scale < 10 * np.finfo(scale.dtype).eps] = 1.0
+    return scale
+
+
+def _sketch_width(min_v, max_v, n_bins, width):
+    """ Helper of the sketch functions. Returns the width of the bins.
+
+    The width is the smallest power of two (not smaller than width)
+    such that the range [min_v, max_v] is covered by n_bins bins.
+
+    """
+    width = max(width, 2.**-16)
+    if max_v > min_v:
+        width = max(width, 2.**np.ceil(np.log2((max_v - min_v) / n_bins)))
+    while np.floor(max_v / width) - np.floor(min_v / width) >= n_bins:
+        width *= 2
+    return width
+
+
+def _compute_sketch(X, min_v, max_v, n_bins):
+    """ Helper of compute_statistics(). Histogram of each band of X.
+
+    """
+    n_bands = X.shape[-1]
+    sketch = {'width': np.zeros(n_bands),
+              'start': np.zeros(n_bands, dtype=np.int64),
+              'counts': np.zeros((n_bands, n_bins), dtype=np.int64)}
+    for band in range(n_bands):
+        width = _sketch_width(min_v[band], max_v[band], n_bins, 0)
+        sketch['width'][band] = width
+        if len(X) == 0:
+            continue
+        bins = np.floor(X[:, band] / width).astype(np.int64)
+        sketch['start'][band] = np.amin(bins)
+        sketch['counts'][band] = np.bincount(
+            bins - sketch['start'][band], minlength=n_bins)
+    return sketch
+
+
+def _merge_sketches(sketch_a, sketch_b, min_v, max_v):
+    """ Helper of merge_statistics(). Merges two histograms.
+
+    The bins of both histograms are joined in pairs until they have the
+    width needed to cover the range [min_v, max_v].
+
+    """
+    n_bands, n_bins = sketch_a['counts'].shape
+    sketch = {'width': np.zeros(n_bands),
+              'start': np.zeros(n_bands, dtype=np.int64),
+              'counts': np.zeros((n_bands, n_bins), dtype=np.int64)}
+    for band in range(n_bands):
+        width = _sketch_width(
+            min_v[band], max_v[band], n_bins,
+            max(sketch_a['width'][band], sketch_b['width'][band]))
+        sketch['width'][band] = width
+        bins = []
+        counts = []
+        for sketch_x in [sketch_a, sketch_b]:
+            factor = int(round(width / sketch_x['width'][band]))
+            nonzero = np.nonzero(sketch_x['counts'][band])[0]
+            bins.append((sketch_x['start'][band] + nonzero) // factor)
+            counts.append(sketch_x['counts'][band, nonzero])
+        bins = np.concatenate(bins)
+        counts = np.concatenate(counts)
+        if len(bins) == 0:
+            continue
+        sketch['start'][band] = np.amin(bins)
+        sketch['counts'][band] = np.bincount(
+            bins - sketch['start'][band], weights=counts,
+            minlength=n_bins).astype(np.int64)
+    return sketch
+
+
+def _shard_statistics(data_generator, list_files, n_sequences, indexes,
+                      inputs, sketch_indexes, sketch_bins):
+    """ Helper of Scaler.fit(). Computes the statistics of each file.
+
+    Only the arrays in indexes are loaded. The annotations are calculated
+    from the number of sequences, so the features are not loaded.
+    The histograms of the arrays in sketch_indexes are merged for the
+    whole shard.
+
+    Returns
+    -------
+    list of dict
+        Dict of form {array_index: statistics} for each file (without
+        histograms).
+    dict
+        Dict of form {array_index: statistics} with the statistics
+        (and histograms) of the shard for each array in sketch_indexes.
+
+    """
+    arrays = data_generator.inputs if inputs else data_generator.outputs
+    statistics = []
+    statistics_shard = {}
+    for file_dict, n_seq, indexes_file in zip(
+            list_files, n_sequences, indexes):
+        statistics_file = {}
+        for j in indexes_file:
+            if type(arrays[j]) is not str:
+                X = data_generator.load_features(
+                    arrays[j], file_dict['file_original'],
+                    file_dict['sub_folder'])
+            else:
+                X = data_generator.dataset.get_annotations_cached(
+                    file_dict['file_original'], np.zeros((n_seq, 1)),
+                    data_generator.time_resolution)
+            if j not in sketch_indexes:
+                statistics_file[j] = compute_statistics(X)
+                continue
+            statistics_j = compute_statistics(X, sketch_bins=sketch_bins)
+            statistics_file[j] = {
+                key: value for key, value in statistics_j.items()
+                if key != 'sketch'
+            }
+            if j in statistics_shard:
+                statistics_j = merge_statistics(
+                    statistics_shard[j], statistics_j)
+            statistics_shard[j] = statistics_j
+        statistics.append(statistics_file)
+    return statistics, statistics_shard
+
+
 class Scaler():
     """ Scaler object to normalize or scale the data.
 
     Parameters
     ----------
-    normalizer : {'standard' or 'minmax'}, default='standard'
-        Type of normalizer.
+    normalizer : str or list of str, default='standard'
+        Type of normalizer. If it is a list, each normalizer is applied
+        to each element of the data (e.g. for models with several inputs).
+
+        - 'standard': zero mean and unit variance for each band.
+        - 'minmax': scales the data to [-1, 1] using the global minimum
+          and maximum values.
+        - 'minmax_bands': same as 'minmax' but for each band.
+        - 'robust': subtracts the median and divides by the range given
+          by quantile_range for each band. The quantiles are estimated
+          with a histogram of each band (see compute_statistics()).
+        - 'instance': zero mean and unit variance for each band, using
+          the statistics of each array to be transformed (e.g. the
+          features of each file). It does not need to be fitted.
+
+    quantile_range : tuple, default=(25.0, 75.0)
+        Percentiles used by the robust normalizer.
+
+    sketch_bins : int, default=1024
+        Number of bins of the histograms used by the robust normalizer.
+        The error of the quantiles is smaller than twice the range of
+        each band divided by sketch_bins.
 
     Attributes
     ----------
     scaler : sklearn.preprocessing.StandardScaler or list
-        Scaler object for standard normalizer or list for minmax scaler.
+        Scaler object for standard normalizer or list for the other ones:
+        [min, max] for minmax and minmax_bands and [median, range] for
+        robust.
+
+    statistics : list of dict
+        Statistics of the data seen by the scaler for each
+        normalizer (see compute_statistics()).
+
+    transform_parameters : list of tuple
+        Scale and offset of each normalizer (see
+        get_transform_parameters()).
 
     See also
     --------
@@ -35,7 +330,11 @@ class Scaler():
     >>> print(np.amin(X), np.amax(X))
 
     """
-    def __init__(self, normalizer='standard'):
+    # Normalizers fitted from the statistics of the data
+    fitted_normalizers = ['standard', 'minmax', 'minmax_bands', 'robust']
+
+    def __init__(self, normalizer='standard', quantile_range=(25.0, 75.0),
+                 sketch_bins=1024):
         """ Initialize the Scaler.
 
         If normalizer is 'standard', initialize the sklearn object.
@@ -43,36 +342,154 @@ class Scaler():
         self.normalizer = normalizer
         if type(normalizer) is not list:
             self.normalizer = [normalizer]
+        self.quantile_range = quantile_range
+        self.sketch_bins = sketch_bins
 
         self.scaler = []
         for norm in self.normalizer:
             if norm == 'standard':
                 self.scaler.append(StandardScaler())
-            elif norm == 'minmax':
+            elif norm in ['minmax', 'minmax_bands', 'robust']:
                 self.scaler.append([])
             else:
                 self.scaler.append(None)
 
-    def fit(self, X, inputs=True):
+        self.statistics = [None]*len(self.normalizer)
+        self.transform_parameters = [None]*len(self.normalizer)
+
+    def fit(self, X, inputs=True, n_jobs=1, chunksize=8, persist=False):
         """ Fit the Scaler.
 
+        If X is a DataGenerator, the statistics of each file of
+        X.audio_file_list are calculated (in parallel if n_jobs is not 1)
+        and merged. All the normalizers are fitted in one pass over the
+        data. Only the arrays to be scaled are loaded, and the scaler and
+        the online augmentations of X are not applied.
+
         Parameters
         ----------
         X : ndarray or DataGenerator
             Data to be used in the fitting process.
+        inputs : bool, default=True
+            If True, fit the scaler to the inputs of the DataGenerator.
+            Otherwise, fit the scaler to its outputs.
+        n_jobs : int, default=1
+            Number of worker processes. If -1, use all available CPUs.
+        chunksize : int, default=8
+            Number of files processed in each call to a worker.
+        persist : bool, default=False
+            If True, the statistics of each features file are saved next
+            to the features (see FeatureExtractor.save_statistics()) and
+            reused in the next calls. The histograms of the robust
+            normalizer are not saved, so these arrays are always loaded.
 
         """
         if (DataGenerator in inspect.getmro(X.__class__)):
-            for batch_index in range(len(X)):
-                if inputs:
-                    X_batch, _ = X.get_data_batch(batch_index)
-                else:
-                    _, X_batch = X.get_data_batch(batch_index)
-                self.partial_fit(X_batch)
+            self._fit_data_generator(X, inputs, n_jobs, chunksize, persist)
             return True
         else:
             self.partial_fit(X)
 
+    def _fit_data_generator(self, data_generator, inputs, n_jobs,
+                            chunksize, persist):
+        """ Helper of fit(). Fits the Scaler to a DataGenerator.
+
+        """
+        arrays = data_generator.inputs if inputs else data_generator.outputs
+        if len(arrays) != len(self.normalizer):
+            raise AttributeError(
+                'The number of normalizers has to be equal to the '
+                'number of arrays')
+        indexes = [j for j in range(len(self.normalizer))
+                   if self.normalizer[j] in self.fitted_normalizers]
+        sketch_indexes = [j for j in indexes
+                          if self.normalizer[j] == 'robust']
+        list_files = data_generator.audio_file_list
+        sub_folders = sorted(set(
+            [file_dict['sub_folder'] for file_dict in list_files]))
+        keys = [
+            os.path.relpath(
+                file_dict['file_original'], data_generator.dataset.audio_path)
+            for file_dict in list_files
+        ]
+
+        # Statistics saved in the features folders
+        saved = {}
+        if persist:
+            for j in indexes:
+                if type(arrays[j]) is str:
+                    continue
+                features_path = arrays[j].get_features_path(
+                    data_generator.dataset)
+                saved[j] = {
+                    sub_folder: arrays[j].load_statistics(
+                        os.path.join(features_path, sub_folder))
+                    for sub_folder in sub_folders
+                }
+
+        files_statistics = []
+        pending = []
+        for k, file_dict in enumerate(list_files):
+            statistics_file = {}
+            for j in saved:
+                statistics = saved[j][file_dict['sub_folder']].get(keys[k])
+                if statistics is not None:
+                    statistics_file[j] = statistics
+            files_statistics.append(statistics_file)
+            missing = [j for j in indexes if (j not in statistics_file) or
+                       (j in sketch_indexes)]
+            if len(missing) > 0:
+                pending.append((k, missing))
+
+        results = []
+        if len(pending) > 0:
+            pending_files = [list_files[k] for k, _ in pending]
+            n_sequences = np.zeros(len(pending), dtype=int)
+            if any([type(arrays[j]) is str for j in indexes]):
+                n_sequences = data_generator.get_sequences_per_file(
+                    pending_files)
+            # The memory cache is not sent to the workers
+            data_gen = copy.copy(data_generator)
+            data_gen.memory_cache = None
+            args_list = []
+            for start in range(0, len(pending), chunksize):
+                end = start + chunksize
+                args_list.append(
+                    (data_gen, pending_files[start:end],
+                     n_sequences[start:end],
+                     [missing for _, missing in pending[start:end]], inputs,
+                     sketch_indexes, self.sketch_bins)
+                )
+            results = parallel_map(_shard_statistics, args_list,
+                                   n_jobs=n_jobs)
+            statistics_pending = [
+                statistics_file for result, _ in results
+                for statistics_file in result
+            ]
+            for (k, _), statistics_file in zip(pending, statistics_pending):
+                files_statistics[k].update(statistics_file)
+
+            for j in saved:
+                features_path = arrays[j].get_features_path(
+                    data_generator.dataset)
+                for k, _ in pending:
+                    sub_folder = list_files[k]['sub_folder']
+                    saved[j][sub_folder][keys[k]] = files_statistics[k][j]
+                for sub_folder in sub_folders:
+                    arrays[j].save_statistics(
+                        os.path.join(features_path, sub_folder),
+                        saved[j][sub_folder])
+
+        for j in indexes:
+            if j in sketch_indexes:
+                # The statistics of the shards include the histograms
+                for _, statistics_shard in results:
+                    if j in statistics_shard:
+                        self._merge(statistics_shard[j], j)
+                continue
+            for statistics_file in files_statistics:
+                self._merge(statistics_file[j], j)
+
     def partial_fit(self, X):
         """ Fit the Scaler in one batch.
 
@@ -89,29 +506,78 @@ class Scaler():
         assert len(self.normalizer) == len(X)
 
         for j in range(len(self.normalizer)):
+            if self.normalizer[j] not in self.fitted_normalizers:
+                continue
             Xj = X[j]
             if type(Xj) == list:
                 Xj = np.concatenate(Xj, axis=0)
-            if self.normalizer[j] == 'standard':
-                X_bands = Xj.shape[-1]
-                self.scaler[j].partial_fit(np.reshape(Xj, (-1, X_bands)))
-                assert len(self.scaler[j].mean_) == X_bands
-            if self.normalizer[j] == 'minmax':
-                min_v = np.amin(Xj)
-                max_v = np.amax(Xj)
-                if len(self.scaler[j]) > 0:
-                    min_v = min(min_v, self.scaler[j][0])
-                    max_v = max(max_v, self.scaler[j][1])
-
-                self.scaler[j] = [min_v, max_v]
-
-    def transform(self, X):
+            sketch_bins = None
+            if self.normalizer[j] == 'robust':
+                sketch_bins = self.sketch_bins
+            self._merge(compute_statistics(Xj, sketch_bins=sketch_bins), j)
+
+    def _merge(self, statistics, scaler_ix):
+        """ Merges statistics into the statistics of the scaler.
+
+        Updates the scaler with the merged statistics.
+
+        """
+        if getattr(self, 'statistics', None) is None:
+            # Scaler saved before the statistics were introduced, its
+            # previous fit can not be merged
+            self.statistics = [None]*len(self.normalizer)
+        if getattr(self, 'transform_parameters', None) is None:
+            self.transform_parameters = [None]*len(self.normalizer)
+        self.transform_parameters[scaler_ix] = None
+        if self.statistics[scaler_ix] is None:
+            self.statistics[scaler_ix] = statistics
+        else:
+            assert (len(statistics['mean']) ==
+                    len(self.statistics[scaler_ix]['mean']))
+            self.statistics[scaler_ix] = merge_statistics(
+                self.statistics[scaler_ix], statistics)
+        statistics = self.statistics[scaler_ix]
+        if statistics['count'] == 0:
+            return
+
+        if self.normalizer[scaler_ix] == 'standard':
+            var = statistics['m2'] / statistics['count']
+            scale = _handle_zeros(np.sqrt(var))
+            scaler = self.scaler[scaler_ix]
+            scaler.mean_ = statistics['mean']
+            scaler.var_ = var
+            scaler.scale_ = scale
+            scaler.n_samples_seen_ = statistics['count']
+            scaler.n_features_in_ = len(var)
+        if self.normalizer[scaler_ix] == 'minmax':
+            self.scaler[scaler_ix] = [np.amin(statistics['min']),
+                                      np.amax(statistics['max'])]
+        if self.normalizer[scaler_ix] == 'minmax_bands':
+            self.scaler[scaler_ix] = [statistics['min'], statistics['max']]
+        if self.normalizer[scaler_ix] == 'robust':
+            quantiles = get_quantiles(
+                statistics, [self.quantile_range[0] / 100., 0.5,
+                             self.quantile_range[1] / 100.])
+            self.scaler[scaler_ix] = [quantiles[1],
+                                      quantiles[2] - quantiles[0]]
+
+    def transform(self, X, inplace=False):
         """ Scale X using the scaler.
 
+        The data is scaled as X*scale + offset, where scale and offset
+        are given by get_transform_parameters(). The minmax normalizers are
+        calculated as 2*(X - min)/(max - min) - 1 instead, so the minimum
+        and maximum are mapped exactly to -1 and 1. Floating point arrays
+        keep their dtype (e.g. float32) and other arrays are converted
+        to float64.
+
         Parameters
         ----------
-        X : ndarray
+        X : ndarray or list
             Data to be scaled.
+        inplace : bool, default=False
+            If True, the result is saved in X if possible (i.e. X is
+            a writable floating point array).
 
         Returns
         -------
@@ -128,21 +594,72 @@ class Scaler():
         for j in range(len(self.normalizer)):
             if type(X[j]) == list:
                 for k in range(len(X[j])):
-                    X[j][k] = self._apply_transform(X[j][k], j)
+                    X[j][k] = self._apply_transform(
+                        X[j][k], j, inplace=inplace)
             else:
-                X[j] = self._apply_transform(X[j], j)
+                X[j] = self._apply_transform(X[j], j, inplace=inplace)
 
         if not return_list:
             X = X[0]
         return X
 
-    def _apply_transform(self, X, scaler_ix):
+    def get_transform_parameters(self, scaler_ix=0):
+        """ Returns the parameters of the transformation of a normalizer.
+
+        The parameters are calculated from the fitted scaler the first
+        time they are requested.
+
+        Parameters
+        ----------
+        scaler_ix : int, default=0
+            Index of the normalizer.
+
+        Returns
+        -------
+        scale : ndarray or float
+            Scale factor of each band.
+        offset : ndarray or float
+            Offset of each band.
+
+        """
+        if not hasattr(self, 'transform_parameters'):
+            # Scaler saved before the parameters were introduced
+            self.transform_parameters = [None]*len(self.normalizer)
+        if self.transform_parameters[scaler_ix] is None:
+            if self.normalizer[scaler_ix] == 'standard':
+                scaler = self.scaler[scaler_ix]
+                scale = 1. / scaler.scale_
+                offset = -scaler.mean_ * scale
+            elif self.normalizer[scaler_ix] in ['minmax', 'minmax_bands']:
+                min_v, max_v = self.scaler[scaler_ix]
+                scale = 2. / _handle_zeros(max_v - min_v)
+                offset = -min_v * scale - 1.
+            elif self.normalizer[scaler_ix] == 'robust':
+                center, quantile_range = self.scaler[scaler_ix]
+                scale = 1. / _handle_zeros(quantile_range)
+                offset = -center * scale
+            else:
+                scale, offset = 1., 0.
+            self.transform_parameters[scaler_ix] = (
+                np.asarray(scale, dtype=np.float64),
+                np.asarray(offset, dtype=np.float64))
+        return self.transform_parameters[scaler_ix]
+
+    def _apply_transform(self, X, scaler_ix, out=None, inplace=False):
         """ Helper of transform()
 
         Parameters
         ----------
         X : ndarray
             Data to be scaled.
+        scaler_ix : int
+            Index of the normalizer.
+        out : ndarray or None, default=None
+            Array where the result is saved. It has to have the same shape
+            of X.
+        inplace : bool, default=False
+            If True and out is None, the result is saved in X
+            if possible.
 
         Returns
         -------
@@ -151,17 +668,40 @@ class Scaler():
             of the input.
 
         """
-        if self.normalizer[scaler_ix] == 'standard':
-            X_dims = X.shape
-            X_bands = X.shape[-1]
-            # times = X.shape[0]*X.shape[1]
-            X_temp = np.reshape(X, (-1, X_bands))
-            X_temp = self.scaler[scaler_ix].transform(X_temp)
-            X = X_temp.reshape(X_dims)
-        if self.normalizer[scaler_ix] == 'minmax':
-            X = 2*((X-self.scaler[scaler_ix][0]) /
-                   (self.scaler[scaler_ix][1]-self.scaler[scaler_ix][0])-0.5)
-        return X
+        if self.normalizer[scaler_ix] not in (
+                self.fitted_normalizers + ['instance']):
+            return X
+        X = np.asarray(X)
+        if self.normalizer[scaler_ix] == 'instance':
+            if X.size == 0:
+                return X
+            statistics = compute_statistics(X)
+            scale = 1. / _handle_zeros(
+                np.sqrt(statistics['m2'] / statistics['count']))
+            offset = -statistics['mean'] * scale
+        else:
+            scale, offset = self.get_transform_parameters(scaler_ix)
+        if out is None:
+            if (inplace and X.flags.writeable and
+               np.issubdtype(X.dtype, np.floating)):
+                out = X
+            elif np.issubdtype(X.dtype, np.floating):
+                out = np.empty_like(X)
+            else:
+                out = np.empty(X.shape, dtype=np.float64)
+        if self.normalizer[scaler_ix] in ['minmax', 'minmax_bands']:
+            # Calculated in the dtype of out, so (max - min) / (max - min)
+            # is exactly one
+            min_v, max_v = [np.asarray(v).astype(out.dtype)
+                            for v in self.scaler[scaler_ix]]
+            half_range = (_handle_zeros(max_v - min_v) / 2).astype(out.dtype)
+            np.subtract(X, min_v, out=out)
+            np.divide(out, half_range, out=out)
+            np.subtract(out, out.dtype.type(1), out=out)
+            return out
+        np.multiply(X, scale.astype(out.dtype, copy=False), out=out)
+        np.add(out, offset.astype(out.dtype, copy=False), out=out)
+        return out
 
     def inverse_transform(self, X):
         """ Invert transformation.
@@ -180,9 +720,24 @@ class Scaler():
         """
         # TODO: How the list self.normalizer should work here.
         scaler_ix = 0
-        if self.normalizer[scaler_ix] == 'minmax':
-            X = (self.scaler[scaler_ix][1]-self.scaler[scaler_ix][0]) * \
-                (X/2. + 0.5) + self.scaler[scaler_ix][0]
-        if self.normalizer[scaler_ix][0] == 'standard':
-            X = self.scaler.inverse_transform(X)
+        if self.normalizer[scaler_ix] == 'instance':
+            raise AttributeError(
+                'The instance normalizer can not be inverted')
+        if self.normalizer[scaler_ix] in self.fitted_normalizers:
+            scale, offset = self.get_transform_parameters(scaler_ix)
+            X = (X - offset) / scale
         return X
+
+    def has_instance_normalizers(self):
+        """ Checks if any of the normalizers is 'instance'.
+
+        The instance normalizers use the statistics of each array, so
+        the data of different files can not be transformed together.
+
+        Returns
+        -------
+        bool
+            True if any normalizer is 'instance'.
+
+        """
+        return 'instance' in self.normalizer
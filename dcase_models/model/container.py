@@ -3,9 +3,10 @@ import os
 import json
 
 import keras.backend as K
-from keras.callbacks import CSVLogger, ModelCheckpoint
+from keras.callbacks import CSVLogger, ModelCheckpoint, LambdaCallback
 from keras.models import model_from_json, Model
-from keras.layers import Dense, Input
+from keras.layers import Dense, Input, Layer
+from keras.utils import get_custom_objects
 
 from ..util.files import save_json
 from ..util.metrics import evaluate_metrics
@@ -14,6 +15,34 @@ from ..util.callbacks import TaggingCallback
 from ..data.data_generator import DataGenerator, KerasDataGenerator
 
 
+class FeatureNormalization(Layer):
+    """ Keras layer that scales the features as x*scale + offset.
+
+    The scale and offset of each band (last axis) are saved as
+    non-trainable weights, so the normalization is included in the
+    weights file of the model.
+    See KerasModelContainer.embed_scaler().
+
+    """
+    def build(self, input_shape):
+        shape = (int(input_shape[-1]),)
+        self.scale = self.add_weight(
+            name='scale', shape=shape, initializer='ones', trainable=False)
+        self.offset = self.add_weight(
+            name='offset', shape=shape, initializer='zeros', trainable=False)
+        super().build(input_shape)
+
+    def call(self, x):
+        return x * self.scale + self.offset
+
+    def compute_output_shape(self, input_shape):
+        return input_shape
+
+
+# Needed to load models with this layer from json files
+get_custom_objects()['FeatureNormalization'] = FeatureNormalization
+
+
 class ModelContainer():
     """ Abstract base class to store and manage models.
 
@@ -159,7 +188,9 @@ class KerasModelContainer(ModelContainer):
               considered_improvement=0.01, losses='categorical_crossentropy',
               loss_weights=[1], sequence_time_sec=0.5,
               metric_resolution_sec=1.0, label_list=[],
-              shuffle=True, **kwargs_keras_fit):
+              shuffle=True, workers=1, max_queue_size=0,
+              use_multiprocessing=False, predict_batch_size=512,
+              sed_backend='sed_eval', **kwargs_keras_fit):
         """
         Trains the keras model using the data and paramaters of arguments.
 
@@ -195,6 +226,23 @@ class KerasModelContainer(ModelContainer):
             Number of training epochs
         fit_verbose : int
             Verbose mode for fit method of Keras model
+        workers : int
+            Number of worker threads (or processes) used to load the
+            batches when training from a DataGenerator.
+        max_queue_size : int
+            Number of batches prefetched by KerasDataGenerator when
+            training from a DataGenerator. If 0 (default), the batches
+            are loaded by the Keras enqueuer of fit_generator, using
+            workers and use_multiprocessing.
+        use_multiprocessing : bool
+            If True, the batches are loaded by processes instead of threads.
+        predict_batch_size : int or None
+            Number of sequences of each predict batch when evaluating
+            the validation set (see evaluate_metrics).
+        sed_backend : str
+            Implementation of the segment-based metrics computed after
+            each epoch if metrics is ['sed'], 'sed_eval' or 'numpy'
+            (see metrics.sed).
 
         """
         import keras.optimizers as optimizers
@@ -212,7 +260,8 @@ class KerasModelContainer(ModelContainer):
                 data_val, file_weights=file_weights,
                 early_stopping=early_stopping,
                 considered_improvement=considered_improvement,
-                label_list=label_list
+                label_list=label_list,
+                predict_batch_size=predict_batch_size
             )
         elif self.metrics[0] == 'sed':
             metrics_callback = SEDCallback(
@@ -221,14 +270,17 @@ class KerasModelContainer(ModelContainer):
                 considered_improvement=considered_improvement,
                 sequence_time_sec=sequence_time_sec,
                 metric_resolution_sec=metric_resolution_sec,
-                label_list=label_list
+                label_list=label_list,
+                predict_batch_size=predict_batch_size,
+                backend=sed_backend
             )
         elif self.metrics[0] == 'tagging':
             metrics_callback = TaggingCallback(
                 data_val, file_weights=file_weights,
                 early_stopping=early_stopping,
                 considered_improvement=considered_improvement,
-                label_list=label_list
+                label_list=label_list,
+                predict_batch_size=predict_batch_size
             )
         else:
             metrics_callback = ModelCheckpoint(
@@ -241,10 +293,14 @@ class KerasModelContainer(ModelContainer):
 
         log = CSVLogger(file_log)
 
+        kwargs_loader = {'workers': workers,
+                         'max_queue_size': max_queue_size,
+                         'use_multiprocessing': use_multiprocessing}
+
         validation_data = None
         if metrics_callback.__class__ is ModelCheckpoint:
             if data_val.__class__ is DataGenerator:
-                validation_data = KerasDataGenerator(data_val)
+                validation_data = KerasDataGenerator(data_val, **kwargs_loader)
             else:
                 validation_data = data_val
         if type(data_train) in [list, tuple]:
@@ -256,16 +312,34 @@ class KerasModelContainer(ModelContainer):
             )
         else:
             if data_train.__class__ is DataGenerator:
-                data_train = KerasDataGenerator(data_train)
+                verbose = kwargs_keras_fit.get('verbose', 1) > 0
+                data_train = KerasDataGenerator(
+                    data_train, verbose=verbose, **kwargs_loader)
+            callbacks = [metrics_callback, log]
+            if (isinstance(data_train, KerasDataGenerator) and
+               (data_train.max_queue_size > 0)):
+                # The batches are prefetched by KerasDataGenerator, so they
+                # are requested in order (workers=0). In this case Keras
+                # does not call on_epoch_end of the Sequence.
+                kwargs_keras_fit['workers'] = 0
+                generators = [data_train, validation_data]
+                callbacks.append(LambdaCallback(
+                    on_epoch_end=lambda epoch, logs: [
+                        generator.on_epoch_end() for generator in generators
+                        if isinstance(generator, KerasDataGenerator)]))
+            else:
+                kwargs_keras_fit['workers'] = workers
+                kwargs_keras_fit['use_multiprocessing'] = use_multiprocessing
             kwargs_keras_fit.pop('batch_size')
             self.model.fit_generator(
                 generator=data_train,
-                callbacks=[metrics_callback, log],
+                callbacks=callbacks,
                 validation_data=validation_data,
                 **kwargs_keras_fit
-                # use_multiprocessing=True,
-                # workers=6)
             )
+            for generator in [data_train, validation_data]:
+                if isinstance(generator, KerasDataGenerator):
+                    generator.close()
 
     def evaluate(self, data_test, **kwargs):
         """
@@ -296,6 +370,37 @@ class KerasModelContainer(ModelContainer):
             self.model, data_test, self.metrics, **kwargs
         )
 
+    def predict_stream(self, audio_chunk, feature_stream, scaler=None):
+        """ Predicts the output of the model for a chunk of an audio stream.
+
+        The features of the chunk are calculated by feature_stream, which
+        keeps the state between chunks, and the model is run over the
+        sequences completed with this chunk.
+
+        Parameters
+        ----------
+        audio_chunk : ndarray
+            Audio samples of the chunk (mono).
+        feature_stream : FeatureStream
+            Instance of FeatureStream that calculates the features.
+            Call feature_stream.reset() before starting a new stream.
+        scaler : Scaler or None, optional
+            Scaler object to be applied to the features if is not None.
+
+        Returns
+        -------
+        ndarray
+            Predictions of the sequences completed with this chunk,
+            shape (N_sequences, N_classes). N_sequences can be zero.
+
+        """
+        sequences = feature_stream.process(audio_chunk)
+        if len(sequences) == 0:
+            return np.zeros((0,) + tuple(self.model.output_shape[1:]))
+        if scaler is not None:
+            sequences = scaler.transform(sequences)
+        return self.model.predict_on_batch(sequences)
+
     def load_model_from_json(self, folder, **kwargs):
         """
         Loads a model from a model.json file in the path given by folder.
@@ -408,9 +513,92 @@ class KerasModelContainer(ModelContainer):
 
         return models_are_same
 
+    def embed_scaler(self, scaler):
+        """ Adds the normalization of scaler at the beginning of the model.
+
+        The new model applies a FeatureNormalization layer, initialized
+        with the parameters of the fitted scaler
+        (see Scaler.get_transform_parameters()), to each input and then
+        calls the original model (and its weights) as a nested model.
+        After that, the data should not be scaled before passing it to the
+        model (e.g. use scaler=None in the DataGenerator) and the scaler
+        is saved in the weights file.
+
+        Parameters
+        ----------
+        scaler : Scaler
+            Fitted scaler. It has a normalizer for each input of
+            the model.
+
+        """
+        if len(scaler.normalizer) != len(self.model.inputs):
+            raise AttributeError(
+                'The scaler has to have a normalizer for each input')
+        if scaler.has_instance_normalizers():
+            raise AttributeError(
+                'The instance normalizer can not be embedded in the model')
+
+        inputs = []
+        normalized_inputs = []
+        for j, x in enumerate(self.model.inputs):
+            x_new = Input(batch_shape=K.int_shape(x), dtype=K.dtype(x),
+                          name=self.model.input_names[j])
+            inputs.append(x_new)
+            if scaler.normalizer[j] in scaler.fitted_normalizers:
+                n_bands = K.int_shape(x)[-1]
+                scale, offset = scaler.get_transform_parameters(j)
+                name = 'normalization'
+                if len(self.model.inputs) > 1:
+                    name = 'normalization_%d' % j
+                normalization = FeatureNormalization(name=name)
+                x_new = normalization(x_new)
+                normalization.set_weights(
+                    [np.broadcast_to(scale, (n_bands,)),
+                     np.broadcast_to(offset, (n_bands,))])
+            normalized_inputs.append(x_new)
+
+        if len(normalized_inputs) == 1:
+            normalized_inputs = normalized_inputs[0]
+        outputs = self.model(normalized_inputs)
+        self.model = Model(inputs, outputs, name=self.model.name)
+
+    def has_embedded_scaler(self):
+        """ Checks if the model includes the normalization of the data.
+
+        Returns
+        -------
+        bool
+            True if the model has FeatureNormalization layers
+            (see embed_scaler()).
+
+        """
+        return any([isinstance(layer, FeatureNormalization)
+                    for layer in self.model.layers])
+
+    def _get_embedded_model(self):
+        """ Returns the original model if the scaler was embedded.
+
+        Returns
+        -------
+        keras.models.Model or None
+            Model nested after the FeatureNormalization layers
+            (see embed_scaler()). None if the scaler was not embedded.
+
+        """
+        if not self.has_embedded_scaler():
+            return None
+        for layer in self.model.layers:
+            if isinstance(layer, Model):
+                return layer
+        return None
+
     def cut_network(self, layer_where_to_cut):
         """ Cuts the network at the layer passed as argument.
 
+        If the scaler was embedded (see embed_scaler()), the layers are
+        those of the original model and the normalization is kept at the
+        beginning of the cut model.
+
         Parameters
         ----------
         layer_where_to_cut : str or int
@@ -422,15 +610,35 @@ class KerasModelContainer(ModelContainer):
             Cutted model.
 
         """
+        embedded_model = self._get_embedded_model()
+        model = self.model if embedded_model is None else embedded_model
         if type(layer_where_to_cut) == str:
-            last_layer = self.model.get_layer(layer_where_to_cut)
+            last_layer = model.get_layer(layer_where_to_cut)
         elif type(layer_where_to_cut) == int:
-            last_layer = self.model.layers[layer_where_to_cut]
+            last_layer = model.layers[layer_where_to_cut]
         else:
             raise AttributeError(
                 "layer_where_to_cut has to be str or int type")
+        if embedded_model is None:
+            return Model(
+                self.model.input, last_layer.output, name='source_model')
+
+        cut_model = Model(embedded_model.inputs, last_layer.output)
+        # Outputs of the FeatureNormalization layers (or the inputs
+        # if they are not normalized)
+        normalized_inputs = []
+        for x in self.model.inputs:
+            for layer in self.model.layers:
+                if (isinstance(layer, FeatureNormalization) and
+                   (layer.input is x)):
+                    x = layer.output
+                    break
+            normalized_inputs.append(x)
+        if len(normalized_inputs) == 1:
+            normalized_inputs = normalized_inputs[0]
         model_without_last_layer = Model(
-            self.model.input, last_layer.output, name='source_model')
+            self.model.inputs, cut_model(normalized_inputs),
+            name='source_model')
 
         return model_without_last_layer
 
@@ -496,7 +704,10 @@ class KerasModelContainer(ModelContainer):
             List of layers names.
 
         """
-        layer_names = [layer.name for layer in self.model.layers]
+        model = self._get_embedded_model()
+        if model is None:
+            model = self.model
+        layer_names = [layer.name for layer in model.layers]
         return layer_names
 
     def get_intermediate_output(self, output_ix_name, inputs):
@@ -78,6 +78,7 @@ UI functions
     :toctree: generated/
 
     progressbar
+    throughput
 
 Miscellaneous functions
 -----------------------
@@ -85,6 +86,8 @@ Miscellaneous functions
     :toctree: generated/
 
     get_class_by_name
+    parallel_map
+    parallel_imap
 
 """
 
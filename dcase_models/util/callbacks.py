@@ -14,7 +14,7 @@ class ClassificationCallback(Callback):
 
     def __init__(self, data, file_weights=None, best_acc=0,
                  early_stopping=0, considered_improvement=0.01,
-                 label_list=[]):
+                 label_list=[], predict_batch_size=512):
         """ Initialize the keras callback
 
         Parameters
@@ -32,6 +32,10 @@ class ClassificationCallback(Callback):
         early_stopping : int
             Number of epochs for cut the training if not improves
             if 0, do not use it
+
+        predict_batch_size : int or None
+            Number of sequences of each predict batch
+            (see evaluate_metrics)
         """
 
         self.data = data
@@ -42,6 +46,7 @@ class ClassificationCallback(Callback):
         self.epoch_best = 0
         self.considered_improvement = considered_improvement
         self.label_list = label_list
+        self.predict_batch_size = predict_batch_size
 
     def on_epoch_end(self, epoch, logs={}):
         """ This function is run when each epoch ends.
@@ -58,7 +63,8 @@ class ClassificationCallback(Callback):
         """
         results = evaluate_metrics(
            self.model, self.data, ['classification'],
-           label_list=self.label_list)
+           label_list=self.label_list,
+           predict_batch_size=self.predict_batch_size)
 
         results = results['classification'].results()
         acc = results['overall']['accuracy']
@@ -93,7 +99,7 @@ class SEDCallback(Callback):
     def __init__(self, data, file_weights=None, best_F1=0,
                  early_stopping=0, considered_improvement=0.01,
                  sequence_time_sec=0.5, metric_resolution_sec=1.0,
-                 label_list=[]):
+                 label_list=[], predict_batch_size=512, backend='sed_eval'):
         """ Initialize the keras callback
 
         Parameters
@@ -111,6 +117,14 @@ class SEDCallback(Callback):
         early_stopping : int
             Number of epochs for cut the training if not improves
             if 0, do not use it
+
+        predict_batch_size : int or None
+            Number of sequences of each predict batch
+            (see evaluate_metrics)
+
+        backend : str
+            Implementation of the segment-based metrics,
+            'sed_eval' or 'numpy' (see metrics.sed)
         """
 
         self.data = data
@@ -123,6 +137,8 @@ class SEDCallback(Callback):
         self.epoch_best = 0
         self.considered_improvement = considered_improvement
         self.label_list = label_list
+        self.predict_batch_size = predict_batch_size
+        self.backend = backend
 
     def on_epoch_end(self, epoch, logs={}):
         """ This function is run when each epoch ends.
@@ -137,9 +153,13 @@ class SEDCallback(Callback):
             log data (from Callback class)
 
         """
-        results = evaluate_metrics(self.model,
-                                   self.data, ['sed'],
-                                   label_list=self.label_list)
+        results = evaluate_metrics(
+            self.model, self.data, ['sed'],
+            sequence_time_sec=self.sequence_time_sec,
+            metric_resolution_sec=self.metric_resolution_sec,
+            label_list=self.label_list,
+            predict_batch_size=self.predict_batch_size,
+            backend=self.backend)
 
         results = results['sed'].results()
         F1 = results['overall']['f_measure']['f_measure']
@@ -175,7 +195,7 @@ class TaggingCallback(Callback):
 
     def __init__(self, data, file_weights=None, best_F1=0,
                  early_stopping=0, considered_improvement=0.01,
-                 label_list=[]):
+                 label_list=[], predict_batch_size=512):
         """ Initialize the keras callback
 
         Parameters
@@ -193,6 +213,10 @@ class TaggingCallback(Callback):
         early_stopping : int
             Number of epochs for cut the training if not improves
             if 0, do not use it
+
+        predict_batch_size : int or None
+            Number of sequences of each predict batch
+            (see evaluate_metrics)
         """
 
         self.data = data
@@ -203,6 +227,7 @@ class TaggingCallback(Callback):
         self.epoch_best = 0
         self.considered_improvement = considered_improvement
         self.label_list = label_list
+        self.predict_batch_size = predict_batch_size
 
     def on_epoch_end(self, epoch, logs={}):
         """ This function is run when each epoch ends.
@@ -219,7 +244,8 @@ class TaggingCallback(Callback):
         """
         results = evaluate_metrics(self.model,
                                    self.data, ['tagging'],
-                                   label_list=self.label_list)
+                                   label_list=self.label_list,
+                                   predict_batch_size=self.predict_batch_size)
 
         results = results['tagging'].results()
 
@@ -41,7 +41,63 @@ def predictions_temporal_integration(Y_predicted, type='sum'):
     return Y_predicted
 
 
-def evaluate_metrics(model, data, metrics, **kwargs):
+def _predict_files(model, X_files, predict_batch_size=512):
+    """ Predicts the output of the model for a list of files.
+
+    The sequences of consecutive files are concatenated to get predict
+    batches of at least predict_batch_size sequences. Then, the predictions
+    are split back for each file.
+
+    Parameters
+    ----------
+    model : keras Model
+        model to get the predictions
+    X_files : list of ndarray or list of list of ndarray
+        Each element in list is the features of one file,
+        shape (N_windows, ...). For multi-input models, each element
+        is a list with the features of each input.
+    predict_batch_size : int or None
+        Minimum number of sequences of each predict batch. It is also
+        used as the batch_size of model.predict.
+        If None, predict each file separately. The files of multi-input
+        models are always predicted separately.
+
+    Returns
+    -------
+    list of ndarray
+        Predictions for each file.
+
+    """
+    predictions = []
+    n_files = len(X_files)
+    start = 0
+    while start < n_files:
+        end = start + 1
+        if ((predict_batch_size is not None) and
+           isinstance(X_files[start], np.ndarray)):
+            n_sequences = len(X_files[start])
+            while ((end < n_files) and (n_sequences < predict_batch_size) and
+                   isinstance(X_files[end], np.ndarray)):
+                n_sequences += len(X_files[end])
+                end += 1
+            X = np.concatenate(X_files[start:end], axis=0)
+            Y_predicted = model.predict(X, batch_size=predict_batch_size)
+        else:
+            Y_predicted = model.predict(X_files[start])
+        # if multiple outputs, select the first
+        if type(Y_predicted) == list:
+            Y_predicted = Y_predicted[0]
+        if end == start + 1:
+            predictions.append(Y_predicted)
+        else:
+            offsets = np.cumsum([len(X) for X in X_files[start:end]])[:-1]
+            predictions.extend(np.split(Y_predicted, offsets))
+        start = end
+    return predictions
+
+
+def evaluate_metrics(model, data, metrics, predict_batch_size=512,
+                     **kwargs):
     """ Calculate metrics over files with different length
 
     Parameters
@@ -66,6 +122,12 @@ def evaluate_metrics(model, data, metrics, **kwargs):
         List of metrics to apply.
         Each element can be a metric name or a function.
 
+    predict_batch_size : int or None, default=512
+        The sequences of several files are concatenated in predict
+        batches of (at least) predict_batch_size sequences, and the
+        predictions are split back for each file.
+        If None, model.predict is called for each file.
+
     Returns
     -------
     dict
@@ -84,29 +146,15 @@ def evaluate_metrics(model, data, metrics, **kwargs):
     if type(data) in [list, tuple]:
         X_val = data[0]
         Y_val = data[1]
-        n_files = len(X_val)
-        for i in range(n_files):
-            X = X_val[i]
-            Y_predicted = model.predict(X)
-            # if multiple outputs, select the first
-            if type(Y_predicted) == list:
-                Y_predicted = Y_predicted[0]
-            predictions.append(Y_predicted)
-
+        predictions = _predict_files(model, X_val, predict_batch_size)
         annotations = Y_val
 
     else:
         # data type is DataGenerator
         for batch_index in range(0, len(data)):
             X_val, Y_val = data.get_data_batch(batch_index)
-            n_files = len(X_val)
-            for i in range(n_files):
-                X = X_val[i]
-                Y_predicted = model.predict(X)
-                if type(Y_predicted) == list:
-                    Y_predicted = Y_predicted[0]
-                predictions.append(Y_predicted)
-
+            predictions.extend(
+                _predict_files(model, X_val, predict_batch_size))
             annotations.extend(Y_val)
 
     results['annotations'] = annotations
@@ -123,7 +171,7 @@ def evaluate_metrics(model, data, metrics, **kwargs):
 
 
 def sed(Y_val, Y_predicted, sequence_time_sec=0.5,
-        metric_resolution_sec=1.0, label_list=[]):
+        metric_resolution_sec=1.0, label_list=[], backend='sed_eval'):
     """ Calculate metrics for Sound Event Detection
 
     Parameters
@@ -140,6 +188,15 @@ def sed(Y_val, Y_predicted, sequence_time_sec=0.5,
         Resolution of the metrics.
     label_list:
         Label list.
+    backend : str
+        Implementation used to accumulate the segment-based counts.
+
+        - 'sed_eval': each file is converted to an event list and
+          evaluated by sed_eval.
+        - 'numpy': the counts of all files are computed at once from the
+          stacked binary rolls (see _segment_based_counts). The results
+          are equal to the sed_eval ones and it is much faster when
+          there are many files.
 
     Returns
     -------
@@ -147,11 +204,26 @@ def sed(Y_val, Y_predicted, sequence_time_sec=0.5,
         Object with the SED results
 
     """
+    if backend not in ['sed_eval', 'numpy']:
+        raise AttributeError('backend has to be sed_eval or numpy')
 
     seg_metrics = SegmentBasedMetrics(
         label_list, time_resolution=metric_resolution_sec
     )
 
+    if backend == 'numpy':
+        overall, class_wise, evaluated_length = _segment_based_counts(
+            Y_val, Y_predicted, sequence_time_sec, metric_resolution_sec)
+        for key in overall:
+            seg_metrics.overall[key] += float(overall[key])
+        for class_id, class_label in enumerate(label_list):
+            for key in class_wise:
+                seg_metrics.class_wise[class_label][key] += float(
+                    class_wise[key][class_id])
+        seg_metrics.evaluated_length_seconds += evaluated_length
+        seg_metrics.evaluated_files += len(Y_val)
+        return seg_metrics
+
     n_files = len(Y_val)
 
     for i in range(n_files):
@@ -169,6 +241,122 @@ def sed(Y_val, Y_predicted, sequence_time_sec=0.5,
     return seg_metrics
 
 
+def _segment_based_counts(Y_val, Y_predicted, sequence_time_sec=0.5,
+                          metric_resolution_sec=1.0):
+    """ Calculate the segment-based counts of sed_eval from event rolls.
+
+    The rolls of all files are stacked and mapped to segments of
+    metric_resolution_sec at once. A segment is active if it overlaps
+    an active frame, and each file is evaluated until the last segment
+    with activity in the ground-truth or in the prediction, as done by
+    sed_eval.SegmentBasedMetrics.evaluate.
+
+    Parameters
+    ----------
+    Y_val : list of ndarray
+        Ground-truth event rolls, shape (N_times, N_classes) each.
+    Y_predicted : list of ndarray
+        Predicted event rolls, shape (N_times, N_classes) each.
+        Binarized with a threshold of 0.5.
+    sequence_time_sec : float
+        Resolution of Y_val and Y_predicted.
+    metric_resolution_sec : float
+        Resolution of the metrics.
+
+    Returns
+    -------
+    dict
+        Overall counts (Ntp, Ntn, Nfp, Nfn, Nref, Nsys, S, D, I).
+    dict
+        Class-wise counts (Ntp, Ntn, Nfp, Nfn, Nref, Nsys),
+        arrays of shape (N_classes,).
+    float
+        Sum of the evaluated length of each file in seconds.
+
+    """
+    n_files = len(Y_val)
+    lengths = np.array(
+        [max(len(Y_val[i]), len(Y_predicted[i])) for i in range(n_files)],
+        dtype=int)
+    n_classes = Y_val[0].shape[1] if n_files > 0 else 0
+
+    # Stack the binary rolls of all files.
+    reference = np.zeros((np.sum(lengths), n_classes), dtype=bool)
+    estimated = np.zeros_like(reference)
+    frame_offsets = np.concatenate(([0], np.cumsum(lengths)))
+    for i in range(n_files):
+        start = frame_offsets[i]
+        reference[start:start + len(Y_val[i])] = Y_val[i] > 0.5
+        estimated[start:start + len(Y_predicted[i])] = Y_predicted[i] > 0.5
+
+    # Segments covered by each frame, [frame_start, frame_end).
+    # The float operations replicate sed_eval's event roll conversion.
+    time_resolution = float(metric_resolution_sec)
+    frame_file = np.repeat(np.arange(n_files), lengths)
+    frame_index = np.arange(len(reference)) - frame_offsets[frame_file]
+    frame_start = np.floor(
+        frame_index * sequence_time_sec * 1 / time_resolution).astype(int)
+    frame_end = np.ceil(
+        (frame_index + 1) * sequence_time_sec * 1 / time_resolution
+    ).astype(int)
+
+    n_segments = np.ceil(
+        lengths * sequence_time_sec * 1 / time_resolution).astype(int)
+    segment_offsets = np.concatenate(([0], np.cumsum(n_segments)))
+    frame_start += segment_offsets[frame_file]
+    frame_end += segment_offsets[frame_file]
+
+    # A segment is active if the number of active frames that cover it
+    # is not zero. frame_start and frame_end are sorted, so the frames
+    # that cover segment k are [lo, hi).
+    segments = np.arange(segment_offsets[-1])
+    hi = np.searchsorted(frame_start, segments, side='right')
+    lo = np.searchsorted(frame_end, segments, side='right')
+
+    def to_segments(roll):
+        cumulative = np.zeros((len(roll) + 1, n_classes), dtype=int)
+        np.cumsum(roll, axis=0, out=cumulative[1:])
+        return (cumulative[hi] - cumulative[lo]) > 0
+
+    # Each file is evaluated until the offset of its last event.
+    active_frames = np.where(np.any(reference | estimated, axis=1))[0]
+    evaluated_end = segment_offsets[:-1].copy()
+    np.maximum.at(evaluated_end, frame_file[active_frames],
+                  frame_end[active_frames])
+    last_offset = np.zeros(n_files)
+    np.maximum.at(last_offset, frame_file[active_frames],
+                  (frame_index[active_frames] + 1) * sequence_time_sec)
+    segment_file = np.repeat(np.arange(n_files), n_segments)
+    evaluated = segments < evaluated_end[segment_file]
+
+    reference = to_segments(reference)[evaluated]
+    estimated = to_segments(estimated)[evaluated]
+
+    tp = reference & estimated
+    tn = ~(reference | estimated)
+    fp = estimated & ~reference
+    fn = reference & ~estimated
+
+    class_wise = {
+        'Ntp': np.sum(tp, axis=0),
+        'Ntn': np.sum(tn, axis=0),
+        'Nfp': np.sum(fp, axis=0),
+        'Nfn': np.sum(fn, axis=0),
+        'Nref': np.sum(reference, axis=0),
+        'Nsys': np.sum(estimated, axis=0)
+    }
+
+    Ntp = np.sum(tp, axis=1)
+    Nref = np.sum(reference, axis=1)
+    Nsys = np.sum(estimated, axis=1)
+    overall = {key: np.sum(value) for key, value in class_wise.items()}
+    overall['S'] = np.sum(np.minimum(Nref, Nsys) - Ntp)
+    overall['D'] = np.sum(np.maximum(0, Nref - Nsys))
+    overall['I'] = np.sum(np.maximum(0, Nsys - Nref))
+
+    return overall, class_wise, float(np.sum(last_offset))
+
+
 def classification(Y_val, Y_predicted, label_list=[]):
     """ Calculate metrics for Audio Classification
 
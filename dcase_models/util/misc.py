@@ -2,6 +2,10 @@
 """Miscellaneous functions"""
 
 import inspect
+import multiprocessing
+import numpy as np
+
+from .ui import progressbar
 
 
 def get_class_by_name(classes_dict, class_name, default):
@@ -53,3 +57,78 @@ def get_default_args_of_function(func):
         for k, v in signature.parameters.items()
         if v.default is not inspect.Parameter.empty
     }
+
+
+def _call_function(args):
+    """ Helper of parallel_map(). Calls args[0] with args[1:].
+
+    """
+    return args[0](*args[1:])
+
+
+def _init_worker():
+    """ Helper of parallel_map(). Reseeds the numpy random generator.
+
+    Forked processes share the random state of the parent process.
+
+    """
+    np.random.seed()
+
+
+def parallel_imap(function, args_list, n_jobs=1, chunksize=1,
+                  progress=True):
+    """ Lazy version of parallel_map().
+
+    Yields the result of each call as soon as it is available (in the same
+    order as args_list), which allows to save partial results.
+
+    See parallel_map() for the description of the parameters.
+
+    """
+    if n_jobs == -1:
+        n_jobs = multiprocessing.cpu_count()
+
+    tasks = [(function,) + tuple(args) for args in args_list]
+    if n_jobs == 1:
+        iterator = map(_call_function, tasks)
+        if progress:
+            iterator = progressbar(iterator, total=len(tasks))
+        for result in iterator:
+            yield result
+        return
+
+    with multiprocessing.Pool(n_jobs, initializer=_init_worker) as pool:
+        iterator = pool.imap(_call_function, tasks, chunksize=chunksize)
+        if progress:
+            iterator = progressbar(iterator, total=len(tasks))
+        for result in iterator:
+            yield result
+
+
+def parallel_map(function, args_list, n_jobs=1, chunksize=1,
+                 progress=True):
+    """ Apply a function to each element of a list using a process pool.
+
+    Parameters
+    ----------
+    function : function
+        Function to be applied. Has to be defined at the top level of a
+        module (picklable) when n_jobs is not 1.
+    args_list : list of tuple
+        List of positional arguments for each call of function.
+    n_jobs : int, default=1
+        Number of worker processes. If 1, the function is called
+        in the current process. If -1, use all available CPUs.
+    chunksize : int, default=1
+        Number of calls sent to each worker at once.
+    progress : bool, default=True
+        If True, show a progress bar.
+
+    Returns
+    -------
+    list
+        Results of each call, in the same order as args_list.
+
+    """
+    return list(parallel_imap(function, args_list, n_jobs=n_jobs,
+                              chunksize=chunksize, progress=progress))
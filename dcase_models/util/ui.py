@@ -4,14 +4,16 @@
 import sys
 
 
-def progressbar(it, prefix="", size=60, file=sys.stdout):
+def progressbar(it, prefix="", size=60, file=sys.stdout, total=None):
     """ Iterable progress bar.
 
+    If total is None, the length of the iterable is used.
+
     """
-    count = len(it)
+    count = len(it) if total is None else total
 
     def show(j):
-        x = int(size*j/count)
+        x = int(size*j/max(count, 1))
         file.write("'\r%s[%s%s] %i/%i\r" %
                    (prefix, "#"*x, "."*(size-x), j, count))
         file.flush()
@@ -21,3 +23,41 @@ def progressbar(it, prefix="", size=60, file=sys.stdout):
         show(i+1)
     file.write("\n")
     file.flush()
+
+
+def throughput(n_files, elapsed_time, audio_time=None, file=sys.stdout):
+    """ Print the throughput of a process over audio files.
+
+    Parameters
+    ----------
+    n_files : int
+        Number of processed files.
+    elapsed_time : float
+        Wall-clock time (in seconds) of the process.
+    audio_time : float or None, optional
+        Total duration (in seconds) of the processed audio.
+        If not None, the throughput in audio seconds per second
+        is also printed.
+
+    Returns
+    -------
+    dict
+        Dict with the throughput information.
+        e.g. {'files': 100, 'elapsed_time': 2.0, 'files_per_second': 50.0}
+
+    """
+    elapsed_time = max(elapsed_time, 1e-9)
+    stats = {
+        'files': n_files,
+        'elapsed_time': elapsed_time,
+        'files_per_second': n_files / elapsed_time
+    }
+    msg = 'Processed %d files in %.1f s: %.2f files/s' % (
+        n_files, elapsed_time, stats['files_per_second'])
+    if audio_time is not None:
+        stats['audio_time'] = audio_time
+        stats['audio_seconds_per_second'] = audio_time / elapsed_time
+        msg += ', %.2f audio-s/s' % stats['audio_seconds_per_second']
+    file.write(msg + "\n")
+    file.flush()
+    return stats
@@ -0,0 +1,105 @@
+r'''
+  ____   ____    _    ____  _____                          _      _
+ |  _ \ / ___|  / \  / ___|| ____|     _ __ ___   ___   __| | ___| |___
+ | | | | |     / _ \ \___ \|  _| _____| '_ ` _ \ / _ \ / _` |/ _ \ / __|
+ | |_| | |___ / ___ \ ___) | |__|_____| | | | | | (_) | (_| |  __/ \__ \\
+ |____/ \____/_/   \_\____/|_____|    |_| |_| |_|\___/ \__,_|\___|_|___/
+
+ Batched MelSpectrogram benchmark
+
+'''
+
+import os
+import time
+import argparse
+import numpy as np
+
+from dcase_models.data.datasets import get_available_datasets
+from dcase_models.data.features import MelSpectrogram
+from dcase_models.util.files import load_json, list_wav_files
+
+
+def main():
+    # Parse arguments
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument(
+        '-d', '--dataset', type=str,
+        help='dataset name (e.g. UrbanSound8k, ESC50, URBAN_SED, SONYC_UST)',
+        default='ESC50'
+    )
+    parser.add_argument(
+        '-p', '--path', type=str,
+        help='path to the parameters.json file',
+        default='../'
+    )
+    parser.add_argument(
+        '-n', '--n_files', type=int,
+        help='number of files used in the benchmark',
+        default=256
+    )
+    parser.add_argument(
+        '-b', '--batch_size', type=int,
+        help='number of files processed in each call to calculate_batch',
+        default=32
+    )
+    args = parser.parse_args()
+
+    print(__doc__)
+
+    if args.dataset not in get_available_datasets():
+        raise AttributeError('Dataset not available')
+
+    # Get parameters
+    parameters_file = os.path.join(args.path, 'parameters.json')
+    params = load_json(parameters_file)
+    params_dataset = params['datasets'][args.dataset]
+    params_features = params['features']
+
+    # Get and init dataset class
+    dataset_class = get_available_datasets()[args.dataset]
+    dataset_path = os.path.join(args.path, params_dataset['dataset_path'])
+    dataset = dataset_class(dataset_path)
+
+    features = MelSpectrogram(
+        sequence_time=params_features['sequence_time'],
+        sequence_hop_time=params_features['sequence_hop_time'],
+        audio_win=params_features['audio_win'],
+        audio_hop=params_features['audio_hop'],
+        sr=params_features['sr'], **params_features['MelSpectrogram']
+    )
+
+    # Use the resampled files
+    audio_path, subfolders = dataset.get_audio_paths(features.sr)
+    if not dataset.check_sampling_rate(features.sr):
+        raise AttributeError(
+            'The dataset was not resampled to %d Hz' % features.sr)
+    file_names = sorted(list_wav_files(subfolders[0]))[:args.n_files]
+    print('Benchmark with %d files' % len(file_names))
+
+    start = time.time()
+    features_file = [features.calculate(fil) for fil in file_names]
+    file_time = time.time() - start
+    print('Per-file: %.2f s (%.2f files/s)' % (
+        file_time, len(file_names) / file_time))
+
+    start = time.time()
+    features_batch = []
+    for j in range(0, len(file_names), args.batch_size):
+        features_batch.extend(
+            features.calculate_batch(file_names[j:j+args.batch_size]))
+    batch_time = time.time() - start
+    print('Batched: %.2f s (%.2f files/s), x%.1f' % (
+        batch_time, len(file_names) / batch_time, file_time / batch_time))
+
+    max_error = max([np.amax(np.abs(x - y)) for x, y in
+                     zip(features_file, features_batch)])
+    print('Maximum absolute difference: %.2e dB' % max_error)
+
+    print('Done!')
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+r'''
+  ____   ____    _    ____  _____                          _      _
+ |  _ \ / ___|  / \  / ___|| ____|     _ __ ___   ___   __| | ___| |___
+ | | | | |     / _ \ \___ \|  _| _____| '_ ` _ \ / _ \ / _` |/ _ \ / __|
+ | |_| | |___ / ___ \ ___) | |__|_____| | | | | | (_) | (_| |  __/ \__ \\
+ |____/ \____/_/   \_\____/|_____|    |_| |_| |_|\___/ \__,_|\___|_|___/
+
+ Resampling backends benchmark
+
+'''
+
+import os
+import time
+import shutil
+import tempfile
+import argparse
+
+from dcase_models.data.datasets import get_available_datasets
+from dcase_models.data.resampler import Resampler
+from dcase_models.util.files import load_json, list_wav_files
+
+
+def main():
+    # Parse arguments
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument(
+        '-d', '--dataset', type=str,
+        help='dataset name (e.g. UrbanSound8k, ESC50, URBAN_SED, SONYC_UST)',
+        default='UrbanSound8k'
+    )
+    parser.add_argument(
+        '-p', '--path', type=str,
+        help='path to the parameters.json file',
+        default='../'
+    )
+    parser.add_argument(
+        '-n', '--n_files', type=int,
+        help='number of files used in the benchmark',
+        default=200
+    )
+    parser.add_argument(
+        '-b', '--backends', type=str,
+        help='comma separated list of backends (sox, polyphase, fft)',
+        default='sox,polyphase,fft'
+    )
+    args = parser.parse_args()
+
+    print(__doc__)
+
+    if args.dataset not in get_available_datasets():
+        raise AttributeError('Dataset not available')
+
+    # Get parameters
+    parameters_file = os.path.join(args.path, 'parameters.json')
+    params = load_json(parameters_file)
+    params_dataset = params['datasets'][args.dataset]
+    sr = params['features']['sr']
+
+    # Get and init dataset class
+    dataset_class = get_available_datasets()[args.dataset]
+    dataset_path = os.path.join(args.path, params_dataset['dataset_path'])
+    dataset = dataset_class(dataset_path)
+
+    file_names = sorted(list_wav_files(dataset.audio_path))[:args.n_files]
+    if len(file_names) == 0:
+        raise AttributeError(
+            'There are no audio files in %s' % dataset.audio_path)
+    print('Resampling %d files to %d Hz' % (len(file_names), sr))
+
+    for backend in args.backends.split(','):
+        resampler = Resampler(backend)
+        destination_folder = tempfile.mkdtemp()
+        start = time.time()
+        for j, file_name in enumerate(file_names):
+            path_to_destination = os.path.join(
+                destination_folder, '%d.wav' % j)
+            resampler.resample_file(file_name, path_to_destination, sr)
+        elapsed_time = time.time() - start
+        shutil.rmtree(destination_folder)
+        print('%s: %.2f s (%.2f ms/file)' % (
+            backend, elapsed_time, 1000 * elapsed_time / len(file_names)))
+
+    print('Done!')
+
+
+if __name__ == "__main__":
+    main()
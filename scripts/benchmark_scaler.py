@@ -0,0 +1,105 @@
+r'''
+  ____   ____    _    ____  _____                          _      _
+ |  _ \ / ___|  / \  / ___|| ____|     _ __ ___   ___   __| | ___| |___
+ | | | | |     / _ \ \___ \|  _| _____| '_ ` _ \ / _ \ / _` |/ _ \ / __|
+ | |_| | |___ / ___ \ ___) | |__|_____| | | | | | (_) | (_| |  __/ \__ \\
+ |____/ \____/_/   \_\____/|_____|    |_| |_| |_|\___/ \__,_|\___|_|___/
+
+ Scaler transform benchmark
+
+'''
+
+import time
+import argparse
+import numpy as np
+
+from dcase_models.data.scaler import Scaler
+
+
+def naive_transform(scaler, X):
+    """ Transform through sklearn (standard) or array expressions (minmax).
+
+    """
+    if scaler.normalizer[0] == 'standard':
+        X_dims = X.shape
+        X_temp = np.reshape(X, (-1, X.shape[-1]))
+        X_temp = scaler.scaler[0].transform(X_temp)
+        return X_temp.reshape(X_dims)
+    min_v, max_v = scaler.scaler[0]
+    return 2*((X - min_v) / (max_v - min_v) - 0.5)
+
+
+def benchmark(function, batches):
+    """ Returns the mean time (in ms) of function over the batches. """
+    start = time.time()
+    for X in batches:
+        function(X)
+    return 1000 * (time.time() - start) / len(batches)
+
+
+def main():
+    # Parse arguments
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument(
+        '-n', '--n_batches', type=int,
+        help='number of batches used in the benchmark',
+        default=50
+    )
+    parser.add_argument(
+        '-b', '--batch_size', type=int,
+        help='number of sequences in each batch',
+        default=256
+    )
+    parser.add_argument(
+        '-s', '--shape', type=str,
+        help='comma separated shape of each sequence (e.g. frames,bands)',
+        default='43,64'
+    )
+    parser.add_argument(
+        '-t', '--dtype', type=str,
+        help='data type of the batches (e.g. float32, float64)',
+        default='float32'
+    )
+    args = parser.parse_args()
+
+    print(__doc__)
+
+    shape = tuple([int(dim) for dim in args.shape.split(',')])
+    batches = [
+        (10 * np.random.randn(args.batch_size, *shape) - 40).astype(
+            args.dtype)
+        for _ in range(args.n_batches)
+    ]
+    print('%d batches of shape %s (%s)' % (
+        args.n_batches, (args.batch_size,) + shape, args.dtype))
+
+    for normalizer in ['standard', 'minmax']:
+        scaler = Scaler(normalizer)
+        for X in batches:
+            scaler.partial_fit(X)
+
+        naive_time = benchmark(lambda X: naive_transform(scaler, X), batches)
+        transform_time = benchmark(scaler.transform, batches)
+        batches_copy = [X.copy() for X in batches]
+        inplace_time = benchmark(
+            lambda X: scaler.transform(X, inplace=True), batches_copy)
+
+        max_error = max([
+            np.amax(np.abs(naive_transform(scaler, X) - scaler.transform(X)))
+            for X in batches
+        ])
+        print('%s: naive %.2f ms/batch, transform %.2f ms/batch (x%.1f), '
+              'in place %.2f ms/batch (x%.1f)' % (
+                  normalizer, naive_time, transform_time,
+                  naive_time / transform_time, inplace_time,
+                  naive_time / inplace_time))
+        print('Maximum absolute difference: %.2e' % max_error)
+
+    print('Done!')
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+r'''
+  ____   ____    _    ____  _____                          _      _
+ |  _ \ / ___|  / \  / ___|| ____|     _ __ ___   ___   __| | ___| |___
+ | | | | |     / _ \ \___ \|  _| _____| '_ ` _ \ / _ \ / _` |/ _ \ / __|
+ | |_| | |___ / ___ \ ___) | |__|_____| | | | | | (_) | (_| |  __/ \__ \\
+ |____/ \____/_/   \_\____/|_____|    |_| |_| |_|\___/ \__,_|\___|_|___/
+
+ SONYC-UST annotations benchmark
+
+'''
+
+import os
+import time
+import argparse
+import numpy as np
+
+from dcase_models.data.datasets import SONYC_UST
+from dcase_models.util.files import load_json
+
+
+def naive_file_lists(dataset, all_files):
+    """ File lists computed by filtering the metadata for each fold. """
+    file_lists = {}
+    metadata = dataset.metadata
+    for fold in dataset.fold_list:
+        if fold == 'train':
+            metadata_fold = metadata[metadata['split'] == fold]
+        else:
+            metadata_fold = metadata[
+                ((metadata['split'] == fold) &
+                 (metadata['annotator_id'] == 0))
+            ]
+        filename_list_fold = metadata_fold[
+            'audio_filename'].drop_duplicates().to_list()
+        file_lists[fold] = []
+        for fil in all_files:
+            basename = os.path.basename(fil)
+            if basename in filename_list_fold:
+                file_lists[fold].append(fil)
+    return file_lists
+
+
+def naive_annotations(dataset, file_name):
+    """ Annotations computed by masking the metadata for each file. """
+    n_classes_coarse_level = len(dataset.label_list['coarse'])
+    y = np.zeros(n_classes_coarse_level)
+    basename = os.path.basename(file_name).split('.')[0] + '.wav'
+
+    metadata_of_file = dataset.metadata[
+        dataset.metadata['audio_filename'] == basename]
+    for class_ix in dataset.label_list['coarse']:
+        class_column = str(class_ix) + '_' + \
+            dataset.label_list['coarse'][class_ix] + '_presence'
+        if metadata_of_file['split'].values[0] == 'train':
+            y[class_ix-1] = np.sum(
+                metadata_of_file[class_column].values) >= 1
+        else:
+            if 0 in metadata_of_file['annotator_id'].values:
+                ix = np.argwhere(
+                    metadata_of_file['annotator_id'].values == 0)[0, 0]
+                y[class_ix-1] = metadata_of_file[
+                    class_column].values[ix] >= 1
+    return y
+
+
+def main():
+    # Parse arguments
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument(
+        '-p', '--path', type=str,
+        help='path to the parameters.json file',
+        default='../'
+    )
+    args = parser.parse_args()
+
+    print(__doc__)
+
+    # Get parameters
+    parameters_file = os.path.join(args.path, 'parameters.json')
+    params = load_json(parameters_file)
+    params_dataset = params['datasets']['SONYC_UST']
+
+    dataset_path = os.path.join(args.path, params_dataset['dataset_path'])
+    start = time.time()
+    dataset = SONYC_UST(dataset_path)
+    build_time = time.time() - start
+    if not dataset.check_if_downloaded():
+        raise AttributeError(
+            'SONYC_UST is not downloaded in %s' % dataset_path)
+
+    # The file names are taken from the metadata so the audio files
+    # are not needed for this benchmark.
+    all_files = [
+        os.path.join(dataset.audio_path, filename) for filename in
+        dataset.metadata['audio_filename'].drop_duplicates()
+    ]
+    print('%d files, %d annotations' % (
+        len(all_files), len(dataset.metadata)))
+    print('Index building: %.3f s' % build_time)
+
+    # File lists
+    start = time.time()
+    file_lists_naive = naive_file_lists(dataset, all_files)
+    naive_time = time.time() - start
+
+    start = time.time()
+    file_lists = {}
+    for fold in dataset.fold_list:
+        file_lists[fold] = [
+            fil for fil in all_files
+            if os.path.basename(fil) in dataset.fold_files[fold]
+        ]
+    index_time = time.time() - start
+
+    assert file_lists == file_lists_naive
+    print('File lists: naive %.3f s, indexed %.3f s (x%.1f)' % (
+        naive_time, index_time, naive_time / max(index_time, 1e-9)))
+
+    # Annotations
+    features = np.zeros((1, 1))
+    start = time.time()
+    y_naive = [naive_annotations(dataset, fil) for fil in all_files]
+    naive_time = time.time() - start
+
+    start = time.time()
+    y = [dataset.get_annotations(fil, features, None)[0] for fil in all_files]
+    index_time = time.time() - start
+
+    assert np.array_equal(np.array(y_naive), np.array(y))
+    print('Annotations: naive %.3f s, indexed %.3f s (x%.1f)' % (
+        naive_time, index_time, naive_time / max(index_time, 1e-9)))
+
+    print('Done!')
+
+
+if __name__ == "__main__":
+    main()
@@ -33,6 +33,11 @@ def main():
         help='path to the parameters.json file',
         default='../'
     )
+    parser.add_argument(
+        '-j', '--n_jobs', type=int,
+        help='number of worker processes (-1 to use all CPUs)',
+        default=1
+    )
     args = parser.parse_args()
 
     print(__doc__)
@@ -60,7 +65,7 @@ def main():
 
     # Process all files
     print('Processing ...')
-    aug_dataset.process()
+    aug_dataset.process(n_jobs=args.n_jobs)
     print('Done!')
 
 
@@ -58,6 +58,11 @@ def main():
         '-ft', '--fine_tuning', type=str,
         help='fine-tuned dataset name (e.g. UrbanSound8k, ESC50, URBAN_SED)',
     )
+    parser.add_argument(
+        '-b', '--predict_batch_size', type=int,
+        help='number of sequences of each predict batch',
+        default=512
+    )
     args = parser.parse_args()
 
     print(__doc__)
@@ -113,17 +118,6 @@ def main():
     model_folder = os.path.join(args.models_path, args.model, dataset_path)
     exp_folder = os.path.join(model_folder, args.fold_name)
 
-    # Load scaler
-    scaler_file = os.path.join(exp_folder, 'scaler.pickle')
-    scaler = load_pickle(scaler_file)
-
-    # Init data generator
-    data_gen_test = DataGenerator(
-        dataset, features, folds=[args.fold_name],
-        batch_size=params['train']['batch_size'],
-        shuffle=False, train=False, scaler=scaler
-    )
-
     # Load model and best weights
     model_class = get_available_models()[args.model]
     metrics = ['classification']
@@ -137,12 +131,26 @@ def main():
     )
     model_container.load_model_weights(exp_folder)
 
+    # Load scaler if it is not embedded in the model
+    scaler = None
+    if not model_container.has_embedded_scaler():
+        scaler_file = os.path.join(exp_folder, 'scaler.pickle')
+        scaler = load_pickle(scaler_file)
+
+    # Init data generator
+    data_gen_test = DataGenerator(
+        dataset, features, folds=[args.fold_name],
+        batch_size=params['train']['batch_size'],
+        shuffle=False, train=False, scaler=scaler
+    )
+
     kwargs = {}
     if dataset_name in sed_datasets:
         kwargs = {'sequence_time_sec': params_features['sequence_hop_time'],
                   'metric_resolution_sec': 1.0}
     results = model_container.evaluate(
-        data_gen_test, label_list=dataset.label_list, **kwargs
+        data_gen_test, label_list=dataset.label_list,
+        predict_batch_size=args.predict_batch_size, **kwargs
     )
 
     print(results[metrics[0]])
@@ -14,6 +14,7 @@ import argparse
 
 from dcase_models.data.datasets import get_available_datasets
 from dcase_models.data.features import get_available_features
+from dcase_models.data.feature_extractor import FeatureExtractorGroup
 from dcase_models.util.files import load_json
 
 
@@ -30,7 +31,9 @@ def main():
     )
     parser.add_argument(
         '-f', '--features', type=str,
-        help='features name (e.g. Spectrogram, MelSpectrogram, Openl3)',
+        help='features name (e.g. Spectrogram, MelSpectrogram, Openl3). '
+             'Use a comma separated list to extract several features '
+             'at once (e.g. MelSpectrogram,MFCC)',
         default='MelSpectrogram'
     )
     parser.add_argument(
@@ -38,6 +41,21 @@ def main():
         help='path to the parameters.json file',
         default='../'
     )
+    parser.add_argument(
+        '-j', '--n_jobs', type=int,
+        help='number of worker processes (-1 to use all CPUs)',
+        default=1
+    )
+    parser.add_argument(
+        '-s', '--store', type=str,
+        help='features storage (files or memmap)',
+        default='files'
+    )
+    parser.add_argument(
+        '-r', '--resample_in_memory', action='store_true',
+        help='resample the audio in memory instead of saving a resampled '
+             'copy of the dataset'
+    )
     args = parser.parse_args()
 
     print(__doc__)
@@ -45,8 +63,10 @@ def main():
     if args.dataset not in get_available_datasets():
         raise AttributeError('Dataset not available')
 
-    if args.features not in get_available_features():
-        raise AttributeError('Features not available')
+    features_names = args.features.split(',')
+    for features_name in features_names:
+        if features_name not in get_available_features():
+            raise AttributeError('Features not available')
 
     # Get parameters
     parameters_file = os.path.join(args.path, 'parameters.json')
@@ -59,23 +79,30 @@ def main():
     dataset_path = os.path.join(args.path, params_dataset['dataset_path'])
     dataset = dataset_class(dataset_path)
 
-    # Get and init feature class
-    features_class = get_available_features()[args.features]
-    features = features_class(
-        sequence_time=params_features['sequence_time'],
-        sequence_hop_time=params_features['sequence_hop_time'],
-        audio_win=params_features['audio_win'],
-        audio_hop=params_features['audio_hop'],
-        sr=params_features['sr'], **params_features[args.features]
-    )
+    # Get and init feature classes
+    feature_extractors = []
+    for features_name in features_names:
+        features_class = get_available_features()[features_name]
+        features = features_class(
+            sequence_time=params_features['sequence_time'],
+            sequence_hop_time=params_features['sequence_hop_time'],
+            audio_win=params_features['audio_win'],
+            audio_hop=params_features['audio_hop'],
+            sr=params_features['sr'], **params_features[features_name]
+        )
+        feature_extractors.append(features)
+
+    # The STFT is shared by the features with the same parameters
+    features = FeatureExtractorGroup(feature_extractors)
 
     # Extract features
-    if features.check_if_extracted(dataset):
+    if features.check_if_extracted(dataset) and args.store == 'files':
         print('%s features were already extracted for %s dataset. ' % (
             args.features, args.dataset))
     else:
         print('Extracting features ...')
-        features.extract(dataset)
+        features.extract(dataset, n_jobs=args.n_jobs, store=args.store,
+                         resample_in_memory=args.resample_in_memory)
 
     print('Done!')
 
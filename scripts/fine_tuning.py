@@ -148,10 +148,14 @@ def main():
         shuffle=True, train=True, scaler=None
     )
 
-    scaler = Scaler(normalizer=params_model['normalizer'])
-    print('Fitting features ...')
-    scaler.fit(data_gen_train)
-    print('Done!')
+    # If the origin model includes the normalization of the features,
+    # (see KerasModelContainer.embed_scaler()) it is used as is.
+    scaler = None
+    if not model_container.has_embedded_scaler():
+        scaler = Scaler(normalizer=params_model['normalizer'])
+        print('Fitting features ...')
+        scaler.fit(data_gen_train)
+        print('Done!')
 
     data_gen_train.set_scaler(scaler)
 
@@ -180,7 +184,8 @@ def main():
 
     # Save model json and scaler
     model_container.save_model_json(model_folder)
-    save_pickle(scaler, os.path.join(exp_folder, 'scaler.pickle'))
+    if scaler is not None:
+        save_pickle(scaler, os.path.join(exp_folder, 'scaler.pickle'))
 
     # Train model
     model_container.train(
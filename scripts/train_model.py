@@ -61,6 +61,10 @@ def main():
     parser.add_argument('--aug', dest='augmentation', action='store_true')
     parser.add_argument('--no-aug', dest='augmentation', action='store_false')
     parser.set_defaults(augmentation=False)
+    parser.add_argument(
+        '--embed_scaler', action='store_true',
+        help='include the normalization of the features in the model'
+    )
     args = parser.parse_args()
 
     print(__doc__)
@@ -144,13 +148,15 @@ def main():
     print('Done!')
 
     # Pass scaler to data_gen_train to be used when data
-    # loading
-    data_gen_train.set_scaler(scaler)
+    # loading. If the scaler is embedded in the model, the data
+    # is not scaled by the data generators.
+    scaler_data = None if args.embed_scaler else scaler
+    data_gen_train.set_scaler(scaler_data)
 
     data_gen_val = DataGenerator(
         dataset, features, folds=folds_val,
         batch_size=params['train']['batch_size'],
-        shuffle=False, train=False, scaler=scaler
+        shuffle=False, train=False, scaler=scaler_data
     )
 
     # Define model
@@ -174,6 +180,9 @@ def main():
         **params_model['model_arguments']
     )
 
+    if args.embed_scaler:
+        model_container.embed_scaler(scaler)
+
     model_container.model.summary()
 
     # Set paths
@@ -183,9 +192,11 @@ def main():
     exp_folder = os.path.join(model_folder, args.fold_name)
     mkdir_if_not_exists(exp_folder, parents=True)
 
-    # Save model json and scaler
+    # Save model json and scaler (the embedded scaler is saved
+    # with the weights)
     model_container.save_model_json(model_folder)
-    save_pickle(scaler, os.path.join(exp_folder, 'scaler.pickle'))
+    if not args.embed_scaler:
+        save_pickle(scaler, os.path.join(exp_folder, 'scaler.pickle'))
 
     # data_train = data_gen_train.get_data()
     # data_val = data_gen_val.get_data()
@@ -0,0 +1,81 @@
+from dcase_models.data.dataset_base import Dataset
+from dcase_models.data.data_augmentation import AugmentedDataset
+from dcase_models.data.data_augmentation import WhiteNoise
+
+import os
+import numpy as np
+import shutil
+import soundfile as sf
+
+
+audio_files = ['40722-8-0-7.wav', '147764-4-7-0.wav', '176787-5-0-0.wav']
+
+
+def _list_files(path):
+    files = []
+    for root, _, file_names in os.walk(path):
+        files.extend(os.path.join(root, f) for f in file_names)
+    return sorted(files)
+
+
+def test_white_noise():
+    white_noise = WhiteNoise(20)
+    audio = 0.5*np.sin(2*np.pi*440*np.arange(22050)/22050.)
+    np.random.seed(0)
+    aug_audio = white_noise.apply(audio)
+    assert aug_audio.shape == audio.shape
+    noise = aug_audio - audio
+    snr = 10*np.log10(np.mean(audio**2) / np.mean(noise**2))
+    assert np.abs(snr - 20) < 1
+
+
+def test_process(tmp_path):
+    dataset_path = str(tmp_path)
+    shutil.copytree(os.path.join('data', 'audio'),
+                    os.path.join(dataset_path, 'audio'))
+    shutil.copytree(os.path.join('data', 'audio'),
+                    os.path.join(dataset_path, 'audio22050', 'original'))
+    dataset = Dataset(dataset_path)
+    augmentations = [{'type': 'white_noise', 'snr': 20}]
+    aug_dataset = AugmentedDataset(dataset, 22050, augmentations)
+
+    _, sub_folders = aug_dataset.get_audio_paths(22050)
+    path_original = sub_folders[0]
+    path_augmented = sub_folders[1]
+    assert path_augmented == os.path.join(
+        dataset_path, 'audio22050', 'white_noise_20.00')
+
+    stats = aug_dataset.process(n_jobs=2, chunksize=1)
+    assert stats['files'] == len(audio_files)
+    augmented_files = _list_files(path_augmented)
+    assert augmented_files == sorted(
+        [os.path.join(path_augmented, f) for f in audio_files])
+    for file_name in audio_files:
+        audio, sr = sf.read(os.path.join(path_original, file_name))
+        aug_audio, aug_sr = sf.read(os.path.join(path_augmented, file_name))
+        assert aug_sr == sr
+        assert aug_audio.shape == audio.shape
+        assert not np.allclose(aug_audio, audio, atol=1e-3)
+
+    # Interrupted file: only the hidden temporal file was written.
+    os.remove(augmented_files[0])
+    with open(os.path.join(path_augmented,
+                           '.' + os.path.basename(augmented_files[0])),
+              'w') as f:
+        f.write('incomplete')
+    mtimes = {f: os.path.getmtime(f) for f in augmented_files[1:]}
+
+    # The second run only processes the missing file.
+    stats = aug_dataset.process(n_jobs=2, chunksize=1)
+    assert stats['files'] == 1
+    assert _list_files(path_augmented) == augmented_files
+    for path, mtime in mtimes.items():
+        assert os.path.getmtime(path) == mtime
+    audio, _ = sf.read(os.path.join(path_original,
+                                    os.path.basename(augmented_files[0])))
+    aug_audio, _ = sf.read(augmented_files[0])
+    assert aug_audio.shape == audio.shape
+
+    stats = aug_dataset.process(n_jobs=2, chunksize=1)
+    assert stats['files'] == 0
+    assert _list_files(path_augmented) == augmented_files
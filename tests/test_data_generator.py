@@ -8,11 +8,13 @@ import os
 import numpy as np
 import pytest
 import glob
+import shutil
 
 params = load_json('parameters.json')
 params_features = params['features']
 
 dataset_path = 'data'
+dataset_path_test = dataset_path
 
 
 class TestDataset(Dataset):
@@ -38,7 +40,7 @@ class TestDataset(Dataset):
             glob.glob(os.path.join(self.audio_path, '*.wav'))
         )
 
-    def get_annotations(self, file_path, features):
+    def get_annotations(self, file_path, features, time_resolution):
         y = np.zeros((len(features), len(self.label_list)))
         class_ix = int(os.path.basename(file_path).split('-')[1])
         y[:, class_ix] = 1
@@ -99,3 +101,253 @@ def test_scaler(normalizer):
     X_rec = scaler.inverse_transform(X_scaled)
 
     assert np.allclose(X_rec, X)
+
+
+def _extracted_dataset(tmp_path, **kwargs):
+    """ Copies the test dataset to tmp_path and extracts MelSpectrogram. """
+    dataset_path = str(tmp_path)
+    shutil.copytree(os.path.join(dataset_path_test, 'audio'),
+                    os.path.join(dataset_path, 'audio'))
+    shutil.copytree(os.path.join(dataset_path_test, 'audio'),
+                    os.path.join(dataset_path, 'audio22050', 'original'))
+    dataset = TestDataset(dataset_path)
+    dataset.set_as_downloaded()
+    feature_extractor = MelSpectrogram(
+        sequence_time=params_features['sequence_time'],
+        sequence_hop_time=params_features['sequence_hop_time'],
+        audio_win=params_features['audio_win'],
+        audio_hop=params_features['audio_hop'],
+        n_fft=params_features['n_fft'],
+        sr=params_features['sr'],
+        **params_features['MelSpectrogram']
+    )
+    feature_extractor.extract(dataset, **kwargs)
+    return dataset, feature_extractor
+
+
+def test_memory_cache(tmp_path):
+    dataset, feature_extractor = _extracted_dataset(tmp_path)
+    data_generator = DataGenerator(
+        dataset, feature_extractor, ['all'], shuffle=False, train=False)
+    X, Y = data_generator.get_data()
+
+    data_generator_cache = DataGenerator(
+        dataset, feature_extractor, ['all'], shuffle=False, train=False,
+        cache='memory')
+    X_cache, Y_cache = data_generator_cache.get_data()
+    assert data_generator_cache.memory_cache is not None
+    assert len(data_generator_cache.memory_cache['index']) == len(X)
+    for j in range(len(X)):
+        assert np.allclose(X_cache[j], X[j])
+        assert np.allclose(Y_cache[j], Y[j])
+
+    # The data is served from the cache, not from disk
+    shutil.rmtree(feature_extractor.get_features_path(dataset))
+    X_cache, _ = data_generator_cache.get_data()
+    for j in range(len(X)):
+        assert np.allclose(X_cache[j], X[j])
+
+
+def test_memory_cache_size(tmp_path):
+    dataset, feature_extractor = _extracted_dataset(tmp_path)
+    data_generator = DataGenerator(
+        dataset, feature_extractor, ['all'], shuffle=False, train=False)
+    X, Y = data_generator.get_data()
+
+    # Only the first file fits in the cache
+    cache_size = (X[0].nbytes + Y[0].nbytes) / 2.**20
+    data_generator_cache = DataGenerator(
+        dataset, feature_extractor, ['all'], shuffle=False, train=False,
+        cache='memory', cache_size=cache_size)
+    X_cache, Y_cache = data_generator_cache.get_data()
+    assert len(data_generator_cache.memory_cache['index']) == 1
+    assert data_generator_cache.memory_cache['n_bytes'] <= cache_size * 2**20
+    for j in range(len(X)):
+        assert np.allclose(X_cache[j], X[j])
+        assert np.allclose(Y_cache[j], Y[j])
+
+
+def test_memory_cache_set_scaler(tmp_path):
+    dataset, feature_extractor = _extracted_dataset(tmp_path)
+    data_generator = DataGenerator(
+        dataset, feature_extractor, ['all'], shuffle=False, train=False,
+        cache='memory')
+    X, _ = data_generator.get_data()
+    X = [np.copy(x) for x in X]
+    cache = data_generator.memory_cache['inputs'][0]
+
+    scaler = Scaler('standard')
+    scaler.fit(np.concatenate(X, axis=0))
+    data_generator.set_scaler(scaler)
+
+    # The cache is scaled in place
+    assert data_generator.memory_cache['inputs'][0] is cache
+    assert data_generator.memory_cache['scaler'] is scaler
+    assert not cache.flags.writeable
+    X_scaled, _ = data_generator.get_data()
+    for j in range(len(X)):
+        assert np.allclose(X_scaled[j], scaler.transform(X[j]))
+
+    # A different scaler builds the cache again
+    scaler_minmax = Scaler('minmax')
+    scaler_minmax.fit(np.concatenate(X, axis=0))
+    data_generator.set_scaler(scaler_minmax)
+    assert data_generator.memory_cache is None
+    X_scaled, _ = data_generator.get_data()
+    for j in range(len(X)):
+        assert np.allclose(X_scaled[j], scaler_minmax.transform(X[j]))
+
+
+@pytest.mark.parametrize("augmentations", [
+    [{'type': 'feature_noise', 'snr': 10},
+     {'type': 'spec_masking', 'time_masks': 2, 'time_width': 8,
+      'freq_masks': 2, 'freq_width': 8}],
+    [{'type': 'white_noise', 'snr': [10, 20]}],
+])
+def test_online_augmentation(tmp_path, augmentations):
+    dataset, feature_extractor = _extracted_dataset(tmp_path)
+    data_generator = DataGenerator(
+        dataset, feature_extractor, ['all'], batch_size=3, shuffle=False)
+    X, Y = data_generator.get_data_batch(0)
+
+    np.random.seed(0)
+    data_generator_aug = DataGenerator(
+        dataset, feature_extractor, ['all'], batch_size=3, shuffle=False,
+        augmentations=augmentations)
+    X_aug, Y_aug = data_generator_aug.get_data_batch(0)
+    assert X_aug.shape == X.shape
+    assert X_aug.dtype == X.dtype
+    assert np.array_equal(Y_aug, Y)
+    assert not np.allclose(X_aug, X)
+
+    # The augmented data is not stored
+    X_aug_2, _ = data_generator_aug.get_data_batch(0)
+    assert not np.allclose(X_aug_2, X_aug)
+    X_2, _ = data_generator.get_data_batch(0)
+    assert np.array_equal(X_2, X)
+
+
+def test_online_augmentation_mixup(tmp_path):
+    dataset, feature_extractor = _extracted_dataset(tmp_path)
+    data_generator = DataGenerator(
+        dataset, feature_extractor, ['all'], batch_size=3, shuffle=False)
+    X, Y = data_generator.get_data_batch(0)
+
+    np.random.seed(0)
+    data_generator_aug = DataGenerator(
+        dataset, feature_extractor, ['all'], batch_size=3, shuffle=False,
+        augmentations=[{'type': 'mixup', 'alpha': 0.4}])
+    X_aug, Y_aug = data_generator_aug.get_data_batch(0)
+    assert X_aug.shape == X.shape
+    assert Y_aug.shape == Y.shape
+    assert not np.allclose(X_aug, X)
+    # The labels are mixed with the same weights
+    assert np.allclose(np.sum(Y_aug, axis=1), 1.)
+    assert not np.allclose(Y_aug, Y)
+
+
+def test_online_augmentation_validation(tmp_path):
+    dataset, feature_extractor = _extracted_dataset(tmp_path)
+    data_generator = DataGenerator(
+        dataset, feature_extractor, ['all'], shuffle=False, train=False,
+        augmentations=[{'type': 'feature_noise', 'snr': 10}])
+    assert data_generator.augmentation is None
+
+    with pytest.raises(AttributeError):
+        DataGenerator(
+            dataset, feature_extractor, ['all'],
+            augmentations=[{'type': 'reverb'}])
+
+
+def _sequence_keys(X):
+    # Identifies each sequence by the sum of its features
+    return np.sort(np.sum(np.reshape(X, (len(X), -1)), axis=1))
+
+
+def test_sampling_sequences(tmp_path):
+    dataset, feature_extractor = _extracted_dataset(tmp_path)
+    data_generator = DataGenerator(
+        dataset, feature_extractor, ['all'], batch_size=3, shuffle=False)
+    X, Y = data_generator.get_data_batch(0)
+    n_sequences = len(X)
+
+    batch_size = 4
+    data_generator = DataGenerator(
+        dataset, feature_extractor, ['all'], batch_size=batch_size,
+        shuffle=False, sampling='sequences')
+    assert len(data_generator.sequence_index) == n_sequences
+    # The number of batches of sequences, not of files
+    assert len(data_generator) == int(np.ceil(n_sequences / batch_size))
+
+    X_batches = []
+    Y_batches = []
+    for index in range(len(data_generator)):
+        X_batch, Y_batch = data_generator.get_data_batch(index)
+        assert X_batch.shape == (batch_size,) + X.shape[1:]
+        assert Y_batch.shape == (batch_size,) + Y.shape[1:]
+        X_batches.append(X_batch)
+        Y_batches.append(Y_batch)
+    X_batches = np.concatenate(X_batches, axis=0)
+    Y_batches = np.concatenate(Y_batches, axis=0)
+    # Without shuffle, the sequences are in the order of the files and
+    # the last batch is completed with the first sequences
+    assert np.allclose(X_batches[:n_sequences], X)
+    assert np.allclose(Y_batches[:n_sequences], Y)
+    n_extra = len(X_batches) - n_sequences
+    assert np.allclose(X_batches[n_sequences:], X[:n_extra])
+
+    # With shuffle, each epoch includes each sequence once
+    np.random.seed(0)
+    data_generator = DataGenerator(
+        dataset, feature_extractor, ['all'], batch_size=n_sequences,
+        shuffle=True, sampling='sequences')
+    assert len(data_generator) == 1
+    orders = []
+    for _ in range(2):
+        X_batch, _ = data_generator.get_data_batch(0)
+        assert np.allclose(_sequence_keys(X_batch), _sequence_keys(X))
+        orders.append(data_generator.sequence_order.copy())
+        data_generator.shuffle_list()
+    assert not np.array_equal(orders[0], orders[1])
+
+
+def test_sampling_sequences_balanced(tmp_path):
+    dataset, feature_extractor = _extracted_dataset(tmp_path)
+    data_generator = DataGenerator(
+        dataset, feature_extractor, ['all'], batch_size=3, shuffle=False)
+    _, Y = data_generator.get_data_batch(0)
+    labels = np.argmax(Y, axis=1)
+    classes = np.unique(labels)
+    # The classes of the test dataset are unbalanced
+    counts = np.array([np.sum(labels == c) for c in classes])
+    assert np.amax(counts) >= 2*np.amin(counts)
+
+    np.random.seed(0)
+    data_generator = DataGenerator(
+        dataset, feature_extractor, ['all'], batch_size=len(labels),
+        sampling='sequences', balanced=True)
+    assert np.array_equal(data_generator.sequence_labels, labels)
+    assert len(data_generator) == 1
+
+    n_epochs = 200
+    counts_balanced = np.zeros(len(classes))
+    for _ in range(n_epochs):
+        _, Y_batch = data_generator.get_data_batch(0)
+        assert len(Y_batch) == len(labels)
+        labels_batch = np.argmax(Y_batch, axis=1)
+        counts_balanced += [np.sum(labels_batch == c) for c in classes]
+        data_generator.shuffle_list()
+    frequencies = counts_balanced / np.sum(counts_balanced)
+    assert np.allclose(frequencies, 1. / len(classes), atol=0.03)
+
+
+def test_sampling_sequences_validation(tmp_path):
+    dataset, feature_extractor = _extracted_dataset(tmp_path)
+    with pytest.raises(AttributeError):
+        DataGenerator(dataset, feature_extractor, ['all'], train=False,
+                      sampling='sequences')
+    with pytest.raises(AttributeError):
+        DataGenerator(dataset, feature_extractor, ['all'], balanced=True)
+    with pytest.raises(AttributeError):
+        DataGenerator(dataset, feature_extractor, ['all'],
+                      sampling='frames')
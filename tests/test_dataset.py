@@ -1,15 +1,48 @@
 from dcase_models.data.dataset_base import Dataset
+from dcase_models.data.resampler import Resampler
+from dcase_models.data.datasets import SONYC_UST
 
 import os
 import numpy as np
 import pytest
 import shutil
 import soundfile as sf
+import pickle
 
 
 audio_files = ['40722-8-0-7.wav', '147764-4-7-0.wav', '176787-5-0-0.wav']
 
 
+class CsvDataset(Dataset):
+    """ Dataset with the class of each file in labels.csv. """
+    def build(self):
+        self.audio_path = os.path.join(self.dataset_path, 'audio')
+        self.fold_list = ['all']
+        self.label_list = ['class0', 'class1', 'class2']
+        self.labels_file = os.path.join(self.dataset_path, 'labels.csv')
+        self.calls = 0
+
+    def get_annotations_files(self, file_path):
+        return [self.labels_file]
+
+    def get_annotations(self, file_path, features, time_resolution):
+        self.calls += 1
+        with open(self.labels_file) as f:
+            labels = dict(line.strip().split(',') for line in f)
+        y = np.zeros((len(features), len(self.label_list)))
+        y[:, int(labels[os.path.basename(file_path)])] = 1
+        return y
+
+
+def _csv_dataset(dataset_path, labels):
+    with open(os.path.join(dataset_path, 'labels.csv'), 'w') as f:
+        for file_name, class_ix in labels.items():
+            f.write('%s,%d\n' % (file_name, class_ix))
+    dataset = CsvDataset(dataset_path)
+    return dataset, [os.path.join(dataset.audio_path, file_name)
+                     for file_name in labels]
+
+
 @pytest.mark.parametrize("sr", [22050, 8000])
 def test_change_sampling_rate(sr):
     dataset_path = 'data'
@@ -33,3 +66,173 @@ def test_change_sampling_rate(sr):
                            rtol=0.0001, atol=0.0001)
 
     assert dataset.check_sampling_rate(sr)
+
+
+def test_check_sampling_rate(tmp_path):
+    dataset_path = str(tmp_path)
+    shutil.copytree(os.path.join('data', 'audio'),
+                    os.path.join(dataset_path, 'audio'))
+    dataset = Dataset(dataset_path)
+    dataset.resampler = Resampler('polyphase')
+    assert not dataset.check_sampling_rate(8000)
+
+    dataset.change_sampling_rate(8000)
+    assert os.path.exists(dataset.get_resample_manifest_path(8000))
+    assert dataset.check_sampling_rate(8000)
+
+    # A file added after resampling
+    shutil.copy(os.path.join(dataset_path, 'audio', audio_files[0]),
+                os.path.join(dataset_path, 'audio', 'new.wav'))
+    assert not dataset.check_sampling_rate(8000)
+    dataset.change_sampling_rate(8000)
+    assert dataset.check_sampling_rate(8000)
+
+    # A file removed after resampling
+    os.remove(os.path.join(dataset_path, 'audio', 'new.wav'))
+    assert not dataset.check_sampling_rate(8000)
+
+
+def test_annotations_cache(tmp_path):
+    dataset, files = _csv_dataset(str(tmp_path), {'a.wav': 0, 'b.wav': 2})
+    features = np.zeros((5, 4))
+
+    y = dataset.get_annotations_cached(files[0], features, 0.1)
+    assert y.shape == (5, 3)
+    assert np.all(y[:, 0] == 1)
+    assert not y.flags.writeable
+    with pytest.raises(ValueError):
+        y[0, 0] = 0
+
+    # The same array is returned without calling get_annotations()
+    assert dataset.get_annotations_cached(files[0], features, 0.1) is y
+    assert dataset.calls == 1
+
+    # Other number of frames or time resolution are different entries
+    assert dataset.get_annotations_cached(
+        files[0], np.zeros((7, 4)), 0.1).shape == (7, 3)
+    dataset.get_annotations_cached(files[0], features, 0.2)
+    dataset.get_annotations_cached(files[1], features, 0.1)
+    assert dataset.calls == 4
+    assert dataset.annotations_cache_info() == {
+        'hits': 1, 'misses': 4, 'size': 4, 'max_size': 100000}
+
+
+def test_annotations_cache_eviction(tmp_path):
+    dataset, files = _csv_dataset(
+        str(tmp_path), {'a.wav': 0, 'b.wav': 1, 'c.wav': 2})
+    dataset.annotations_cache_size = 2
+    features = np.zeros((5, 4))
+
+    dataset.get_annotations_cached(files[0], features, 0.1)
+    dataset.get_annotations_cached(files[1], features, 0.1)
+    # a is now the most recently used
+    dataset.get_annotations_cached(files[0], features, 0.1)
+    # c evicts b, the least recently used
+    dataset.get_annotations_cached(files[2], features, 0.1)
+    assert [key[0] for key in dataset.annotations_cache] == [
+        os.path.join('audio', 'a.wav'), os.path.join('audio', 'c.wav')]
+    assert dataset.calls == 3
+
+    dataset.get_annotations_cached(files[1], features, 0.1)
+    assert dataset.calls == 4
+    assert [key[0] for key in dataset.annotations_cache] == [
+        os.path.join('audio', 'c.wav'), os.path.join('audio', 'b.wav')]
+    assert dataset.annotations_cache_info() == {
+        'hits': 1, 'misses': 4, 'size': 2, 'max_size': 2}
+
+
+def test_annotations_cache_save_load(tmp_path):
+    dataset_path = str(tmp_path)
+    dataset, files = _csv_dataset(dataset_path, {'a.wav': 0, 'b.wav': 2})
+    features = np.zeros((5, 4))
+    annotations = [dataset.get_annotations_cached(file_path, features, 0.1)
+                   for file_path in files]
+    dataset.save_annotations_cache()
+    assert os.path.exists(dataset.get_annotations_cache_path())
+
+    # The annotations are loaded without calling get_annotations()
+    dataset_loaded = CsvDataset(dataset_path)
+    assert dataset_loaded.load_annotations_cache()
+    for file_path, y in zip(files, annotations):
+        y_loaded = dataset_loaded.get_annotations_cached(
+            file_path, features, 0.1)
+        assert np.array_equal(y_loaded, y)
+        assert not y_loaded.flags.writeable
+    assert dataset_loaded.calls == 0
+    assert dataset_loaded.annotations_cache_info()['hits'] == 2
+
+    # The annotations are discarded if the annotations file changed
+    _csv_dataset(dataset_path, {'a.wav': 1, 'b.wav': 2})
+    stat = os.stat(dataset.labels_file)
+    os.utime(dataset.labels_file, (stat.st_atime, stat.st_mtime + 10))
+    dataset_loaded = CsvDataset(dataset_path)
+    assert dataset_loaded.load_annotations_cache()
+    assert len(dataset_loaded.annotations_cache) == 0
+    y = dataset_loaded.get_annotations_cached(files[0], features, 0.1)
+    assert np.all(y[:, 1] == 1)
+    assert dataset_loaded.calls == 1
+
+    # Or if the label list changed
+    dataset_loaded.save_annotations_cache()
+    dataset_loaded = CsvDataset(dataset_path)
+    dataset_loaded.label_list = dataset_loaded.label_list + ['class3']
+    assert dataset_loaded.load_annotations_cache()
+    assert len(dataset_loaded.annotations_cache) == 0
+
+    # A cache saved without stamps is not loaded
+    with open(dataset.get_annotations_cache_path(), 'wb') as f:
+        pickle.dump(dict(dataset.annotations_cache), f)
+    dataset_loaded = CsvDataset(dataset_path)
+    assert not dataset_loaded.load_annotations_cache()
+    assert len(dataset_loaded.annotations_cache) == 0
+
+
+def test_sonyc_ust(tmp_path):
+    dataset_path = str(tmp_path)
+    with open(os.path.join(dataset_path, 'dcase-ust-taxonomy.yaml'),
+              'w') as f:
+        f.write('coarse:\n  1: engine\n  2: machinery-impact\n'
+                '  3: non-machinery-impact\n')
+    columns = ['split', 'audio_filename', 'annotator_id',
+               '1_engine_presence', '2_machinery-impact_presence',
+               '3_non-machinery-impact_presence']
+    rows = [
+        # Train: present if any annotator checked it
+        ['train', 't1.wav', 5, 1, 0, 0],
+        ['train', 't1.wav', 6, 0, 1, 0],
+        ['train', 't2.wav', 7, 0, 0, 0],
+        ['train', 't2.wav', -1, 0, 0, 1],
+        # Validate: only the annotator 0 is considered
+        ['validate', 'v1.wav', 3, 1, 0, 0],
+        ['validate', 'v1.wav', 0, 0, 1, 1],
+        ['validate', 'v2.wav', 4, 1, 1, 1],
+        ['test', 'x1.wav', 0, 1, 0, 0],
+    ]
+    with open(os.path.join(dataset_path, 'annotations.csv'), 'w') as f:
+        f.write(','.join(columns) + '\n')
+        for row in rows:
+            f.write(','.join([str(value) for value in row]) + '\n')
+    os.makedirs(os.path.join(dataset_path, 'audio'))
+    for file_name in ['t1.wav', 't2.wav', 'v1.wav', 'v2.wav', 'x1.wav',
+                      'other.wav']:
+        open(os.path.join(dataset_path, 'audio', file_name), 'w').close()
+    SONYC_UST(dataset_path).set_as_downloaded()
+
+    dataset = SONYC_UST(dataset_path)
+    dataset.generate_file_lists()
+    audio_path = os.path.join(dataset_path, 'audio')
+    assert sorted(dataset.file_lists['train']) == [
+        os.path.join(audio_path, 't1.wav'),
+        os.path.join(audio_path, 't2.wav')]
+    assert dataset.file_lists['validate'] == [
+        os.path.join(audio_path, 'v1.wav')]
+
+    features = np.zeros((4, 10))
+    expected = {'t1.wav': [1, 1, 0], 't2.wav': [0, 0, 1],
+                'v1.wav': [0, 1, 1], 'v2.wav': [0, 0, 0],
+                'x1.wav': [1, 0, 0]}
+    for file_name, y_expected in expected.items():
+        y = dataset.get_annotations(
+            os.path.join(audio_path, file_name), features, 0.1)
+        assert y.shape == (len(features), 3)
+        assert np.array_equal(y, np.tile(y_expected, (len(features), 1)))
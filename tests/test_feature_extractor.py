@@ -1,12 +1,19 @@
 from dcase_models.util.files import load_json
-from dcase_models.data.features import MelSpectrogram, Spectrogram
+from dcase_models.data.features import MelSpectrogram, Spectrogram, MFCC
 from dcase_models.data.dataset_base import Dataset
 from dcase_models.data.data_generator import DataGenerator
+from dcase_models.data.feature_store import save_features, load_features
+from dcase_models.data.feature_store import FeatureStore
+from dcase_models.data.feature_extractor import FeatureStream
+from dcase_models.data.feature_extractor import FeatureExtractorGroup
+from dcase_models.data.feature_store import _load_features_header
 
 import os
 import numpy as np
 import pytest
 import shutil
+import pickle
+import librosa
 
 
 params = load_json('parameters.json')
@@ -45,3 +52,354 @@ def test_feature_extractor(infile, feature_extractor_class):
     gt = np.load(gt_path)
 
     assert np.allclose(mel_spec, gt)
+
+
+def test_extract_incremental(tmp_path):
+    dataset_path = str(tmp_path)
+    shutil.copytree(os.path.join('data', 'audio'),
+                    os.path.join(dataset_path, 'audio'))
+    shutil.copytree(os.path.join('data', 'audio'),
+                    os.path.join(dataset_path, 'audio22050', 'original'))
+    dataset = Dataset(dataset_path)
+
+    feature_extractor = MelSpectrogram(
+        sequence_time=params_features['sequence_time'],
+        sequence_hop_time=params_features['sequence_hop_time'],
+        audio_win=params_features['audio_win'],
+        audio_hop=params_features['audio_hop'],
+        n_fft=params_features['n_fft'],
+        sr=params_features['sr'],
+        **params_features['MelSpectrogram']
+    )
+
+    stats = feature_extractor.extract(dataset)
+    assert stats['files'] == len(files)
+    assert feature_extractor.check_if_extracted(dataset)
+
+    # Nothing to do if the audio files were not modified
+    stats = feature_extractor.extract(dataset)
+    assert stats['files'] == 0
+
+    # Only the new file is processed
+    shutil.copy(os.path.join('data', 'audio', '40722-8-0-7.wav'),
+                os.path.join(dataset_path, 'audio22050', 'original',
+                             'new.wav'))
+    stats = feature_extractor.extract(dataset)
+    assert stats['files'] == 1
+
+    features_path = os.path.join(
+        feature_extractor.get_features_path(dataset), 'original')
+    manifest = feature_extractor.load_manifest(features_path)
+    assert len(manifest) == len(files) + 1
+    mel_spec = np.load(os.path.join(features_path, 'new.npy'))
+    assert manifest['new.wav']['shape'] == list(mel_spec.shape)
+
+
+def _copy_dataset(dataset_path):
+    shutil.copytree(os.path.join('data', 'audio'),
+                    os.path.join(dataset_path, 'audio'))
+    shutil.copytree(os.path.join('data', 'audio'),
+                    os.path.join(dataset_path, 'audio22050', 'original'))
+    return Dataset(dataset_path)
+
+
+def test_extract_n_jobs(tmp_path):
+    features_paths = []
+    manifests = []
+    for n_jobs in [1, 2]:
+        dataset = _copy_dataset(str(tmp_path / str(n_jobs)))
+        feature_extractor = MelSpectrogram(
+            sequence_time=params_features['sequence_time'],
+            sequence_hop_time=params_features['sequence_hop_time'],
+            audio_win=params_features['audio_win'],
+            audio_hop=params_features['audio_hop'],
+            n_fft=params_features['n_fft'],
+            sr=params_features['sr'],
+            **params_features['MelSpectrogram']
+        )
+        stats = feature_extractor.extract(dataset, n_jobs=n_jobs,
+                                          chunksize=1)
+        assert stats['files'] == len(files)
+        assert feature_extractor.check_if_extracted(dataset)
+        features_path = os.path.join(
+            feature_extractor.get_features_path(dataset), 'original')
+        features_paths.append(features_path)
+        manifests.append(feature_extractor.load_manifest(features_path))
+
+    assert manifests[1].keys() == manifests[0].keys()
+    for key in manifests[0]:
+        assert manifests[1][key]['shape'] == manifests[0][key]['shape']
+    for file_name in files:
+        features = np.load(os.path.join(features_paths[0], file_name))
+        features_parallel = np.load(
+            os.path.join(features_paths[1], file_name))
+        assert np.array_equal(features_parallel, features)
+
+
+@pytest.mark.parametrize("resample_in_memory", [False, True])
+def test_feature_extractor_group(tmp_path, resample_in_memory):
+    def feature_extractors():
+        kwargs = dict(sequence_time=params_features['sequence_time'],
+                      sequence_hop_time=params_features['sequence_hop_time'],
+                      audio_win=params_features['audio_win'],
+                      audio_hop=params_features['audio_hop'],
+                      n_fft=params_features['n_fft'],
+                      sr=params_features['sr'])
+        return [Spectrogram(**kwargs),
+                MelSpectrogram(**kwargs, **params_features['MelSpectrogram']),
+                MFCC(**kwargs)]
+
+    # MelSpectrogram and the first MFCC share the power spectrogram
+    group = feature_extractors()
+    stft_parameters = [fe.get_stft_parameters() for fe in group]
+    assert stft_parameters[1] == stft_parameters[2]
+    assert stft_parameters[0] not in stft_parameters[1:]
+
+    dataset_group = _copy_dataset(str(tmp_path / 'group'))
+    stats = FeatureExtractorGroup(group).extract(
+        dataset_group, resample_in_memory=resample_in_memory)
+    assert stats['files'] == len(files)
+
+    dataset_single = _copy_dataset(str(tmp_path / 'single'))
+    for feature_extractor, feature_extractor_group in zip(
+            feature_extractors(), group):
+        feature_extractor.extract(
+            dataset_single, resample_in_memory=resample_in_memory)
+        assert feature_extractor_group.check_if_extracted(dataset_group)
+
+        features_path = os.path.join(
+            feature_extractor.get_features_path(dataset_single), 'original')
+        features_path_group = os.path.join(
+            feature_extractor_group.get_features_path(dataset_group),
+            'original')
+        assert (feature_extractor_group.load_manifest(features_path_group)
+                .keys() ==
+                feature_extractor.load_manifest(features_path).keys())
+        for file_name in files:
+            features = np.load(os.path.join(features_path, file_name))
+            features_group = np.load(
+                os.path.join(features_path_group, file_name))
+            assert features_group.dtype == features.dtype
+            assert np.array_equal(features_group, features)
+
+    # The features of two extractors can not be saved in the same path
+    with pytest.raises(AttributeError):
+        FeatureExtractorGroup([MFCC(), MFCC(store_frames=True)]).extract(
+            dataset_group)
+
+
+@pytest.mark.parametrize("dct_type, norm, lifter", [
+    (2, 'ortho', 0), (3, 'ortho', 0), (1, None, 0), (2, 'ortho', 22)])
+def test_mfcc(dct_type, norm, lifter):
+    feature_extractor = MFCC(n_mfcc=13, dct_type=dct_type, norm=norm,
+                             lifter=lifter)
+    audio = feature_extractor.load_audio(
+        os.path.join('data', 'audio', '40722-8-0-7.wav'))
+    spectrogram = feature_extractor.power_spectrogram(audio)
+    mfcc = feature_extractor.features_from_spectrogram(spectrogram)
+    assert mfcc.dtype == np.float64
+
+    mel_spectrogram = librosa.power_to_db(
+        feature_extractor.mel_basis.dot(spectrogram.astype(np.float64)))
+    mfcc_librosa = librosa.feature.mfcc(
+        S=mel_spectrogram, n_mfcc=13, dct_type=dct_type, norm=norm,
+        lifter=lifter)
+    assert np.allclose(mfcc, mfcc_librosa.T, rtol=0, atol=1e-10)
+
+    feature_extractor_float32 = MFCC(
+        n_mfcc=13, dct_type=dct_type, norm=norm, lifter=lifter,
+        dtype='float32')
+    mfcc_float32 = feature_extractor_float32.features_from_spectrogram(
+        spectrogram)
+    assert mfcc_float32.dtype == np.float32
+    assert np.allclose(mfcc_float32, mfcc, rtol=0, atol=1e-2)
+
+    # The power spectrogram is also calculated in float32
+    spectrogram_float32 = feature_extractor_float32.power_spectrogram(audio)
+    assert spectrogram_float32.dtype == np.float32
+    assert feature_extractor_float32.get_stft_parameters() != \
+        feature_extractor.get_stft_parameters()
+    mfcc_float32 = feature_extractor_float32.calculate_from_audio(audio)
+    assert mfcc_float32.dtype == np.float32
+    assert np.allclose(mfcc_float32,
+                       feature_extractor.calculate_from_audio(audio),
+                       rtol=0, atol=1e-2)
+
+
+def test_calculate_batch():
+    feature_extractor = MelSpectrogram(
+        sequence_time=params_features['sequence_time'],
+        sequence_hop_time=params_features['sequence_hop_time'],
+        audio_win=params_features['audio_win'],
+        audio_hop=params_features['audio_hop'],
+        n_fft=params_features['n_fft'],
+        sr=params_features['sr'],
+        **params_features['MelSpectrogram']
+    )
+    file_names = [os.path.join(dataset_path, 'audio', infile[:-3] + 'wav')
+                  for infile in files]
+    mel_specs = feature_extractor.calculate_batch(file_names)
+    assert len(mel_specs) == len(file_names)
+    for file_name, mel_spec in zip(file_names, mel_specs):
+        gt = feature_extractor.calculate(file_name)
+        assert mel_spec.shape == gt.shape
+        assert mel_spec.dtype == gt.dtype
+        assert np.allclose(mel_spec, gt, atol=1e-3)
+
+
+@pytest.mark.parametrize("chunk_size", [512, 4410, 10**6])
+@pytest.mark.parametrize("feature_extractor_class", feats)
+def test_feature_stream(feature_extractor_class, chunk_size):
+    feature_extractor = feature_extractor_class(
+        sequence_time=params_features['sequence_time'],
+        sequence_hop_time=params_features['sequence_hop_time'],
+        audio_win=params_features['audio_win'],
+        audio_hop=params_features['audio_hop'],
+        n_fft=params_features['n_fft'],
+        sr=params_features['sr'],
+        **params_features[feature_extractor_class.__name__]
+    )
+    audio = feature_extractor.load_audio(
+        os.path.join(dataset_path, 'audio', '40722-8-0-7.wav'))
+    gt = feature_extractor.calculate_from_audio(audio)
+
+    feature_stream = FeatureStream(feature_extractor)
+    sequences = np.concatenate(
+        [feature_stream.process(audio[start:start + chunk_size])
+         for start in range(0, len(audio), chunk_size)], axis=0)
+    assert sequences.shape[1:] == gt.shape[1:]
+    assert 0 < len(sequences) <= len(gt)
+
+    # The stream clips the dB values using the maximum of each chunk
+    frames = feature_extractor.features_from_spectrogram(
+        feature_extractor.power_spectrogram(audio))
+    floor = np.amax(frames) - 80.0
+    assert np.allclose(np.maximum(sequences, floor), gt[:len(sequences)],
+                       atol=1e-3)
+
+
+@pytest.mark.parametrize("dtype, tolerance", [
+    (None, 0), ('float32', 1e-4), ('float16', 1e-1), ('int8', 0.5)])
+@pytest.mark.parametrize("compress", [False, True])
+def test_save_features(tmp_path, dtype, tolerance, compress):
+    features = np.random.uniform(-80, 0, size=(5, 10, 8))
+    file_name = os.path.join(str(tmp_path), 'features.npy')
+    save_features(file_name, features, dtype=dtype, compress=compress)
+    features_loaded = load_features(file_name)
+    assert features_loaded.shape == features.shape
+    assert np.allclose(features_loaded, features, atol=tolerance)
+
+
+@pytest.mark.parametrize("dtype, compress", [
+    (None, False), ('float32', True), ('int8', False)])
+def test_feature_store(tmp_path, dtype, compress):
+    features_path = str(tmp_path)
+    features = {}
+    for j, n in enumerate([3, 1, 7]):
+        features_file = 'file%d.npy' % j
+        features[features_file] = np.random.uniform(-80, 0, size=(n, 10, 8))
+        save_features(os.path.join(features_path, features_file),
+                      features[features_file], dtype=dtype,
+                      compress=compress)
+
+    for features_file in features:
+        features_loaded = load_features(
+            os.path.join(features_path, features_file))
+        shape, features_dtype = _load_features_header(
+            os.path.join(features_path, features_file))
+        assert shape == features_loaded.shape
+        assert features_dtype == features_loaded.dtype
+
+    feature_store = FeatureStore(features_path)
+    assert not feature_store.check_if_packed()
+    feature_store.pack()
+    assert feature_store.check_if_packed()
+    assert feature_store.list_features_files() == sorted(features)
+
+    for features_file in features:
+        assert np.array_equal(
+            feature_store.get(features_file),
+            load_features(os.path.join(features_path, features_file)))
+
+    # The memory-mapped array is not pickled
+    feature_store_copy = pickle.loads(pickle.dumps(feature_store))
+    assert feature_store_copy.data is None
+    assert np.array_equal(feature_store_copy.get('file2.npy'),
+                          feature_store.get('file2.npy'))
+
+
+def test_feature_store_shape_mismatch(tmp_path):
+    features_path = str(tmp_path)
+    save_features(os.path.join(features_path, 'file0.npy'),
+                  np.zeros((3, 10, 8)))
+    save_features(os.path.join(features_path, 'file1.npy'),
+                  np.zeros((3, 10, 4)))
+    feature_store = FeatureStore(features_path)
+    with pytest.raises(AttributeError):
+        feature_store.pack()
+    assert not feature_store.check_if_packed()
+
+    with pytest.raises(AttributeError):
+        FeatureStore(os.path.join(features_path, 'empty')).pack()
+
+
+def test_frames_to_sequences():
+    feature_extractor = MelSpectrogram(pad_mode=None)
+    feature_extractor_frames = MelSpectrogram(pad_mode=None, store_frames=True)
+    frames = np.random.rand(100, 64)
+    sequences = feature_extractor.convert_to_sequences(frames)
+    assert np.array_equal(
+        feature_extractor_frames.frames_to_sequences(frames), sequences)
+    assert feature_extractor_frames.convert_to_sequences(frames) is frames
+
+
+@pytest.mark.parametrize("feature_extractor_class", feats)
+def test_frames_to_sequences_pad_mode(feature_extractor_class):
+    kwargs = dict(sequence_time=params_features['sequence_time'],
+                  sequence_hop_time=params_features['sequence_hop_time'],
+                  audio_win=params_features['audio_win'],
+                  audio_hop=params_features['audio_hop'],
+                  n_fft=params_features['n_fft'],
+                  sr=params_features['sr'])
+    file_name = os.path.join('data', 'audio', '40722-8-0-7.wav')
+
+    # Without padding, the sequences are the same
+    sequences = feature_extractor_class(
+        pad_mode=None, **kwargs).calculate(file_name)
+    feature_extractor_frames = feature_extractor_class(
+        pad_mode=None, store_frames=True, **kwargs)
+    frames = feature_extractor_frames.calculate(file_name)
+    assert np.allclose(
+        feature_extractor_frames.frames_to_sequences(frames), sequences)
+
+    # With the default pad_mode ('reflect'), the frames are reflected
+    feature_extractor = feature_extractor_class(**kwargs)
+    sequences = feature_extractor.calculate(file_name)
+    feature_extractor_frames = feature_extractor_class(
+        store_frames=True, **kwargs)
+    frames = feature_extractor_frames.calculate(file_name)
+    sequences_frames = feature_extractor_frames.frames_to_sequences(frames)
+    assert sequences_frames.shape == sequences.shape
+    assert (feature_extractor_frames.get_number_of_sequences(len(frames)) ==
+            len(sequences))
+
+    sequence_frames = feature_extractor.sequence_frames
+    sequence_hop = feature_extractor.sequence_hop
+    frames_padded = np.pad(
+        frames, [(0, sequence_frames), (0, 0)], mode='reflect')
+    for j in range(len(sequences)):
+        start = j*sequence_hop
+        assert np.array_equal(
+            sequences_frames[j], frames_padded[start:start+sequence_frames])
+
+    # The sequences without padded frames (and far from the end of the
+    # audio signal) are equal up to the clipping at 80 dB below the maximum
+    n_frames = (len(frames) - 1 -
+                feature_extractor.n_fft // feature_extractor.audio_hop)
+    n_sequences = 1 + (n_frames - sequence_frames) // sequence_hop
+    assert n_sequences > 1
+    floor = max(np.amax(sequences), np.amax(sequences_frames)) - 80
+    assert np.allclose(np.maximum(sequences_frames[:n_sequences], floor),
+                       np.maximum(sequences[:n_sequences], floor), atol=1e-3)
+    # The other sequences are not equal
+    assert not np.allclose(sequences_frames[-1], sequences[-1], atol=1)
@@ -0,0 +1,99 @@
+from dcase_models.util.metrics import evaluate_metrics, sed
+
+import numpy as np
+import pytest
+
+
+class SumModel():
+    """ Model that returns the sum of each sequence. """
+    def __init__(self):
+        self.calls = 0
+
+    def predict(self, X, batch_size=32):
+        self.calls += 1
+        return np.sum(X, axis=(1, 2))[:, np.newaxis]
+
+
+@pytest.mark.parametrize("predict_batch_size", [None, 1, 16, 100000])
+def test_evaluate_metrics_predict_batch_size(predict_batch_size):
+    X = [np.random.rand(n, 4, 5) for n in [3, 1, 7, 2, 10, 4]]
+    Y = [np.zeros((len(x), 1)) for x in X]
+
+    model = SumModel()
+    results = evaluate_metrics(
+        model, (X, Y), [], predict_batch_size=predict_batch_size)
+
+    assert len(results['predictions']) == len(X)
+    for x, y_predicted in zip(X, results['predictions']):
+        assert np.allclose(y_predicted[:, 0], np.sum(x, axis=(1, 2)))
+
+    if predict_batch_size == 100000:
+        assert model.calls == 1
+    if predict_batch_size is None:
+        assert model.calls == len(X)
+
+
+def test_evaluate_metrics_predict_batch_size_per_file():
+    # predict_batch_size is smaller than the sequences of most files
+    X = [np.random.rand(n, 4, 5) for n in [9, 1, 2, 12, 5]]
+    Y = [np.zeros((len(x), 1)) for x in X]
+    results_files = evaluate_metrics(
+        SumModel(), (X, Y), [], predict_batch_size=None)
+    results_batches = evaluate_metrics(
+        SumModel(), (X, Y), [], predict_batch_size=3)
+    for y_files, y_batches in zip(results_files['predictions'],
+                                  results_batches['predictions']):
+        assert y_batches.shape == y_files.shape
+        assert np.allclose(y_batches, y_files)
+
+
+class TwoInputsModel():
+    """ Model that returns the sum of each sequence of two inputs. """
+    def predict(self, X, batch_size=32):
+        assert type(X) == list
+        return (np.sum(X[0], axis=(1, 2)) + np.sum(X[1], axis=1))[
+            :, np.newaxis]
+
+
+@pytest.mark.parametrize("predict_batch_size", [None, 4, 100000])
+def test_evaluate_metrics_multiple_inputs(predict_batch_size):
+    X = [[np.random.rand(n, 4, 5), np.random.rand(n, 3)]
+         for n in [3, 1, 7, 2]]
+    Y = [np.zeros((len(x[0]), 1)) for x in X]
+    results = evaluate_metrics(
+        TwoInputsModel(), (X, Y), [], predict_batch_size=predict_batch_size)
+    assert len(results['predictions']) == len(X)
+    for x, y_predicted in zip(X, results['predictions']):
+        assert np.allclose(
+            y_predicted[:, 0],
+            np.sum(x[0], axis=(1, 2)) + np.sum(x[1], axis=1))
+
+
+@pytest.mark.parametrize("sequence_time_sec, metric_resolution_sec",
+                         [(0.5, 1.0), (0.1, 1.0), (0.3, 0.7), (1.0, 0.25)])
+def test_sed_numpy_backend(sequence_time_sec, metric_resolution_sec):
+    np.random.seed(0)
+    label_list = ['a', 'b', 'c']
+    Y_val = []
+    Y_predicted = []
+    for n in [12, 1, 30, 7, 20]:
+        Y_val.append(
+            (np.cumsum(np.random.rand(n, 3) > 0.8, axis=0) % 2).astype(float))
+        Y_predicted.append(np.random.rand(n + 2, 3))
+    # file without events
+    Y_val.append(np.zeros((5, 3)))
+    Y_predicted.append(np.zeros((5, 3)))
+
+    results = []
+    for backend in ['sed_eval', 'numpy']:
+        results.append(sed(
+            Y_val, Y_predicted, sequence_time_sec=sequence_time_sec,
+            metric_resolution_sec=metric_resolution_sec,
+            label_list=label_list, backend=backend))
+
+    assert results[0].overall == results[1].overall
+    assert results[0].class_wise == results[1].class_wise
+    assert results[0].results() == results[1].results()
+
+    with pytest.raises(AttributeError):
+        sed(Y_val, Y_predicted, label_list=label_list, backend='other')
@@ -0,0 +1,37 @@
+from dcase_models.util.misc import parallel_map, parallel_imap
+
+import time
+import numpy as np
+import pytest
+
+
+def _delayed_square(x):
+    # The first calls take longer, so they finish after the last ones
+    time.sleep(0.01 * (5 - x))
+    return x**2
+
+
+def _random():
+    return np.random.rand()
+
+
+@pytest.mark.parametrize("n_jobs", [1, 2])
+def test_parallel_map_order(n_jobs):
+    args_list = [(x,) for x in range(6)]
+    results = parallel_map(_delayed_square, args_list, n_jobs=n_jobs,
+                           progress=False)
+    assert results == [x**2 for x in range(6)]
+
+    iterator = parallel_imap(_delayed_square, args_list, n_jobs=n_jobs,
+                             progress=False)
+    assert list(iterator) == [x**2 for x in range(6)]
+
+
+def test_parallel_map_reseed():
+    np.random.seed(0)
+    first_value = np.random.rand()
+    np.random.seed(0)
+    results = parallel_map(_random, [()]*8, n_jobs=2, progress=False)
+    # The workers do not share the random state of the parent process
+    assert first_value not in results
+    assert len(set(results)) == len(results)
@@ -1,11 +1,19 @@
 from dcase_models.util.files import load_json
 from dcase_models.model.models import SB_CNN, A_CRNN
+from dcase_models.model.container import KerasModelContainer
+from dcase_models.model.container import FeatureNormalization
 from dcase_models.data.features import MelSpectrogram, Spectrogram
 from dcase_models.data.data_generator import DataGenerator
+from dcase_models.data.data_generator import KerasDataGenerator
+from dcase_models.data.feature_extractor import FeatureStream
+from dcase_models.data.scaler import Scaler
 
 import os
+import random
 import numpy as np
 import pytest
+from keras.layers import Concatenate, Dense, Flatten, Input
+from keras.models import Model
 
 from test_data_generator import TestDataset
 
@@ -49,6 +57,77 @@ def test_load_model(model_class):
         len_models[model_class.__name__]
 
 
+@pytest.mark.parametrize("normalizer", ['standard', 'minmax'])
+def test_embed_scaler(tmp_path, normalizer):
+    model_container = SB_CNN(
+        model=None, model_path=None, n_classes=n_classes,
+        n_frames_cnn=n_frames_cnn, n_freq_cnn=n_freq_cnn
+    )
+    X = 10 * np.random.randn(8, n_frames_cnn, n_freq_cnn) - 40
+    scaler = Scaler(normalizer)
+    scaler.fit(X)
+    Y = model_container.model.predict(scaler.transform(X))
+    X_emb = model_container.get_intermediate_output(-2, scaler.transform(X))
+    layer_names = model_container.get_available_intermediate_outputs()
+
+    assert not model_container.has_embedded_scaler()
+    model_container.embed_scaler(scaler)
+
+    assert model_container.has_embedded_scaler()
+    # Input, FeatureNormalization and the original model
+    assert len(model_container.model.layers) == 3
+    assert np.allclose(model_container.model.predict(X), Y, atol=1e-5)
+    assert (model_container.get_available_intermediate_outputs() ==
+            layer_names)
+    assert np.allclose(
+        model_container.get_intermediate_output(-2, X), X_emb, atol=1e-5)
+    assert np.allclose(
+        model_container.get_intermediate_output(layer_names[-2], X), X_emb,
+        atol=1e-5)
+
+    # The model and the scaler are saved in the json and weights files
+    model_container.save_model_json(str(tmp_path))
+    model_container.save_model_weights(str(tmp_path))
+    model_container_loaded = KerasModelContainer(model=None)
+    model_container_loaded.load_model_from_json(
+        str(tmp_path), custom_objects={
+            'FeatureNormalization': FeatureNormalization})
+    model_container_loaded.load_model_weights(str(tmp_path))
+    assert model_container_loaded.has_embedded_scaler()
+    assert np.allclose(model_container_loaded.model.predict(X), Y, atol=1e-5)
+    assert np.allclose(
+        model_container_loaded.get_intermediate_output(-2, X), X_emb,
+        atol=1e-5)
+
+    # FeatureNormalization is also registered as a custom object
+    model_container_loaded.load_model_from_json(str(tmp_path))
+    model_container_loaded.load_model_weights(str(tmp_path))
+    assert np.allclose(model_container_loaded.model.predict(X), Y, atol=1e-5)
+
+
+def test_embed_scaler_multiple_inputs():
+    x_1 = Input(shape=(4, 3), name='input_1')
+    x_2 = Input(shape=(5,), name='input_2')
+    y = Dense(2, name='dense')(
+        Concatenate()([Flatten()(x_1), x_2]))
+    model_container = KerasModelContainer(
+        model=Model([x_1, x_2], y, name='two_inputs'))
+    X = [10 * np.random.randn(6, 4, 3) - 40, np.random.rand(6, 5)]
+    scaler = Scaler(['standard', None])
+    scaler.fit(X)
+    Y = model_container.model.predict(scaler.transform(list(X)))
+
+    model_container.embed_scaler(scaler)
+    assert model_container.model.input_names == ['input_1', 'input_2']
+    assert model_container.model.get_layer('normalization_0') is not None
+    assert np.allclose(model_container.model.predict(X), Y, atol=1e-5)
+    assert np.allclose(
+        model_container.get_intermediate_output('dense', X), Y, atol=1e-5)
+
+    with pytest.raises(AttributeError):
+        model_container.embed_scaler(Scaler('instance'))
+
+
 feats = [MelSpectrogram, Spectrogram]
 
 
@@ -98,3 +177,89 @@ def test_train_model(model_class, feature_extractor_class):
     os.remove('training.log')
 
     assert results['accuracy'] > 0.1
+
+
+class FileListGenerator():
+    """ Minimal DataGenerator that records the files of each batch. """
+    def __init__(self, n_files=20, batch_size=4):
+        self.audio_file_list = list(range(n_files))
+        self.batch_size = batch_size
+        self.cache = None
+        self.memory_cache = None
+        self.batches = []
+
+    def __len__(self):
+        return int(np.ceil(len(self.audio_file_list) / self.batch_size))
+
+    def shuffle_list(self):
+        random.shuffle(self.audio_file_list)
+
+    def get_batch_files(self, index):
+        return self.audio_file_list[
+            index*self.batch_size:(index+1)*self.batch_size]
+
+    def get_data_from_list(self, list_files):
+        self.batches.append(tuple(list_files))
+        X = np.asarray(list_files, dtype=float)[:, np.newaxis]
+        return X, np.zeros((len(list_files), 1))
+
+    def get_data_batch(self, index):
+        return self.get_data_from_list(self.get_batch_files(index))
+
+
+@pytest.mark.parametrize("max_queue_size", [0, 2])
+def test_train_shuffles_each_epoch(tmp_path, max_queue_size):
+    x = Input(shape=(1,))
+    model_container = KerasModelContainer(
+        model=Model(x, Dense(1)(x)), metrics=['loss'])
+
+    data_generator = FileListGenerator()
+    data_train = KerasDataGenerator(
+        data_generator, workers=2, max_queue_size=max_queue_size)
+    data_val = (np.zeros((4, 1)), np.zeros((4, 1)))
+    n_batches = len(data_generator)
+
+    model_container.train(
+        data_train, data_val, weights_path=str(tmp_path),
+        losses='mean_squared_error', workers=2,
+        max_queue_size=max_queue_size, epochs=2, batch_size=4, verbose=0)
+
+    batches = data_generator.batches
+    assert len(batches) >= 2*n_batches
+    # The file list is shuffled between epochs
+    assert set(batches[:n_batches]) != set(batches[n_batches:2*n_batches])
+    if max_queue_size > 0:
+        assert len(data_train.stats) == 2
+
+
+@pytest.mark.parametrize("chunk_size", [512, 4410])
+def test_predict_stream(chunk_size):
+    feature_extractor = MelSpectrogram(
+        sequence_time=params_features['sequence_time'],
+        sequence_hop_time=params_features['sequence_hop_time'],
+        audio_win=params_features['audio_win'],
+        audio_hop=params_features['audio_hop'],
+        n_fft=params_features['n_fft'],
+        sr=params_features['sr'],
+        **params_features['MelSpectrogram']
+    )
+    # White noise, so the dB values are not clipped (see FeatureStream)
+    audio = np.random.RandomState(0).randn(3*params_features['sr'])
+    sequences = feature_extractor.calculate_from_audio(audio)
+    scaler = Scaler('standard')
+    scaler.fit(sequences)
+
+    x = Input(shape=sequences.shape[1:])
+    model_container = KerasModelContainer(
+        model=Model(x, Dense(2)(Flatten()(x))))
+
+    feature_stream = FeatureStream(feature_extractor)
+    Y_stream = np.concatenate(
+        [model_container.predict_stream(
+            audio[start:start + chunk_size], feature_stream, scaler=scaler)
+         for start in range(0, len(audio), chunk_size)], axis=0)
+
+    assert 0 < len(Y_stream) <= len(sequences)
+    Y = model_container.model.predict(
+        scaler.transform(sequences[:len(Y_stream)]))
+    assert np.allclose(Y_stream, Y, atol=1e-4)
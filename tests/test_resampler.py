@@ -0,0 +1,110 @@
+from dcase_models.data.resampler import Resampler
+
+import os
+import numpy as np
+import pytest
+import soundfile as sf
+
+
+@pytest.mark.parametrize("backend", ['polyphase', 'fft'])
+@pytest.mark.parametrize("sr_orig, sr", [(44100, 22050), (22050, 8000),
+                                         (16000, 44100)])
+def test_resample(backend, sr_orig, sr):
+    resampler = Resampler(backend)
+    audio = np.random.rand(sr_orig + 123) - 0.5
+    audio_resampled = resampler.resample(audio, sr_orig, sr)
+    assert len(audio_resampled) == int(np.ceil(len(audio) * sr / sr_orig))
+
+    # Multi-channel signals are resampled along the first axis
+    audio_stereo = np.stack([audio, audio], axis=1)
+    audio_resampled_stereo = resampler.resample(audio_stereo, sr_orig, sr)
+    assert audio_resampled_stereo.shape == (len(audio_resampled), 2)
+    assert np.allclose(audio_resampled_stereo[:, 1], audio_resampled)
+
+    assert resampler.resample(audio, sr, sr) is audio
+
+
+def test_resample_sine():
+    sr_orig, sr = 44100, 22050
+    time = np.arange(sr_orig) / sr_orig
+    audio = np.sin(2 * np.pi * 440 * time)
+    for backend in ['polyphase', 'fft']:
+        audio_resampled = Resampler(backend).resample(audio, sr_orig, sr)
+        expected = np.sin(2 * np.pi * 440 * np.arange(sr) / sr)
+        # Far from the edges
+        assert np.allclose(audio_resampled[1000:-1000],
+                           expected[1000:-1000], atol=1e-2)
+
+
+def test_resampler_errors():
+    with pytest.raises(AttributeError):
+        Resampler('other')
+    with pytest.raises(AttributeError):
+        Resampler('sox').resample(np.zeros(100), 44100, 22050)
+
+
+@pytest.mark.parametrize("backend", ['polyphase', 'fft'])
+def test_resample_file(tmp_path, backend):
+    path_to_file = os.path.join('data', 'audio', '40722-8-0-7.wav')
+    path_to_destination = str(tmp_path / 'resampled.wav')
+    Resampler(backend).resample_file(path_to_file, path_to_destination, 8000)
+
+    info = sf.info(path_to_destination)
+    info_orig = sf.info(path_to_file)
+    assert info.samplerate == 8000
+    assert info.subtype == info_orig.subtype
+    assert np.isclose(info.duration, info_orig.duration, atol=1e-3)
+
+
+def test_convert_file(tmp_path):
+    sr = 22050
+    audio = 0.5 * (np.random.rand(sr) - 0.5)
+    path_pcm = str(tmp_path / 'pcm.wav')
+    path_float = str(tmp_path / 'float.wav')
+    sf.write(path_pcm, audio, sr, subtype='PCM_24')
+    sf.write(path_float, audio, sr, subtype='FLOAT')
+
+    resampler = Resampler('polyphase')
+    # The subtype is kept if the new format supports it
+    resampler.convert_file(path_pcm, str(tmp_path / 'pcm.flac'))
+    info = sf.info(str(tmp_path / 'pcm.flac'))
+    assert (info.format, info.subtype) == ('FLAC', 'PCM_24')
+
+    # Otherwise, the default subtype of the format is used
+    assert not sf.check_format('FLAC', 'FLOAT')
+    resampler.convert_file(path_float, str(tmp_path / 'float.flac'))
+    info = sf.info(str(tmp_path / 'float.flac'))
+    assert info.format == 'FLAC'
+    assert info.subtype == sf.default_subtype('FLAC')
+    audio_converted, sr_converted = sf.read(str(tmp_path / 'float.flac'))
+    assert sr_converted == sr
+    assert np.allclose(audio_converted, audio, atol=1e-4)
+
+
+def test_write_clipping(tmp_path, monkeypatch):
+    sr = 8000
+    audio = np.array([0.0, 0.5, 1.5, -2.0, -0.5] * 100)
+    path_float = str(tmp_path / 'float.wav')
+    path_pcm = str(tmp_path / 'pcm.wav')
+
+    written = []
+
+    def write(path, data, samplerate, subtype=None):
+        written.append(data)
+        sf_write(path, data, samplerate, subtype=subtype)
+
+    sf_write = sf.write
+    monkeypatch.setattr(sf, 'write', write)
+    resampler = Resampler('polyphase')
+
+    # The integer PCM signals are clipped before saving them
+    resampler._write(path_pcm, audio, sr, 'PCM_16')
+    assert np.array_equal(written[-1], np.clip(audio, -1, 1))
+    audio_pcm, _ = sf.read(path_pcm)
+    assert np.allclose(audio_pcm, np.clip(audio, -1, 1), atol=1e-4)
+
+    # The floating point signals are not clipped
+    resampler._write(path_float, audio, sr, 'FLOAT')
+    assert np.array_equal(written[-1], audio)
+    audio_float, _ = sf.read(path_float)
+    assert np.allclose(audio_float, audio)
@@ -0,0 +1,138 @@
+from dcase_models.data.scaler import Scaler
+from dcase_models.data.scaler import compute_statistics, merge_statistics
+from dcase_models.data.scaler import get_quantiles
+
+import numpy as np
+import pickle
+import pytest
+
+
+def test_merge_statistics():
+    X = 3 * np.random.randn(50, 4, 8) + 1
+    statistics = compute_statistics(X[:0])
+    for start in range(0, len(X), 7):
+        statistics = merge_statistics(
+            statistics, compute_statistics(X[start:start+7]))
+
+    X_bands = np.reshape(X, (-1, 8))
+    assert statistics['count'] == len(X_bands)
+    assert np.allclose(statistics['mean'], np.mean(X_bands, axis=0))
+    assert np.allclose(statistics['m2'] / statistics['count'],
+                       np.var(X_bands, axis=0))
+    assert np.allclose(statistics['min'], np.amin(X_bands, axis=0))
+    assert np.allclose(statistics['max'], np.amax(X_bands, axis=0))
+
+
+@pytest.mark.parametrize("normalizer", ['standard', 'minmax'])
+def test_partial_fit(normalizer):
+    X = 3 * np.random.rand(30, 10, 5)
+    scaler = Scaler(normalizer)
+    scaler.fit(X)
+    scaler_batches = Scaler(normalizer)
+    for start in range(0, len(X), 4):
+        scaler_batches.partial_fit(X[start:start+4])
+
+    assert np.allclose(scaler.transform(X.copy()),
+                       scaler_batches.transform(X.copy()))
+    if normalizer == 'minmax':
+        X_scaled = scaler.transform(X.copy())
+        assert np.isclose(np.amin(X_scaled), -1)
+        assert np.isclose(np.amax(X_scaled), 1)
+
+
+@pytest.mark.parametrize("normalizer", ['standard', 'minmax'])
+def test_partial_fit_old_scaler(normalizer):
+    X = 3 * np.random.rand(30, 10, 5)
+    scaler = Scaler(normalizer)
+    scaler.fit(X)
+
+    # Scaler saved before the statistics were introduced
+    scaler_old = Scaler(normalizer)
+    del scaler_old.statistics
+    del scaler_old.transform_parameters
+    scaler_old = pickle.loads(pickle.dumps(scaler_old))
+    for start in range(0, len(X), 4):
+        scaler_old.partial_fit(X[start:start+4])
+
+    assert np.allclose(scaler.transform(X.copy()),
+                       scaler_old.transform(X.copy()))
+
+
+@pytest.mark.parametrize("normalizer", ['standard', 'minmax'])
+def test_transform_inplace(normalizer):
+    X = (10 * np.random.randn(16, 10, 5) - 40).astype(np.float32)
+    scaler = Scaler(normalizer)
+    scaler.fit(X)
+    X_scaled = scaler.transform(X)
+    assert X_scaled.dtype == np.float32
+    assert X_scaled is not X
+
+    X_copy = X.copy()
+    assert scaler.transform(X_copy, inplace=True) is X_copy
+    assert np.allclose(X_copy, X_scaled)
+
+    # Read-only arrays are not modified
+    X.flags.writeable = False
+    X_readonly = scaler.transform(X, inplace=True)
+    assert X_readonly is not X
+    assert np.allclose(X_readonly, X_scaled)
+
+
+@pytest.mark.parametrize("dtype", [np.float64, np.float32])
+@pytest.mark.parametrize("normalizer", ['minmax', 'minmax_bands'])
+def test_minmax_exact(normalizer, dtype):
+    axis = None if normalizer == 'minmax' else (0, 1)
+    for _ in range(20):
+        X = (10 * np.random.randn(16, 10, 5) - 40).astype(dtype)
+        scaler = Scaler(normalizer)
+        scaler.fit(X)
+        X_scaled = scaler.transform(X)
+        assert X_scaled.dtype == dtype
+        assert np.all(np.amin(X_scaled, axis=axis) == -1.0)
+        assert np.all(np.amax(X_scaled, axis=axis) == 1.0)
+        assert np.array_equal(scaler.transform(X.copy(), inplace=True),
+                              X_scaled)
+        assert np.allclose(scaler.inverse_transform(X_scaled), X,
+                           atol=1e-4)
+
+
+def test_quantiles():
+    X = 10 * np.random.randn(500, 4) - 40
+    statistics = compute_statistics(X[:0], sketch_bins=512)
+    for start in range(0, len(X), 33):
+        statistics = merge_statistics(
+            statistics, compute_statistics(X[start:start+33],
+                                           sketch_bins=512))
+
+    statistics_all = compute_statistics(X, sketch_bins=512)
+    assert np.array_equal(statistics['sketch']['counts'],
+                          statistics_all['sketch']['counts'])
+
+    quantiles = get_quantiles(statistics, [0.25, 0.5, 0.75])
+    percentiles = np.percentile(X, [25, 50, 75], axis=0)
+    width = statistics['sketch']['width']
+    assert np.all(np.abs(quantiles - percentiles) <= width)
+
+
+@pytest.mark.parametrize("normalizer", ['minmax_bands', 'robust'])
+def test_band_normalizers(normalizer):
+    X = np.random.rand(40, 10, 5) * np.arange(1, 6)
+    scaler = Scaler(normalizer)
+    scaler.fit(X)
+    X_scaled = np.reshape(scaler.transform(X), (-1, 5))
+    if normalizer == 'minmax_bands':
+        assert np.allclose(np.amin(X_scaled, axis=0), -1)
+        assert np.allclose(np.amax(X_scaled, axis=0), 1)
+    else:
+        assert np.allclose(np.median(X_scaled, axis=0), 0, atol=0.05)
+    assert np.allclose(scaler.inverse_transform(scaler.transform(X)), X)
+
+
+def test_instance_normalizer():
+    X = [np.random.rand(n, 10, 5) + n for n in [3, 7, 1]]
+    scaler = Scaler('instance')
+    X_scaled = scaler.transform([X])[0]
+    for x in X_scaled:
+        x_bands = np.reshape(x, (-1, 5))
+        assert np.allclose(np.mean(x_bands, axis=0), 0)
+        assert np.allclose(np.std(x_bands, axis=0), 1)
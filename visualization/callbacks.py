@@ -54,6 +54,15 @@ def conv_path(file_or_folder):
     return os.path.join(os.path.dirname(__file__), file_or_folder)
 
 
+def load_scaler(exp_folder_fold):
+    """ Loads the scaler of the fold, or None if the model includes it.
+
+    """
+    if model_container.has_embedded_scaler():
+        return None
+    return load_pickle(os.path.join(exp_folder_fold, 'scaler.pickle'))
+
+
 mkdir_if_not_exists(conv_path('models'))
 
 
@@ -107,8 +116,7 @@ def update_plot2D(samples_per_class, x_select, y_select,
     if (active_tab == 'tab_visualization'):
         fold_name = dataset.fold_list[fold_ix]
         exp_folder_fold = conv_path(os.path.join(model_path, fold_name))
-        scaler_path = os.path.join(exp_folder_fold, 'scaler.pickle')
-        scaler = load_pickle(scaler_path)
+        scaler = load_scaler(exp_folder_fold)
 
         dataset_name = options_datasets[dataset_ix]['label']
         params_dataset = params['datasets'][dataset_name]
@@ -809,8 +817,7 @@ def evaluate_model(n_clicks, fold_ix, model_path):
         print('Start evaluation')
         fold_name = dataset.fold_list[fold_ix]
         exp_folder_fold = conv_path(os.path.join(model_path, fold_name))
-        scaler_path = os.path.join(exp_folder_fold, 'scaler.pickle')
-        scaler = load_pickle(scaler_path)
+        scaler = load_scaler(exp_folder_fold)
 
         data_generator_test = DataGenerator(
             dataset, feature_extractor, folds=[fold_name],
@@ -940,8 +947,7 @@ def generate_demo(n_clicks, list_of_contents, fold_ix,
     if (n_clicks is not None) & (button_id == 'btn_run_demo'):
         fold_name = dataset.fold_list[fold_ix]
         exp_folder_fold = conv_path(os.path.join(model_path, fold_name))
-        scaler_path = os.path.join(exp_folder_fold, 'scaler.pickle')
-        scaler = load_pickle(scaler_path)
+        scaler = load_scaler(exp_folder_fold)
 
         data_generator_test = DataGenerator(
             dataset, feature_extractor, folds=[fold_name],
@@ -979,8 +985,7 @@ def generate_demo(n_clicks, list_of_contents, fold_ix,
     if button_id == 'upload-data':
         fold_name = dataset.fold_list[fold_ix]
         exp_folder_fold = conv_path(os.path.join(model_path, fold_name))
-        scaler_path = os.path.join(exp_folder_fold, 'scaler.pickle')
-        scaler = load_pickle(scaler_path)
+        scaler = load_scaler(exp_folder_fold)
 
         filename = conv_path('upload.wav')
         data = list_of_contents.encode("utf8").split(b";base64,")[1]
@@ -988,7 +993,8 @@ def generate_demo(n_clicks, list_of_contents, fold_ix,
             fp.write(base64.decodebytes(data))
 
         X_feat = feature_extractor.calculate(filename)
-        X_feat = scaler.transform(X_feat)
+        if scaler is not None:
+            X_feat = scaler.transform(X_feat)
         with graph.as_default():
             Y_t = model_container.model.predict(X_feat)
 